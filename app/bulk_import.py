@@ -0,0 +1,176 @@
+"""
+Importación masiva de procesos desde NDJSON o CSV.
+
+Las filas se leen en streaming y se procesan por bloques:
+- validación con `schemas.ProcesoCreate`,
+- detección de números existentes con una consulta IN por bloque (incluye
+  procesos con soft delete, pues `numero_proceso` es único en la tabla),
+- un INSERT multi-fila con RETURNING y las filas de auditoría en un único
+  executemany, todo en una transacción por bloque.
+
+Los errores se reportan por fila sin abortar el bloque.
+
+Uso: python -m app.bulk_import archivo.csv|archivo.ndjson [--format csv|ndjson] [--chunk-size 1000]
+"""
+import argparse
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .core.audit import bulk_create_rows
+from .core.config import settings
+
+DEFAULT_CHUNK_SIZE = 1000
+# Tope de errores detallados en el reporte (el conteo total siempre se incluye)
+MAX_REPORTED_ERRORS = 1000
+# Límite de parámetros por consulta IN (SQLite admite 32766 desde 3.32)
+LOOKUP_CHUNK_SIZE = 900
+
+FORMATS = ("ndjson", "csv")
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """Genera (número de línea, objeto | excepción) por cada línea no vacía."""
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """Genera (número de fila, dict) usando la primera fila como encabezado; '' se toma como nulo."""
+    reader = csv.DictReader(lines)
+    for record in reader:
+        if not any(record.values()):
+            continue
+        yield reader.line_num, {k.strip(): (v if v != "" else None) for k, v in record.items() if k}
+
+def _format_error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+class BulkImporter:
+    def __init__(self, db: Session, usuario: str, license_mode: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.usuario = usuario
+        self.license_mode = license_mode or settings.LICENSE_MODE
+        self.chunk_size = chunk_size
+        self.seen: set = set()  # Números ya procesados en esta importación
+        self.report: Dict[str, Any] = {"received": 0, "inserted": 0, "failed": 0, "errors": []}
+        self.remaining = None
+        if self.license_mode == "FREE":
+            current = db.query(models.Proceso).filter(models.Proceso.deleted_at == None).count()
+            self.remaining = max(0, settings.MAX_CASES_FREE - current)
+
+    def _error(self, row: int, error: str, numero: Optional[str] = None):
+        self.report["failed"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"row": row, "numero_proceso": numero, "error": error})
+
+    def _existing(self, numeros: List[str]) -> set:
+        found = set()
+        for i in range(0, len(numeros), LOOKUP_CHUNK_SIZE):
+            part = numeros[i:i + LOOKUP_CHUNK_SIZE]
+            found.update(n for (n,) in self.db.query(models.Proceso.numero_proceso).filter(
+                models.Proceso.numero_proceso.in_(part)
+            ))
+        return found
+
+    def _flush(self, chunk: List[Tuple[int, Any]]):
+        valid: List[Tuple[int, dict]] = []
+        for row_no, payload in chunk:
+            if isinstance(payload, Exception):
+                self._error(row_no, f"Línea inválida: {payload}")
+                continue
+            try:
+                data = schemas.ProcesoCreate.model_validate(payload).model_dump()
+            except ValidationError as e:
+                numero = payload.get("numero_proceso") if isinstance(payload, dict) else None
+                self._error(row_no, _format_error(e), numero)
+                continue
+            if data["numero_proceso"] in self.seen:
+                self._error(row_no, "Número de proceso repetido en el archivo", data["numero_proceso"])
+                continue
+            self.seen.add(data["numero_proceso"])
+            valid.append((row_no, data))
+
+        existing = self._existing([d["numero_proceso"] for _, d in valid]) if valid else set()
+        rows = []
+        for row_no, data in valid:
+            if data["numero_proceso"] in existing:
+                self._error(row_no, "El número de proceso ya existe", data["numero_proceso"])
+            elif self.remaining is not None and len(rows) >= self.remaining:
+                self._error(row_no, f"Límite de la versión FREE alcanzado ({settings.MAX_CASES_FREE} casos)",
+                            data["numero_proceso"])
+            else:
+                rows.append((row_no, data))
+        if not rows:
+            return
+
+        values = [data for _, data in rows]
+        try:
+            inserted = self.db.execute(
+                insert(models.Proceso).returning(models.Proceso.id, models.Proceso.numero_proceso), values
+            ).all()
+            ids = {numero: pid for pid, numero in inserted}
+            for data in values:
+                data["id"] = ids[data["numero_proceso"]]
+            self.db.execute(insert(models.AuditLog), bulk_create_rows(self.usuario, "PROCESO", values))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            for row_no, data in rows:
+                self._error(row_no, f"Error al insertar el bloque: {e}", data["numero_proceso"])
+            return
+        self.report["inserted"] += len(rows)
+        if self.remaining is not None:
+            self.remaining -= len(rows)
+
+    def run(self, records: Iterable[Tuple[int, Any]]) -> Dict[str, Any]:
+        chunk = []
+        for record in records:
+            self.report["received"] += 1
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+        return self.report
+
+def import_procesos(db: Session, lines: Iterable[str], fmt: str, usuario: str,
+                    license_mode: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    records = iter_csv(lines) if fmt == "csv" else iter_ndjson(lines)
+    return BulkImporter(db, usuario, license_mode, chunk_size).run(records)
+
+def main():
+    from .database import SessionLocal, sync_schema
+
+    parser = argparse.ArgumentParser(description="Importa procesos desde NDJSON o CSV")
+    parser.add_argument("archivo")
+    parser.add_argument("--format", choices=FORMATS, help="Por defecto se deduce de la extensión")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--usuario", default="importador")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.archivo.lower().endswith(".csv") else "ndjson")
+    sync_schema()
+    db = SessionLocal()
+    try:
+        with open(args.archivo, encoding="utf-8-sig", newline="") as f:
+            report = import_procesos(db, f, fmt, args.usuario, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    print(f"📥 Recibidos {report['received']}, insertados {report['inserted']}, con error {report['failed']}")
+    for err in report["errors"][:20]:
+        print(f"   fila {err['row']}: {err['numero_proceso'] or ''} {err['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Caché persistente de respuestas de IA en SQLite.
+
+La clave es el hash SHA-256 de (modelo, prompt normalizado): la misma
+consulta con distinto espaciado o mayúsculas no vuelve a llamar a la API.
+El archivo se comparte entre workers y sobrevive a reinicios.
+
+- TTL: las entradas vencidas no se sirven y se purgan al escribir.
+- Tamaño: si el total supera el máximo se desalojan las de acceso más antiguo.
+- Sólo se guardan respuestas válidas: quien llama decide cuándo `set`, nunca
+  con los valores de respaldo de un error.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+from .cache import MISSING
+from .config import settings
+
+logger = logging.getLogger("chechy.ai_cache")
+
+# Al desalojar por tamaño se baja hasta esta fracción del máximo
+EVICTION_TARGET = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_ai_cache_accessed_at ON ai_cache (accessed_at);
+CREATE INDEX IF NOT EXISTS ix_ai_cache_created_at ON ai_cache (created_at);
+"""
+
+def normalize_prompt(prompt: str) -> str:
+    text = unicodedata.normalize("NFKC", prompt)
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+def cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+class AICache:
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Conexión perezosa: importar el servicio no crea el archivo
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, model: str, prompt: str) -> Any:
+        """Texto cacheado o MISSING si no existe, venció o la caché no está disponible."""
+        key = cache_key(model, prompt)
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT value, tokens FROM ai_cache WHERE key = ? AND created_at > ?",
+                    (key, now - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE ai_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+            except sqlite3.Error as e:
+                # Una caché rota no debe impedir la llamada a la API
+                logger.warning(f"Caché de IA no disponible: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            self.tokens_saved += row[1]
+            return row[0]
+
+    def set(self, model: str, prompt: str, value: str, tokens: int = 0):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO ai_cache (key, model, value, size_bytes, tokens, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key(model, prompt), model, value, size, tokens, now, now)
+                )
+                conn.execute("DELETE FROM ai_cache WHERE created_at <= ?", (now - self.ttl_seconds,))
+                self._evict(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo guardar en la caché de IA: {e}")
+                if self._conn is not None:
+                    self._conn.rollback()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM ai_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * EVICTION_TARGET)
+        freed = 0
+        keys = []
+        for key, size in conn.execute("SELECT key, size_bytes FROM ai_cache ORDER BY accessed_at"):
+            keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM ai_cache WHERE key = ?", keys)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM ai_cache")
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = 0, 0
+            if self._conn is not None:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ai_cache"
+                ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "tokens_saved": self.tokens_saved,
+            }
+
+ai_cache = AICache(settings.AI_CACHE_PATH, settings.AI_CACHE_TTL_SECONDS, settings.AI_CACHE_MAX_MB * 1024 * 1024)
@@ -1,48 +1,90 @@
-from sqlalchemy import event
+from sqlalchemy import event, insert, inspect
 from sqlalchemy.orm import Session
 from ..models import Proceso, AuditLog
 from .context import get_current_user_name
 import json
 
+# Entidades auditadas: clase del modelo -> nombre en audit_log.entidad
+AUDITED_ENTITIES = {Proceso: "PROCESO"}
+
+def _loaded_values(target) -> dict:
+    # Sólo atributos ya cargados: leer columnas con default de servidor (created_at)
+    # dispararía un SELECT por objeto dentro del flush
+    state = inspect(target)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+def _create_row(usuario: str, entidad: str, target) -> dict:
+    return {
+        "usuario": usuario,
+        "accion": "CREATE",
+        "entidad": entidad,
+        "entidad_id": target.id,
+        "campo_modificado": None,
+        "valor_anterior": None,
+        "valor_nuevo": json.dumps(_loaded_values(target), default=str),
+    }
+
+def bulk_create_rows(usuario: str, entidad: str, rows: list) -> list:
+    """Filas CREATE para inserciones en bloque (Core), que no pasan por el flush del ORM."""
+    return [{
+        "usuario": usuario,
+        "accion": "CREATE",
+        "entidad": entidad,
+        "entidad_id": row["id"],
+        "campo_modificado": None,
+        "valor_anterior": None,
+        "valor_nuevo": json.dumps(row, default=str),
+    } for row in rows]
+
+def _update_rows(usuario: str, entidad: str, target) -> list:
+    rows = []
+    state = inspect(target)
+    for attr in state.mapper.column_attrs:
+        hist = state.attrs[attr.key].history
+        if not hist.has_changes():
+            continue
+        old_val = hist.deleted[0] if hist.deleted else None
+        new_val = hist.added[0] if hist.added else state.dict.get(attr.key)
+        if old_val != new_val:
+            rows.append({
+                "usuario": usuario,
+                "accion": "UPDATE",
+                "entidad": entidad,
+                "entidad_id": target.id,
+                "campo_modificado": attr.key,
+                "valor_anterior": str(old_val),
+                "valor_nuevo": str(new_val),
+            })
+    return rows
+
+def collect_audit_rows(session: Session) -> list:
+    """
+    Filas de auditoría del flush en curso. En `after_flush` las colecciones
+    new/dirty y el historial de atributos aún reflejan el estado previo al
+    flush, pero los objetos nuevos ya tienen id asignado.
+    """
+    usuario = get_current_user_name()
+    rows = []
+    for target in session.new:
+        entidad = AUDITED_ENTITIES.get(type(target))
+        if entidad:
+            rows.append(_create_row(usuario, entidad, target))
+    for target in session.dirty:
+        entidad = AUDITED_ENTITIES.get(type(target))
+        if entidad:
+            rows.extend(_update_rows(usuario, entidad, target))
+    return rows
+
+def _after_flush(session, flush_context):
+    rows = collect_audit_rows(session)
+    if rows:
+        # Un único executemany por flush, en la misma transacción que los cambios
+        session.connection().execute(insert(AuditLog), rows)
+
 def register_audit_listeners():
-    @event.listens_for(Proceso, 'after_insert')
-    def receive_after_insert(mapper, connection, target):
-        usuario = get_current_user_name()
-        # Capturamos el estado inicial
-        data = {c.name: getattr(target, c.name) for c in target.__table__.columns}
-        
-        # Insertar log usando una conexión directa para no interferir con la sesión actual
-        connection.execute(
-            AuditLog.__table__.insert().values(
-                usuario=usuario,
-                accion="CREATE",
-                entidad="PROCESO",
-                entidad_id=target.id,
-                valor_nuevo=json.dumps(data, default=str)
-            )
-        )
-
-    @event.listens_for(Proceso, 'after_update')
-    def receive_after_update(mapper, connection, target):
-        usuario = get_current_user_name()
-        state = target.__mapper__.attrs
-        
-        for attr in state:
-            hist = attr.history
-            if hist.has_changes():
-                col_name = attr.key
-                old_val = hist.deleted[0] if hist.deleted else None
-                new_val = hist.added[0] if hist.added else getattr(target, col_name)
-                
-                if old_val != new_val:
-                    connection.execute(
-                        AuditLog.__table__.insert().values(
-                            usuario=usuario,
-                            accion="UPDATE",
-                            entidad="PROCESO",
-                            entidad_id=target.id,
-                            campo_modificado=col_name,
-                            valor_anterior=str(old_val),
-                            valor_nuevo=str(new_val)
-                        )
-                    )
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+def unregister_audit_listeners():
+    if event.contains(Session, "after_flush", _after_flush):
+        event.remove(Session, "after_flush", _after_flush)
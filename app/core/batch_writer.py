@@ -0,0 +1,117 @@
+"""
+Escritor en lote para tablas de bitácora (append-only).
+
+Las filas se encolan en memoria y un hilo en segundo plano las inserta con un
+único `executemany` por lote, cuando se alcanza `max_batch` filas o pasan
+`flush_interval` segundos. Así cada petición sólo paga un `put` en la cola en
+lugar de una transacción completa con fsync.
+
+- Contrapresión: si el buffer (`max_buffer`) está lleno, `enqueue` espera en
+  un hilo auxiliar a que haya espacio, sin bloquear el event loop.
+- Cierre: `stop()` drena el buffer y escribe lo pendiente antes de retornar.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import Table, insert
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("gahenax.batch_writer")
+
+class BatchWriter:
+    def __init__(self, engine: Engine, table: Table, max_batch: int = 500,
+                 flush_interval: float = 0.5, max_buffer: int = 10_000):
+        self.engine = engine
+        self.table = table
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_buffer)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "failed": 0, "backpressure_waits": 0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"batch-writer-{self.table.name}", daemon=True)
+                self._thread.start()
+
+    async def enqueue(self, row: Dict[str, Any]):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._stats["backpressure_waits"] += 1
+            await asyncio.to_thread(self._queue.put, row)
+        with self._lock:
+            self._stats["enqueued"] += 1
+
+    def _take_batch(self) -> list:
+        """Espera la primera fila y acumula hasta max_batch o flush_interval."""
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.table), batch)
+            with self._lock:
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+        except Exception as e:
+            # Una bitácora nunca debe tumbar la aplicación: se registra y se descarta el lote
+            logger.error(f"Error escribiendo {len(batch)} filas en {self.table.name}: {e}")
+            with self._lock:
+                self._stats["failed"] += len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+        self._drain()
+
+    def _drain(self):
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout: float = 10):
+        """Detiene el hilo escribiendo todo lo pendiente."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+        # Filas encoladas sin hilo activo (o tras un join agotado)
+        self._drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "buffered": self._queue.qsize()}
@@ -22,12 +22,74 @@ class Config:
     OPERATOR_TOKEN = os.getenv("OPERATOR_TOKEN", "operator-token")
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:8000,http://127.0.0.1:8000").split(",")
     
+    # Base de Datos
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./judicial_archive.db")
+    DB_PROFILE = os.getenv("DB_PROFILE", "production").lower()  # production | legacy
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # Login: pool de hashing y bloqueo por intentos fallidos
+    PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "64"))
+    LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+    LOGIN_FAILURE_WINDOW_SECONDS = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "300"))
+    LOGIN_LOCKOUT_SECONDS = int(os.getenv("LOGIN_LOCKOUT_SECONDS", "300"))
+
+    # Caché de autenticación (huéspedes, habitaciones y llaves del hotel)
+    AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+    # Bitácora de entradas del hotel (escritura en lote)
+    ENTRY_LOG_BATCH_SIZE = int(os.getenv("ENTRY_LOG_BATCH_SIZE", "500"))
+    ENTRY_LOG_FLUSH_SECONDS = float(os.getenv("ENTRY_LOG_FLUSH_SECONDS", "0.5"))
+    ENTRY_LOG_BUFFER_SIZE = int(os.getenv("ENTRY_LOG_BUFFER_SIZE", "10000"))
+
+    # Métricas: con varios workers, directorio compartido para sus instantáneas
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+    # Assets estáticos precomprimidos en memoria (desactivar al editar el frontend en caliente)
+    STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "true").lower() == "true"
+
     # Rutas de Archivos
     FILES_ROOT = os.getenv("FILES_ROOT", os.path.join(os.getcwd(), "storage"))
+    DOCUMENTS_ROOT = os.getenv("DOCUMENTS_ROOT", os.path.join(FILES_ROOT, "documents"))  # Base de Document.stored_filename
+
+    # Extracción de texto de documentos (app.extraction)
+    EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+    EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", "20"))
+    EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "120"))
+    EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", "1024"))
+    EXTRACTION_MAX_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", "5000000"))
     
     # Gemini
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+    # Cliente async de IA: llamadas simultáneas por worker y límite por usuario
+    AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+    AI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "10"))
+    AI_RATE_LIMIT_PER_MINUTE = float(os.getenv("AI_RATE_LIMIT_PER_MINUTE", "10"))
+    AI_RATE_LIMIT_BURST = int(os.getenv("AI_RATE_LIMIT_BURST", "5"))
+
+    # Caché persistente de respuestas de IA (compartida entre workers)
+    AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", os.path.join(FILES_ROOT, "ai_cache.db"))
+    AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    AI_CACHE_MAX_MB = int(os.getenv("AI_CACHE_MAX_MB", "100"))
+
+    # CRM de soporte (Oficina Central) y su bandeja de salida persistente
+    CRM_API_URL = os.getenv("CRM_API_URL", "http://127.0.0.1:5000")
+    CRM_API_KEY = os.getenv("CRM_API_KEY", "TKN-3D9A855B")
+    CRM_TIMEOUT_SECONDS = float(os.getenv("CRM_TIMEOUT_SECONDS", "10"))
+    CRM_MAX_CONNECTIONS = int(os.getenv("CRM_MAX_CONNECTIONS", "10"))
+    CRM_OUTBOX_PATH = os.getenv("CRM_OUTBOX_PATH", os.path.join(FILES_ROOT, "crm_outbox.db"))
+    CRM_BATCH_SIZE = int(os.getenv("CRM_BATCH_SIZE", "20"))
+    CRM_RETRY_BASE_SECONDS = float(os.getenv("CRM_RETRY_BASE_SECONDS", "2"))
+    CRM_RETRY_MAX_SECONDS = float(os.getenv("CRM_RETRY_MAX_SECONDS", "600"))
+    CRM_MAX_ATTEMPTS = int(os.getenv("CRM_MAX_ATTEMPTS", "50"))
+
     @classmethod
     def validate(cls):
         """Valida configuraciones críticas."""
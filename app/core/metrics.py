@@ -1,38 +1,295 @@
+import glob
+import json
+import os
+import re
+import threading
 import time
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+from .config import settings
+
+# Histograma log-lineal (estilo HDR): cada potencia de 2 se divide en
+# SUB_BUCKETS intervalos lineales, con error relativo < 1/SUB_BUCKETS.
+# Los valores se guardan en microsegundos y la memoria está acotada por el
+# rango (≈ 40 potencias x 16 sub-buckets), no por la cantidad de muestras.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Límites `le` (segundos) de la exposición Prometheus
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - SUB_BUCKETS
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Intervalo [inferior, superior) de valores del bucket."""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    lower = (SUB_BUCKETS + (index & (SUB_BUCKETS - 1))) << shift
+    return lower, lower + (1 << shift)
+
+class LatencyHistogram:
+    """Histograma de latencias en microsegundos. No es thread-safe por sí solo: TechMetrics lo protege."""
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, micros: int):
+        index = bucket_index(micros)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = max(self.max, micros)
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, round(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                lower, upper = bucket_bounds(index)
+                # Punto medio del bucket, sin salir del rango observado
+                return min(max((lower + upper - 1) // 2, self.min), self.max)
+        return self.max
+
+    def count_below(self, limit: int) -> int:
+        """Muestras con valor < limit (el bucket que contiene el límite no se cuenta)."""
+        return sum(n for index, n in self.buckets.items() if bucket_bounds(index)[1] <= limit)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_seconds": round(self.total / self.count / 1e6, 6) if self.count else 0,
+            "p50_seconds": self.percentile(50) / 1e6,
+            "p95_seconds": self.percentile(95) / 1e6,
+            "p99_seconds": self.percentile(99) / 1e6,
+            "max_seconds": self.max / 1e6,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"buckets": self.buckets, "count": self.count, "total": self.total,
+                "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        hist = cls()
+        hist.buckets = {int(k): v for k, v in data["buckets"].items()}
+        hist.count, hist.total, hist.min, hist.max = data["count"], data["total"], data["min"], data["max"]
+        return hist
+
+SeriesKey = Tuple[str, str, int]  # (método, plantilla de ruta, status)
 
 class TechMetrics:
+    """
+    Métricas del proceso. Las latencias se agrupan por (método, ruta, status),
+    usando la plantilla de la ruta (/api/procesos/{proceso_id}) para acotar la
+    cardinalidad.
+
+    Con varios workers, si METRICS_DIR está configurado cada worker vuelca
+    periódicamente su instantánea a METRICS_DIR/metrics_<pid>.json y los
+    reportes suman las de todos. El directorio debe vaciarse al desplegar.
+    """
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(TechMetrics, cls).__new__(cls)
             cls._instance.start_time = time.time()
-            cls._instance.request_count = 0
-            cls._instance.error_count = 0
             cls._instance.ia_tokens_estimate = 0
             cls._instance.last_latency = 0.0
+            cls._instance.sources = {}
+            cls._instance.series = {}
+            cls._instance.lock = threading.Lock()
+            cls._instance.metrics_dir = settings.METRICS_DIR
+            cls._instance.flush_interval = settings.METRICS_FLUSH_SECONDS
+            cls._instance._flusher_pid = None
         return cls._instance
 
-    def log_request(self, status_code: int, latency: float):
-        self.request_count += 1
-        if status_code >= 400:
-            self.error_count += 1
-        self.last_latency = latency
+    def register_source(self, name: str, source: Callable[[], Dict[str, Any]]):
+        """Agrega al reporte las métricas de un componente (pools, cachés...)."""
+        self.sources[name] = source
+
+    def log_request(self, status_code: int, latency: float, method: str = "GET", route: Optional[str] = None):
+        key = (method, route or UNMATCHED_ROUTE, status_code)
+        with self.lock:
+            hist = self.series.get(key)
+            if hist is None:
+                hist = self.series[key] = LatencyHistogram()
+            hist.record(int(latency * 1e6))
+            self.last_latency = latency
+        if self.metrics_dir and self._flusher_pid != os.getpid():
+            self._start_flusher()
 
     def log_ia_usage(self, estimated_tokens: int):
-        self.ia_tokens_estimate += estimated_tokens
+        with self.lock:
+            self.ia_tokens_estimate += estimated_tokens
+
+    # --- Varios workers ---
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.metrics_dir, f"metrics_{pid}.json")
+
+    def _local_snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "ia_tokens_estimated": self.ia_tokens_estimate,
+                "series": [[m, r, s, h.to_dict()] for (m, r, s), h in self.series.items()],
+            }
+
+    def flush(self):
+        """Escribe la instantánea de este worker (escritura atómica)."""
+        if not self.metrics_dir:
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._local_snapshot(), f)
+        os.replace(tmp, path)
+
+    def _start_flusher(self):
+        # Se arranca en el primer request de cada proceso: tras un fork el hilo del padre no existe
+        with self.lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        threading.Thread(target=run, name="metrics-flusher", daemon=True).start()
+
+    def _collect(self) -> Tuple[Dict[SeriesKey, LatencyHistogram], int]:
+        """Series y tokens sumando este worker y las instantáneas de los demás."""
+        merged: Dict[SeriesKey, LatencyHistogram] = {}
+        snapshots: List[Dict[str, Any]] = [self._local_snapshot()]
+        if self.metrics_dir:
+            own = self._snapshot_path(os.getpid())
+            for path in glob.glob(os.path.join(self.metrics_dir, "metrics_*.json")):
+                if path == own:
+                    continue
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        tokens = 0
+        for snapshot in snapshots:
+            tokens += snapshot["ia_tokens_estimated"]
+            for method, route, status, data in snapshot["series"]:
+                key = (method, route, status)
+                hist = LatencyHistogram.from_dict(data)
+                if key in merged:
+                    merged[key].merge(hist)
+                else:
+                    merged[key] = hist
+        return merged, tokens
+
+    # --- Reportes ---
 
     def get_report(self) -> Dict[str, Any]:
         uptime = time.time() - self.start_time
-        return {
+        series, tokens = self._collect()
+        overall = LatencyHistogram()
+        routes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        errors = 0
+        for (method, route, status), hist in series.items():
+            overall.merge(hist)
+            if status >= 400:
+                errors += hist.count
+            entry = routes.setdefault((method, route), {"hist": LatencyHistogram(), "errors": 0, "status": {}})
+            entry["hist"].merge(hist)
+            entry["status"][str(status)] = entry["status"].get(str(status), 0) + hist.count
+            if status >= 400:
+                entry["errors"] += hist.count
+
+        report = {
             "uptime_seconds": round(uptime, 2),
-            "total_requests": self.request_count,
-            "total_errors": self.error_count,
-            "error_rate": round(self.error_count / self.request_count, 4) if self.request_count > 0 else 0,
+            "total_requests": overall.count,
+            "total_errors": errors,
+            "error_rate": round(errors / overall.count, 4) if overall.count > 0 else 0,
             "last_latency_seconds": round(self.last_latency, 4),
-            "ia_tokens_estimated": self.ia_tokens_estimate,
+            "latency": overall.summary(),
+            "routes": [
+                {"method": method, "route": route, **entry["hist"].summary(),
+                 "errors": entry["errors"], "status": entry["status"]}
+                for (method, route), entry in sorted(routes.items(), key=lambda i: -i[1]["hist"].count)
+            ],
+            "ia_tokens_estimated": tokens,
             "status": "OPERATIONAL"
         }
+        for name, source in self.sources.items():
+            report[name] = source()
+        return report
+
+    def prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus (version 0.0.4)."""
+        series, tokens = self._collect()
+        lines = [
+            "# HELP http_request_duration_seconds Latencia de las peticiones HTTP.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), hist in sorted(series.items()):
+            labels = f'method="{_escape(method)}",route="{_escape(route)}",status="{status}"'
+            for le in PROMETHEUS_BUCKETS:
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} '
+                             f"{hist.count_below(int(le * 1e6))}")
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {hist.total / 1e6}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {hist.count}")
+        lines += [
+            "# HELP gahenax_uptime_seconds Segundos desde el arranque del proceso.",
+            "# TYPE gahenax_uptime_seconds gauge",
+            f"gahenax_uptime_seconds {round(time.time() - self.start_time, 2)}",
+            "# HELP gahenax_ia_tokens_estimated_total Tokens de IA estimados.",
+            "# TYPE gahenax_ia_tokens_estimated_total counter",
+            f"gahenax_ia_tokens_estimated_total {tokens}",
+        ]
+        # Valores numéricos de primer nivel de las fuentes registradas, como gauges
+        for name, source in self.sources.items():
+            for key, value in _numeric_items(source()):
+                metric = re.sub(r"[^a-zA-Z0-9_]", "_", f"gahenax_{name}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _numeric_items(data: Dict[str, Any]) -> Iterable[Tuple[str, float]]:
+    for key, value in data.items():
+        if isinstance(value, bool):
+            yield key, int(value)
+        elif isinstance(value, (int, float)):
+            yield key, value
 
 metrics = TechMetrics()
@@ -1,5 +1,6 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
 from .context import set_current_user
 from .metrics import metrics
 import time
@@ -7,29 +8,63 @@ import logging
 
 logger = logging.getLogger("gahenax.audit")
 
-class AuditMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-Gahenax-Version": settings.VERSION,
+}
+
+class AuditMiddleware:
+    """
+    Middleware ASGI puro: usuario en contexto, métricas, bitácora de auditoría y
+    cabeceras de seguridad. A diferencia de BaseHTTPMiddleware no crea tareas ni
+    streams intermedios, así que las respuestas en streaming pasan sin buffer.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # 1. Identificar usuario (simplificado, asumiendo que security ya validó o vendrá después)
         # Nota: En una arquitectura real, el middleware de auth debería ir ANTES que este
         # o este middleware debería extraer el usuario de los headers/cookies.
-        
-        user_name = request.headers.get("X-User-Name", "Sistema")
-        
+        user_name = "Sistema"
+        for key, value in scope["headers"]:
+            if key == b"x-user-name":
+                user_name = value.decode("latin-1")
+                break
+
         # Establecer en el contexto para los listeners de la base de datos
         set_current_user(user_name)
-        
+
+        status_code = 500
         start_time = time.time()
-        
-        # Procesar petición
-        response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        
-        # Log metrics
-        metrics.log_request(response.status_code, process_time)
-        
-        # Log de acción en consola/logs (Caja Negra de Red)
-        if request.url.path.startswith("/api"):
-            logger.info(f"AUDIT: {user_name} | {request.method} {request.url.path} | Status: {response.status_code} | Time: {process_time:.4f}s")
-        
-        return response
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
+
+        try:
+            # Procesar petición
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Tiempo hasta terminar de enviar la respuesta (incluye el cuerpo en streaming)
+            process_time = time.time() - start_time
+
+            # Log metrics (por plantilla de ruta, que Starlette deja en el scope al enrutar)
+            route = scope.get("route")
+            metrics.log_request(status_code, process_time, scope["method"], getattr(route, "path", None))
+
+            # Log de acción en consola/logs (Caja Negra de Red)
+            path = scope["path"]
+            if path.startswith("/api"):
+                logger.info(f"AUDIT: {user_name} | {scope['method']} {path} | Status: {status_code} | Time: {process_time:.4f}s")
@@ -0,0 +1,157 @@
+"""
+Pool acotado para hashing y verificación de contraseñas (pbkdf2_sha256).
+
+pbkdf2 es costoso por diseño; ejecutarlo dentro de un handler `async def`
+congela el event loop durante cada login. Aquí se ejecuta en un
+ThreadPoolExecutor propio (hashlib libera el GIL durante pbkdf2_hmac, así que
+los hilos sí aprovechan varios núcleos) con un límite de cola: si hay más
+trabajos pendientes de los permitidos se rechaza de inmediato en lugar de
+acumular latencia.
+
+También incluye una caché negativa por email: tras varios intentos fallidos
+en la ventana configurada, el email queda bloqueado temporalmente y los
+intentos se rechazan sin tocar la base de datos ni gastar CPU en pbkdf2.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from passlib.context import CryptContext
+
+from .config import settings
+
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+class PasswordPoolSaturated(Exception):
+    """La cola del pool de contraseñas está llena."""
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "wait_seconds": 0.0, "run_seconds": 0.0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+            return self._executor
+
+    def _timed(self, fn, enqueued_at: float, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._pending -= 1
+                self._stats["completed"] += 1
+                self._stats["wait_seconds"] += started - enqueued_at
+                self._stats["run_seconds"] += finished - started
+
+    async def _submit(self, fn, *args):
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise PasswordPoolSaturated()
+            self._pending += 1
+            self._stats["submitted"] += 1
+        future = executor.submit(self._timed, fn, time.perf_counter(), *args)
+        return await asyncio.wrap_future(future)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._submit(pwd_context.verify, password, password_hash)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(pwd_context.hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "submitted": self._stats["submitted"],
+                "completed": completed,
+                "rejected": self._stats["rejected"],
+                "avg_wait_ms": round(self._stats["wait_seconds"] / completed * 1000, 2) if completed else 0,
+                "avg_run_ms": round(self._stats["run_seconds"] / completed * 1000, 2) if completed else 0,
+            }
+
+class FailedLoginCache:
+    """
+    Contador de intentos fallidos por email con ventana fija y bloqueo temporal.
+    Acotado a `max_entries` emails (LRU) para no crecer sin límite ante ataques
+    con emails aleatorios.
+    """
+
+    def __init__(self, max_failures: int, window_seconds: int, lockout_seconds: int, max_entries: int = 10_000):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, list]" = OrderedDict()  # email -> [fallos, inicio_ventana, bloqueado_hasta]
+        self._lock = threading.Lock()
+        self.blocked_attempts = 0
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return email.strip().lower()
+
+    def retry_after(self, email: str) -> int:
+        """Segundos restantes de bloqueo para el email (0 si puede intentar)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(self._key(email))
+            if not entry or entry[2] <= now:
+                return 0
+            self.blocked_attempts += 1
+            return int(entry[2] - now) + 1
+
+    def record_failure(self, email: str):
+        key = self._key(email)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or now - entry[1] > self.window_seconds:
+                entry = [0, now, 0.0]
+            entry[0] += 1
+            if entry[0] >= self.max_failures:
+                entry[2] = now + self.lockout_seconds
+                entry[0], entry[1] = 0, now
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_success(self, email: str):
+        with self._lock:
+            self._entries.pop(self._key(email), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "tracked_emails": len(self._entries),
+                "locked_emails": sum(1 for e in self._entries.values() if e[2] > now),
+                "blocked_attempts": self.blocked_attempts,
+            }
+
+password_pool = PasswordPool(settings.PASSWORD_POOL_WORKERS, settings.PASSWORD_POOL_MAX_QUEUE)
+failed_logins = FailedLoginCache(
+    settings.LOGIN_MAX_FAILURES, settings.LOGIN_FAILURE_WINDOW_SECONDS, settings.LOGIN_LOCKOUT_SECONDS
+)
@@ -0,0 +1,50 @@
+"""
+Limitador por usuario con token bucket.
+
+Cada clave tiene un balde de `burst` fichas que se recarga a `rate_per_minute`
+por minuto; una petición consume una ficha. El estado es local al worker y la
+cantidad de baldes está acotada (se descartan los de uso más antiguo, que
+vuelven a empezar llenos).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+class TokenBucketLimiter:
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()  # clave -> [fichas, última recarga]
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, key: Hashable) -> float:
+        """Consume una ficha. Retorna 0 si se permite o los segundos a esperar."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            self._buckets.move_to_end(key)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return 0
+            self.limited += 1
+            return (1 - bucket[0]) / self.rate if self.rate else float("inf")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tracked_keys": len(self._buckets),
+                "allowed": self.allowed,
+                "limited": self.limited,
+            }
@@ -0,0 +1,214 @@
+"""
+Archivos estáticos precomprimidos servidos desde memoria.
+
+Al arrancar se leen los assets de texto (html, js, css, json, svg...) y se
+guardan en memoria junto con sus versiones gzip y brotli (esta última sólo si
+el paquete `brotli` está instalado). Cada petición negocia `Accept-Encoding`
+y responde sin tocar el disco ni comprimir.
+
+- ETag: hash SHA-256 del contenido; `If-None-Match` responde 304.
+- Cache-Control: los archivos con huella (`app.3f2a9c1b.js`, o `?v=<versión>`
+  igual a la actual) son `immutable` por un año; el resto se revalida
+  (`no-cache`).
+- HTML: las referencias a otros assets de la tienda (`/static/app.js`,
+  `hub.css`) se reescriben con `?v=<versión>`, así el navegador los cachea
+  sin revalidar y un cambio de contenido cambia la URL.
+
+Lo que no está en la tienda (descargas, binarios, archivos grandes) sigue
+sirviéndose con StaticFiles.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional: sin él se sirve gzip
+    brotli = None
+
+logger = logging.getLogger("gahenax.static")
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+# Por debajo de este tamaño comprimir no compensa las cabeceras
+MIN_COMPRESS_BYTES = 256
+MAX_ASSET_BYTES = 2 * 1024 * 1024
+# Preferencia del servidor cuando el cliente acepta varias codificaciones
+ENCODING_PREFERENCE = ("br", "gzip")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+ASSET_REF_RE = re.compile(r"""((?:src|href)\s*=\s*["'])([^"'?#]+)(["'])""", re.IGNORECASE)
+
+@dataclass
+class Asset:
+    body: bytes
+    content_type: str
+    digest: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)
+    fingerprinted: bool = False
+
+    @property
+    def version(self) -> str:
+        return self.digest[:12]
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        # Cada representación tiene su propia ETag fuerte
+        return f'"{self.version}-{encoding}"' if encoding else f'"{self.version}"'
+
+def guess_type(path: str) -> str:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """Versiones comprimidas que sí ahorran bytes."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return {}
+    encodings = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=11)
+    return {name: data for name, data in encodings.items() if len(data) < len(body)}
+
+def negotiate(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Elige la codificación según Accept-Encoding (respetando q=0). None = sin comprimir."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    available = set(available)
+    for name in ENCODING_PREFERENCE:
+        if name in available and accepted.get(name, accepted.get("*", 0)) > 0:
+            return name
+    return None
+
+class StaticAssetStore:
+    def __init__(self, directory: str, url_prefix: str = "/static", exclude: Iterable[str] = ("downloads",)):
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip("/")
+        self.exclude = set(exclude)
+        self._assets: Dict[str, Asset] = {}
+
+    def load(self) -> "StaticAssetStore":
+        """Lee y comprime el directorio. Los HTML van al final para poder versionar sus referencias."""
+        html = []
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = sorted(d for d in dirs if d not in self.exclude and not d.startswith("."))
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                key = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                content_type = guess_type(name)
+                if not content_type.startswith(COMPRESSIBLE_TYPES) or os.path.getsize(full_path) > MAX_ASSET_BYTES:
+                    continue
+                if content_type.startswith("text/html"):
+                    html.append((key, full_path))
+                else:
+                    self._assets[key] = self.load_file(full_path)
+        for key, full_path in html:
+            self._assets[key] = self.load_file(full_path, base_url=posixpath.dirname(f"{self.url_prefix}/{key}"))
+        stats = self.get_stats()
+        logger.info(f"Assets estáticos en memoria: {stats['files']} archivos, "
+                    f"{stats['raw_bytes']} -> {stats['gzip_bytes']} bytes (gzip)")
+        return self
+
+    def load_file(self, full_path: str, base_url: str = "") -> Asset:
+        with open(full_path, "rb") as f:
+            body = f.read()
+        content_type = guess_type(full_path)
+        if content_type.startswith("text/html"):
+            body = self.version_references(body, base_url)
+        return Asset(
+            body=body,
+            content_type=content_type,
+            digest=hashlib.sha256(body).hexdigest(),
+            encodings=compress(body),
+            fingerprinted=bool(FINGERPRINT_RE.search(full_path))
+        )
+
+    def version_references(self, body: bytes, base_url: str) -> bytes:
+        """Agrega ?v=<versión> a los src/href que apuntan a assets de la tienda."""
+        def replace(match):
+            url = match.group(2)
+            if ":" in url or url.startswith(("#", "//")):
+                return match.group(0)
+            resolved = url if url.startswith("/") else posixpath.normpath(posixpath.join(base_url or "/", url))
+            if not resolved.startswith(f"{self.url_prefix}/"):
+                return match.group(0)
+            asset = self._assets.get(resolved[len(self.url_prefix) + 1:])
+            if asset is None:
+                return match.group(0)
+            return f"{match.group(1)}{url}?v={asset.version}{match.group(3)}"
+
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return body
+        return ASSET_REF_RE.sub(replace, text).encode("utf-8")
+
+    def get(self, key: str) -> Optional[Asset]:
+        return self._assets.get(key)
+
+    def response(self, asset: Asset, scope: Scope) -> Response:
+        headers = Headers(scope=scope)
+        version = QueryParams(scope.get("query_string", b"")).get("v")
+        immutable = asset.fingerprinted or version == asset.version
+        encoding = negotiate(headers.get("accept-encoding", ""), asset.encodings)
+
+        response_headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or tags & {asset.etag(name) for name in (None, *asset.encodings)}:
+                return Response(status_code=304, headers=response_headers)
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        body = asset.encodings[encoding] if encoding else asset.body
+        return Response(body, headers=response_headers, media_type=asset.content_type)
+
+    def get_stats(self) -> Dict[str, Any]:
+        assets = self._assets.values()
+        return {
+            "files": len(self._assets),
+            "raw_bytes": sum(len(a.body) for a in assets),
+            "gzip_bytes": sum(len(a.encodings.get("gzip", a.body)) for a in assets),
+            "br_bytes": sum(len(a.encodings.get("br", a.body)) for a in assets) if brotli else None,
+        }
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles que responde desde la tienda en memoria y cae al disco para el resto."""
+
+    def __init__(self, *, store: StaticAssetStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            asset = self.store.get(path.replace(os.sep, "/"))
+            if asset is not None:
+                return self.store.response(asset, scope)
+        return await super().get_response(path, scope)
@@ -1,66 +1,374 @@
-import os
-import requests
+"""
+Servicio de Soporte y Reporte de Problemas (CRM).
+
+Los tickets no se envían dentro de la petición: se guardan primero en una
+bandeja de salida SQLite (`CRMOutbox`) y un entregador en segundo plano
+(`CRMDeliverer`) los manda a la Oficina Central (KING CRM) con un
+`httpx.AsyncClient` que reutiliza conexiones.
+
+- Durabilidad: un ticket aceptado ya está en disco; sobrevive a caídas del CRM
+  y a reinicios del servidor.
+- Reintentos: backoff exponencial con jitter. Los 4xx definitivos (payload o
+  token inválidos) no se reintentan.
+- Lotes: en cada ciclo se reclaman hasta `batch_size` tickets vencidos, se
+  envían en paralelo por el pool y sus resultados se guardan en una sola
+  transacción.
+- Varios workers: la reclamación es atómica y deja un plazo (lease); si un
+  worker muere a mitad de envío, el ticket vuelve a estar disponible. La
+  entrega es "al menos una vez": metadata.ticket_id permite deduplicar.
+"""
+import asyncio
 import json
-from typing import Dict, Any, Optional
 import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
 from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .core.config import settings
 
 # Configurar logger
 logger = logging.getLogger("chechy.crm")
 
+# 4xx que sí vale la pena reintentar
+RETRYABLE_STATUS = {408, 425, 429}
+# Espera máxima del entregador sin trabajo (revisa tickets de otros workers)
+IDLE_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crm_outbox (
+    ticket_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    user_email TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    remote_id TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_crm_outbox_due ON crm_outbox (status, next_attempt_at);
+"""
+
+class CRMError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
 class CRMService:
     """
-    Servicio de Soporte y Reporte de Problemas (CRM).
-    Envía incidencias en tiempo real al sistema de soporte (KING CRM).
+    Cliente async del CRM. El `httpx.AsyncClient` se crea al primer uso (dentro
+    del event loop que lo va a usar) y mantiene conexiones keep-alive.
     """
-    
-    def __init__(self, base_url: str = "http://127.0.0.1:5000", api_key: str = "TKN-3D9A855B"):
+
+    def __init__(self, base_url: str = settings.CRM_API_URL, api_key: str = settings.CRM_API_KEY,
+                 timeout: float = settings.CRM_TIMEOUT_SECONDS, max_connections: int = settings.CRM_MAX_CONNECTIONS):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
         # Usamos Bearer token como estándar del Hotel
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
-        
-    def check_health(self) -> bool:
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check_health(self) -> bool:
         """Verifica conexión con el backend de soporte (Office)"""
         try:
             # Note: Mock CRM might not have /status, usually we just check base URL or a known endpoint
-            response = requests.post(f"{self.base_url}/tickets", json={}, headers=self.headers, timeout=2)
-            # 400 is fine here as it means we hit the server but sent empty body
-            return response.status_code in [201, 400]
+            response = await self._http().post("/tickets", json={}, timeout=2)
+            # 400/422 is fine here as it means we hit the server but sent empty body
+            return response.status_code in [201, 400, 422]
         except Exception as e:
             logger.error(f"Error conectando a la Oficina (CRM): {e}")
             return False
 
-    def report_incident(self, ticket_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """
-        Envía un ticket de soporte al CRM.
-        """
-        endpoint = f"{self.base_url}/tickets" 
-        
-        payload = {
+    @staticmethod
+    def build_payload(ticket_data: Dict[str, Any], ticket_id: Optional[str] = None) -> Dict[str, Any]:
+        return {
             "subject": ticket_data.get("subject", "Problema sin asunto"),
             "description": ticket_data.get("description", ticket_data.get("body", "")),
             "priority": ticket_data.get("priority", "medium"),
             "user_email": ticket_data.get("user_email", "guest@gahenax.com"),
             "metadata": {
                 "source": "ChechyLegis-Room-101",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                "ticket_id": ticket_id
             }
         }
-        
+
+    async def send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Envía un payload ya armado. Lanza CRMError si el CRM no lo acepta."""
         try:
-            response = requests.post(endpoint, json=payload, headers=self.headers, timeout=10)
-            if response.status_code in [200, 201]:
+            response = await self._http().post("/tickets", json=payload)
+        except httpx.HTTPError as e:
+            raise CRMError(f"{type(e).__name__}: {e}")
+        if response.status_code in [200, 201]:
+            # Un 2xx ya es una entrega: un cuerpo inesperado sólo deja el ticket sin id remoto
+            try:
                 res_data = response.json()
-                logger.info(f"Reporte enviado a Oficina Central: {res_data.get('id')}")
-                return res_data
-            else:
-                logger.error(f"Fallo reporte a Oficina: {response.status_code} - {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"Excepción en reporte a Oficina: {e}")
+            except ValueError:
+                res_data = None
+            return res_data if isinstance(res_data, dict) else {}
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUS
+        raise CRMError(f"{response.status_code} - {response.text[:500]}", retryable=retryable)
+
+    async def report_incident(self, ticket_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Envía un ticket de soporte al CRM de inmediato, sin pasar por la bandeja.
+        """
+        try:
+            res_data = await self.send(self.build_payload(ticket_data))
+        except CRMError as e:
+            logger.error(f"Fallo reporte a Oficina: {e}")
             return None
+        logger.info(f"Reporte enviado a Oficina Central: {res_data.get('id')}")
+        return res_data
+
+class CRMOutbox:
+    """Bandeja de salida de tickets en SQLite (WAL, commit con fsync)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Conexión perezosa: importar el router no crea el archivo
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FULL: un ticket aceptado no se pierde ni con un corte de luz
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, ticket_data: Dict[str, Any]) -> str:
+        ticket_id = f"SUP-{uuid.uuid4().hex[:12]}"
+        payload = CRMService.build_payload(ticket_data, ticket_id)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO crm_outbox (ticket_id, payload, user_email, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (ticket_id, json.dumps(payload, ensure_ascii=False), payload["user_email"], now, now)
+            )
+            conn.commit()
+        return ticket_id
+
+    def claim_due(self, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Reclama hasta `limit` tickets vencidos corriendo su próximo intento
+        `lease_seconds` hacia adelante, en una sola sentencia (atómica entre workers).
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "UPDATE crm_outbox SET next_attempt_at = ? WHERE ticket_id IN ("
+                "  SELECT ticket_id FROM crm_outbox WHERE status = 'pending' AND next_attempt_at <= ?"
+                "  ORDER BY next_attempt_at LIMIT ?"
+                ") RETURNING ticket_id, payload, attempts",
+                (now + lease_seconds, now, limit)
+            ).fetchall()
+            conn.commit()
+        return [{"ticket_id": r[0], "payload": json.loads(r[1]), "attempts": r[2]} for r in rows]
+
+    def record(self, sent: List[tuple], failed: List[tuple]):
+        """
+        Guarda los resultados de un lote en una transacción.
+        sent: (ticket_id, remote_id); failed: (ticket_id, error, retry_at o None si es definitivo).
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "UPDATE crm_outbox SET status = 'sent', remote_id = ?, sent_at = ?, "
+                "attempts = attempts + 1, last_error = NULL WHERE ticket_id = ?",
+                [(remote_id, now, ticket_id) for ticket_id, remote_id in sent]
+            )
+            conn.executemany(
+                "UPDATE crm_outbox SET status = ?, last_error = ?, next_attempt_at = ?, "
+                "attempts = attempts + 1 WHERE ticket_id = ?",
+                [("pending" if retry_at else "failed", error, retry_at or now, ticket_id)
+                 for ticket_id, error, retry_at in failed]
+            )
+            conn.commit()
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT MIN(next_attempt_at) FROM crm_outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT ticket_id, user_email, status, attempts, last_error, remote_id, created_at, sent_at "
+                "FROM crm_outbox WHERE ticket_id = ?", (ticket_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("ticket_id", "user_email", "status", "attempts", "last_error", "remote_id", "created_at", "sent_at")
+        return dict(zip(keys, row))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._conn is None:
+                return {}
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM crm_outbox GROUP BY status"
+            ).fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM crm_outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0,
+        }
+
+class CRMDeliverer:
+    """Tarea asyncio que vacía la bandeja de salida hacia el CRM."""
+
+    def __init__(self, crm: CRMService, outbox: CRMOutbox, batch_size: int = settings.CRM_BATCH_SIZE,
+                 base_delay: float = settings.CRM_RETRY_BASE_SECONDS, max_delay: float = settings.CRM_RETRY_MAX_SECONDS,
+                 max_attempts: int = settings.CRM_MAX_ATTEMPTS):
+        self.crm = crm
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        # Un envío colgado no debe dejar el ticket reclamado para siempre
+        self.lease_seconds = crm.timeout * 2 + 30
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stats = {"delivered": 0, "retries": 0, "dropped": 0, "batches": 0}
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="crm-deliverer")
+
+    def notify(self):
+        """Despierta al entregador tras encolar un ticket."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.crm.aclose()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.deliver_batch()
+                if claimed == self.batch_size:
+                    continue  # Quedan tickets vencidos: siguiente lote sin esperar
+                next_due = await asyncio.to_thread(self.outbox.next_due)
+            except Exception as e:
+                # El entregador nunca debe morir: se registra y se reintenta más tarde
+                logger.error(f"Error en el entregador del CRM: {e}")
+                next_due = None
+            wait = IDLE_SECONDS if next_due is None else min(IDLE_SECONDS, max(0.0, next_due - time.time()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def deliver_batch(self) -> int:
+        """Envía un lote de tickets vencidos. Retorna cuántos se reclamaron."""
+        entries = await asyncio.to_thread(self.outbox.claim_due, self.batch_size, self.lease_seconds)
+        if not entries:
+            return 0
+        results = await asyncio.gather(*(self._send(entry) for entry in entries), return_exceptions=True)
+
+        sent, failed = [], []
+        now = time.time()
+        for entry, result in zip(entries, results):
+            if isinstance(result, BaseException):
+                # Un error inesperado cuenta como intento fallido; no descarta el resto del lote
+                remote_id, error = None, CRMError(f"{type(result).__name__}: {result}")
+            else:
+                remote_id, error = result
+            if error is None:
+                sent.append((entry["ticket_id"], remote_id))
+                continue
+            attempts = entry["attempts"] + 1
+            if error.retryable and attempts < self.max_attempts:
+                failed.append((entry["ticket_id"], str(error), now + self.backoff(attempts)))
+                self._stats["retries"] += 1
+            else:
+                logger.error(f"Ticket {entry['ticket_id']} descartado tras {attempts} intentos: {error}")
+                failed.append((entry["ticket_id"], str(error), None))
+                self._stats["dropped"] += 1
+        await asyncio.to_thread(self.outbox.record, sent, failed)
+        self._stats["delivered"] += len(sent)
+        self._stats["batches"] += 1
+        if sent:
+            logger.info(f"{len(sent)} reportes enviados a Oficina Central")
+        return len(entries)
+
+    async def _send(self, entry: Dict[str, Any]):
+        try:
+            res_data = await self.crm.send(entry["payload"])
+        except CRMError as e:
+            return None, e
+        return res_data.get("id"), None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, **self.outbox.get_stats()}
+
+# Instancias compartidas por el router de soporte
+crm_client = CRMService()
+crm_outbox = CRMOutbox(settings.CRM_OUTBOX_PATH)
+crm_deliverer = CRMDeliverer(crm_client, crm_outbox)
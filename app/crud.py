@@ -1,7 +1,11 @@
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import models, schemas, search_index
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Tuple
+import base64
+import binascii
+import html
 import json
 
 def get_proceso(db: Session, proceso_id: int):
@@ -10,30 +14,122 @@ def get_proceso(db: Session, proceso_id: int):
 def get_proceso_by_numero(db: Session, numero: str):
     return db.query(models.Proceso).filter(models.Proceso.numero_proceso == numero, models.Proceso.deleted_at == None).first()
 
-def get_procesos(db: Session, skip: int = 0, limit: int = 100, 
-                 fecha_desde: Optional[date] = None, 
-                 fecha_hasta: Optional[date] = None,
-                 estado: Optional[models.EstadoProceso] = None,
-                 numero_proceso: Optional[str] = None,
-                 license_mode: str = "FREE"):
-    query = db.query(models.Proceso).filter(models.Proceso.deleted_at == None)
+def procesos_filters(fecha_desde: Optional[date] = None,
+                     fecha_hasta: Optional[date] = None,
+                     estado: Optional[models.EstadoProceso] = None,
+                     numero_proceso: Optional[str] = None,
+                     license_mode: str = "FREE") -> list:
+    """Condiciones WHERE comunes del listado (ORM) y de la exportación (Core)."""
+    filters = [models.Proceso.deleted_at == None]
     
     if license_mode == "FREE":
         from datetime import datetime, timedelta
         limit_date = datetime.now().date() - timedelta(days=30)
-        query = query.filter(models.Proceso.fecha_radicacion >= limit_date)
+        filters.append(models.Proceso.fecha_radicacion >= limit_date)
     
     if fecha_desde:
-        query = query.filter(models.Proceso.fecha_radicacion >= fecha_desde)
+        filters.append(models.Proceso.fecha_radicacion >= fecha_desde)
     if fecha_hasta:
-        query = query.filter(models.Proceso.fecha_radicacion <= fecha_hasta)
+        filters.append(models.Proceso.fecha_radicacion <= fecha_hasta)
     if estado:
-        query = query.filter(models.Proceso.estado == estado)
+        filters.append(models.Proceso.estado == estado)
     if numero_proceso:
-        query = query.filter(models.Proceso.numero_proceso.contains(numero_proceso))
-        
+        filters.append(models.Proceso.numero_proceso.contains(numero_proceso))
+    return filters
+
+def _procesos_query(db: Session,
+                    fecha_desde: Optional[date] = None,
+                    fecha_hasta: Optional[date] = None,
+                    estado: Optional[models.EstadoProceso] = None,
+                    numero_proceso: Optional[str] = None,
+                    license_mode: str = "FREE"):
+    return db.query(models.Proceso).filter(
+        *procesos_filters(fecha_desde, fecha_hasta, estado, numero_proceso, license_mode)
+    )
+
+def get_procesos(db: Session, skip: int = 0, limit: int = 100, 
+                 fecha_desde: Optional[date] = None, 
+                 fecha_hasta: Optional[date] = None,
+                 estado: Optional[models.EstadoProceso] = None,
+                 numero_proceso: Optional[str] = None,
+                 license_mode: str = "FREE"):
+    query = _procesos_query(db, fecha_desde, fecha_hasta, estado, numero_proceso, license_mode)
     return query.offset(skip).limit(limit).all()
 
+def encode_cursor(fecha_radicacion: date, proceso_id: int) -> str:
+    payload = json.dumps([fecha_radicacion.isoformat(), proceso_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Decodifica un token de continuación. Lanza ValueError si es inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fecha, proceso_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return date.fromisoformat(fecha), int(proceso_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Cursor de paginación inválido") from e
+
+def get_procesos_page(db: Session, cursor: Optional[str] = None, limit: int = 100,
+                      fecha_desde: Optional[date] = None,
+                      fecha_hasta: Optional[date] = None,
+                      estado: Optional[models.EstadoProceso] = None,
+                      numero_proceso: Optional[str] = None,
+                      license_mode: str = "FREE") -> Tuple[List[models.Proceso], Optional[str]]:
+    """
+    Paginación por cursor (keyset) ordenada por (fecha_radicacion, id).
+    El costo de cada página es constante: usa ix_procesos_fecha_radicacion_id
+    en lugar de recorrer y descartar las filas anteriores como OFFSET.
+    Retorna la página y el cursor de la siguiente (None si no hay más).
+    """
+    query = _procesos_query(db, fecha_desde, fecha_hasta, estado, numero_proceso, license_mode)
+    if cursor:
+        last_fecha, last_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(models.Proceso.fecha_radicacion, models.Proceso.id) > tuple_(last_fecha, last_id)
+        )
+    rows = query.order_by(models.Proceso.fecha_radicacion, models.Proceso.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].fecha_radicacion, rows[-1].id)
+    return rows, next_cursor
+
+def _highlight(snippet: Optional[str]) -> Optional[str]:
+    """Escapa el snippet como HTML y sólo entonces marca las coincidencias con <mark>."""
+    if snippet is None:
+        return None
+    return (html.escape(snippet)
+            .replace(search_index.SNIPPET_OPEN, "<mark>")
+            .replace(search_index.SNIPPET_CLOSE, "</mark>"))
+
+def search_procesos(db: Session, q: str, limit: int = 20,
+                    license_mode: str = "FREE") -> List[Tuple[models.Proceso, float, Optional[str]]]:
+    """
+    Búsqueda de texto completo sobre número, partes, observaciones y texto de
+    documentos vinculados. Retorna [(proceso, rank, snippet)] ordenado por relevancia.
+    """
+    min_fecha = None
+    if license_mode == "FREE":
+        from datetime import datetime, timedelta
+        min_fecha = datetime.now().date() - timedelta(days=30)
+
+    if db.get_bind().dialect.name != "sqlite":
+        # Respaldo sin FTS5: LIKE sobre las columnas del proceso
+        pattern = f"%{q}%"
+        query = _procesos_query(db, fecha_desde=min_fecha, license_mode="PRO").filter(
+            models.Proceso.numero_proceso.ilike(pattern)
+            | models.Proceso.partes.ilike(pattern)
+            | models.Proceso.observaciones.ilike(pattern)
+        )
+        return [(p, 0.0, None) for p in query.limit(limit).all()]
+
+    hits = search_index.search(db, q, limit, min_fecha)
+    if not hits:
+        return []
+    by_id = {p.id: p for p in db.query(models.Proceso).filter(models.Proceso.id.in_([h[0] for h in hits]))}
+    return [(by_id[pid], rank, _highlight(snippet)) for pid, rank, snippet in hits if pid in by_id]
+
 def create_proceso(db: Session, proceso: schemas.ProcesoCreate):
     # Idempotencia: Verificar si ya existe un proceso con este número
     existing = get_proceso_by_numero(db, proceso.numero_proceso)
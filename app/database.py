@@ -1,14 +1,98 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./judicial_archive.db"
+from .core.config import settings
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Perfil de producción: WAL deja que los lectores avancen mientras un
+    escritor confirma, y synchronous=NORMAL es seguro en modo WAL.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def build_engine(url: str = None, profile: str = None):
+    """
+    Construye el motor según el perfil configurado (DB_PROFILE).
+    - production: pragmas de concurrencia en cada conexión y pool dimensionado.
+    - legacy: motor sin ajustes, equivalente al comportamiento anterior.
+    """
+    url = url or SQLALCHEMY_DATABASE_URL
+    profile = profile or settings.DB_PROFILE
+
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW, pool_pre_ping=True
+        )
+
+    connect_args = {"check_same_thread": False}
+    if profile != "production" or _is_memory_sqlite(url):
+        return create_engine(url, connect_args=connect_args)
+
+    # El pool acompaña al threadpool de Starlette (40 hilos por defecto):
+    # 10 conexiones persistentes + 30 de desborde antes de hacer esperar.
+    connect_args["timeout"] = settings.DB_BUSY_TIMEOUT_MS / 1000
+    new_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+# Drivers asíncronos equivalentes a cada URL síncrona
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+")[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver asíncrono configurado para '{backend}'")
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+def build_async_engine(url: str = None, profile: str = None):
+    """Motor asíncrono (aiosqlite/asyncpg) con el mismo perfil que build_engine."""
+    url = url or SQLALCHEMY_DATABASE_URL
+    profile = profile or settings.DB_PROFILE
+    async_url = to_async_url(url)
+
+    if not url.startswith("sqlite"):
+        return create_async_engine(
+            async_url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW, pool_pre_ping=True
+        )
+    if profile != "production" or _is_memory_sqlite(url):
+        return create_async_engine(async_url)
+
+    new_engine = create_async_engine(
+        async_url,
+        connect_args={"timeout": settings.DB_BUSY_TIMEOUT_MS / 1000},
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = build_async_engine()
+# expire_on_commit=False: los objetos se serializan después del commit sin I/O implícito
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,3 +101,28 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def sync_schema(bind=engine):
+    """
+    Crea las tablas faltantes y los índices declarados en los modelos.
+    `create_all` omite las columnas e índices nuevos de tablas que ya existían,
+    así que para bases de datos instaladas previamente se agregan aparte las
+    columnas nullable faltantes (ALTER TABLE) y los índices (checkfirst).
+    """
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable and column.server_default is None:
+                with bind.begin() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                    ))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
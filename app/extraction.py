@@ -0,0 +1,276 @@
+"""
+Pipeline de extracción de texto para `Document` (PDF y DOCX).
+
+Toma los documentos en estado PENDING, los procesa en un ProcessPoolExecutor
+y actualiza `extracted_text`, `extraction_status` y `error_message` en lotes
+(un UPDATE executemany por lote). Cada lote se vincula luego a sus procesos
+con `app.linker`.
+
+- El texto se extrae página a página (PDF) o por bloques de párrafos (DOCX),
+  sin construir el documento completo en memoria.
+- Cada documento tiene un tiempo límite (temporizador del proceso hijo) y cada
+  worker un tope de memoria (RLIMIT_AS) donde el sistema lo soporta.
+- Sin texto extraíble (p. ej. escaneos sin OCR) o con texto truncado por
+  EXTRACTION_MAX_CHARS, el documento queda en NEEDS_REVIEW.
+- Si un worker muere (OOM, crash de la librería), sólo falla el documento que
+  lo tumbó: los demás afectados se reintentan de a uno en un pool nuevo.
+
+Uso: python -m app.extraction [--once] [--workers 4] [--batch-size 20]
+"""
+import argparse
+import io
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models
+from .core.config import settings
+from .linker import linker
+
+try:
+    import resource
+except ImportError:  # Windows: sin tope de memoria por proceso
+    resource = None
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# Párrafos de DOCX agrupados como una "página" lógica
+DOCX_PARAGRAPHS_PER_PAGE = 50
+
+class ExtractionTimeout(Exception):
+    pass
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    """Texto de cada página del PDF; pdfminer interpreta una página a la vez."""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    rsrcmgr = PDFResourceManager()
+    buffer = io.StringIO()
+    device = TextConverter(rsrcmgr, buffer, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    try:
+        with open(path, "rb") as f:
+            for page in PDFPage.get_pages(f):
+                interpreter.process_page(page)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        device.close()
+
+def iter_docx_pages(path: str) -> Iterator[str]:
+    """Texto del DOCX en bloques de DOCX_PARAGRAPHS_PER_PAGE párrafos (DOCX no tiene páginas)."""
+    import docx
+
+    block = []
+    for paragraph in docx.Document(path).paragraphs:
+        block.append(paragraph.text)
+        if len(block) == DOCX_PARAGRAPHS_PER_PAGE:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+EXTRACTORS = {PDF_MIME: iter_pdf_pages, DOCX_MIME: iter_docx_pages}
+
+def _on_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+def _init_worker(memory_mb: int):
+    """Inicializador de cada proceso del pool: aplica el tope de memoria."""
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def extract_document(doc_id: int, path: str, mime_type: str, timeout: float, max_chars: int) -> dict:
+    """
+    Extrae el texto de un documento (se ejecuta en el proceso hijo).
+    Retorna la fila de actualización para `documents` más el número de páginas.
+    """
+    result = {"id": doc_id, "extracted_text": None, "error_message": None, "pages": 0}
+    extractor = EXTRACTORS.get(mime_type)
+    if extractor is None:
+        return {**result, "extraction_status": models.ExtractionStatus.FAILED,
+                "error_message": f"Tipo no soportado: {mime_type}"}
+
+    use_timer = hasattr(signal, "setitimer")
+    if use_timer:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    deadline = time.monotonic() + timeout
+    parts, chars, truncated = [], 0, False
+    try:
+        for page_text in extractor(path):
+            result["pages"] += 1
+            if chars + len(page_text) > max_chars:
+                parts.append(page_text[:max_chars - chars])
+                truncated = True
+                break
+            parts.append(page_text)
+            chars += len(page_text)
+            # Respaldo sin SIGALRM: el límite se revisa entre páginas
+            if time.monotonic() > deadline:
+                raise ExtractionTimeout()
+    except ExtractionTimeout:
+        return {**result, "extraction_status": models.ExtractionStatus.FAILED,
+                "error_message": f"Tiempo de extracción agotado ({timeout:.0f}s, {result['pages']} páginas)"}
+    except MemoryError:
+        return {**result, "extraction_status": models.ExtractionStatus.FAILED,
+                "error_message": "Límite de memoria de extracción excedido"}
+    except Exception as e:
+        return {**result, "extraction_status": models.ExtractionStatus.FAILED,
+                "error_message": f"{type(e).__name__}: {e}"}
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    text = "".join(parts).strip()
+    if not text:
+        return {**result, "extraction_status": models.ExtractionStatus.NEEDS_REVIEW,
+                "error_message": "Sin texto extraíble (¿documento escaneado?)"}
+    if truncated:
+        return {**result, "extracted_text": text, "extraction_status": models.ExtractionStatus.NEEDS_REVIEW,
+                "error_message": f"Texto truncado a {max_chars} caracteres"}
+    return {**result, "extracted_text": text, "extraction_status": models.ExtractionStatus.OK}
+
+def _save_results(db: Session, results: List[dict]):
+    if not results:
+        return
+    rows = [{k: v for k, v in r.items() if k != "pages"} for r in results]
+    # UPDATE por clave primaria en lote (executemany)
+    db.execute(update(models.Document), rows)
+    db.commit()
+    # Vinculación automática por número de proceso del texto recién extraído
+    linker.link_documents(db, [r["id"] for r in results if r["extracted_text"]])
+
+def run_pending(session_factory: Callable[[], Session], workers: int = None, batch_size: int = None,
+                documents_root: str = None, timeout: float = None, memory_mb: int = None,
+                max_chars: int = None, limit: Optional[int] = None) -> dict:
+    """
+    Procesa los documentos PENDING hasta agotarlos (o hasta `limit`).
+    Retorna estadísticas: documentos, páginas, segundos y conteo por estado.
+    """
+    workers = workers or settings.EXTRACTION_WORKERS
+    batch_size = batch_size or settings.EXTRACTION_BATCH_SIZE
+    documents_root = documents_root or settings.DOCUMENTS_ROOT
+    timeout = timeout or settings.EXTRACTION_TIMEOUT_SECONDS
+    memory_mb = settings.EXTRACTION_MEMORY_MB if memory_mb is None else memory_mb
+    max_chars = max_chars or settings.EXTRACTION_MAX_CHARS
+
+    stats = {"documents": 0, "pages": 0, "seconds": 0.0, "by_status": {}}
+    t0 = time.perf_counter()
+    db = session_factory()
+    last_id = 0
+    try:
+        while limit is None or stats["documents"] < limit:
+            # Un bloque de trabajo por vuelta; se recorre por id para no reintentar
+            # en la misma ejecución documentos que fallen al guardar
+            chunk = batch_size * workers * 4
+            if limit is not None:
+                chunk = min(chunk, limit - stats["documents"])
+            pending = db.query(models.Document.id, models.Document.stored_filename, models.Document.mime_type).filter(
+                models.Document.extraction_status == models.ExtractionStatus.PENDING,
+                models.Document.id > last_id
+            ).order_by(models.Document.id).limit(chunk).all()
+            if not pending:
+                break
+            last_id = pending[-1].id
+
+            results = _run_chunk(pending, workers, documents_root, timeout, memory_mb, max_chars, batch_size, db)
+            for r in results:
+                stats["documents"] += 1
+                stats["pages"] += r["pages"]
+                status = r["extraction_status"].value
+                stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
+    finally:
+        db.close()
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+def _new_pool(workers: int, memory_mb: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(memory_mb,))
+
+def _crashed(doc_id: int) -> dict:
+    return {"id": doc_id, "extracted_text": None, "pages": 0,
+            "extraction_status": models.ExtractionStatus.FAILED,
+            "error_message": "El proceso de extracción terminó inesperadamente"}
+
+def _run_chunk(pending, workers, documents_root, timeout, memory_mb, max_chars, batch_size, db) -> List[dict]:
+    done, batch = [], []
+
+    def submit(pool, doc):
+        path = os.path.join(documents_root, doc.stored_filename)
+        return pool.submit(extract_document, doc.id, path, doc.mime_type, timeout, max_chars)
+
+    def collect(result):
+        batch.append(result)
+        if len(batch) >= batch_size:
+            _save_results(db, batch)
+            done.extend(batch)
+            batch.clear()
+
+    # Si un worker muere (p. ej. el SO lo mató por memoria) el pool queda
+    # inservible y todas sus tareas sin terminar fallan con BrokenProcessPool,
+    # sin indicar qué documento lo causó
+    unfinished = []
+    with _new_pool(workers, memory_mb) as pool:
+        submitted = {submit(pool, doc): doc for doc in pending}
+        for future in as_completed(submitted):
+            try:
+                collect(future.result())
+            except BrokenProcessPool:
+                unfinished.append(submitted[future])
+
+    # Los afectados se reintentan de a uno: sólo falla el que vuelve a tumbar su worker
+    pool = None
+    try:
+        for doc in sorted(unfinished, key=lambda d: d.id):
+            if pool is None:
+                pool = _new_pool(1, memory_mb)
+            try:
+                result = submit(pool, doc).result()
+            except BrokenProcessPool:
+                result = _crashed(doc.id)
+                pool.shutdown()
+                pool = None
+            collect(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    _save_results(db, batch)
+    done.extend(batch)
+    return done
+
+def main():
+    from .database import SessionLocal, sync_schema
+
+    parser = argparse.ArgumentParser(description="Extrae el texto de los documentos PENDING")
+    parser.add_argument("--workers", type=int, default=settings.EXTRACTION_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.EXTRACTION_BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina")
+    parser.add_argument("--interval", type=float, default=30, help="Segundos entre sondeos")
+    args = parser.parse_args()
+
+    sync_schema()
+    while True:
+        stats = run_pending(SessionLocal, workers=args.workers, batch_size=args.batch_size)
+        if stats["documents"]:
+            rate = stats["pages"] / stats["seconds"] if stats["seconds"] else 0
+            print(f"📄 {stats['documents']} documentos, {stats['pages']} páginas "
+                  f"({rate:.1f} pág/s) {stats['by_status']}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,94 @@ Proporciona búsqueda semántica y análisis de lenguaje natural
 """
 
 import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import json
 import logging
-from functools import lru_cache
 from datetime import datetime
 
+from .core.ai_cache import ai_cache, MISSING
+from .core.config import settings
+from .core.metrics import metrics
+
 logger = logging.getLogger("chechy.gemini")
 
+MODEL_NAME = 'gemini-1.5-flash'
+
+def _strip_code_fence(text: str) -> str:
+    if text.startswith("```json"):
+        return text[7:-3].strip()
+    if text.startswith("```"):
+        return text[3:-3].strip()
+    return text
+
+def _token_count(response, prompt: str, text: str) -> int:
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None) if usage else None
+    # Sin metadatos de uso: estimación de ~4 caracteres por token
+    return total if total else (len(prompt) + len(text)) // 4
+
+class AIServiceSaturated(Exception):
+    """Se agotó la espera por un turno de llamada concurrente a la API."""
+
 class GeminiService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_concurrency: int = None, queue_timeout: float = None):
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model_name = MODEL_NAME
+        self.model = genai.GenerativeModel(MODEL_NAME)
+        # Tope global (por worker) de llamadas async simultáneas a la API
+        self.max_concurrency = max_concurrency or settings.AI_MAX_CONCURRENCY
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.AI_QUEUE_TIMEOUT_SECONDS
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._rejected = 0
+
+    @asynccontextmanager
+    async def _slot(self):
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise AIServiceSaturated()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+        }
+
+    def _generate(self, prompt: str, parse: Callable[[str], Any] = None) -> Any:
+        """
+        Llama al modelo pasando por la caché persistente. La respuesta sólo se
+        guarda si `parse` la acepta: los errores (excepciones de la API o JSON
+        inválido) se propagan y nunca quedan cacheados.
+        """
+        parse = parse or (lambda text: text)
+        cached = ai_cache.get(self.model_name, prompt)
+        if cached is not MISSING:
+            return parse(cached)
+
+        response = self.model.generate_content(prompt)
+        text = response.text.strip()
+        result = parse(text)
+        tokens = _token_count(response, prompt, text)
+        metrics.log_ia_usage(tokens)
+        if text:
+            ai_cache.set(self.model_name, prompt, text, tokens)
+        return result
     
     def parse_natural_query(self, query: str, procesos: List[Dict]) -> Dict[str, Any]:
         """
@@ -31,19 +107,12 @@ Responde SOLO con el JSON.
 """
         
         try:
-            response = self.model.generate_content(prompt)
             # Remove markdown code blocks if present
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3].strip()
-            elif text.startswith("```"):
-                text = text[3:-3].strip()
-            return json.loads(text)
+            return self._generate(prompt, lambda text: json.loads(_strip_code_fence(text)))
         except Exception as e:
             logger.error(f"Error en parse_natural_query: {e}")
             return {"filtros": {}, "interpretacion": "Error al interpretar", "sugerencias": []}
     
-    @lru_cache(maxsize=128)
     def analyze_proceso(self, proceso_json: str) -> Dict[str, Any]:
         """
         Analiza un proceso y genera insights automáticos.
@@ -52,11 +121,7 @@ Responde SOLO con el JSON.
         prompt = f"Analiza este proceso judicial y devuelve JSON: {proceso_json}"
         
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3].strip()
-            return json.loads(text)
+            return self._generate(prompt, lambda text: json.loads(_strip_code_fence(text)))
         except Exception as e:
             logger.error(f"Error en analyze_proceso: {e}")
             return {"resumen": "Error", "alertas": []}
@@ -67,8 +132,61 @@ Responde SOLO con el JSON.
         """
         prompt = f"Asistente Legal: {message}"
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return self._generate(prompt)
         except Exception as e:
             logger.error(f"Error en chat_assistant: {e}")
             return "Lo siento, hubo un error."
+
+    # --- Ruta async (no ocupa un hilo del threadpool mientras espera a la API) ---
+
+    async def _generate_async(self, prompt: str, parse: Callable[[str], Any] = None) -> Any:
+        """Versión async de `_generate`: misma caché, limitada por el semáforo global."""
+        parse = parse or (lambda text: text)
+        cached = await asyncio.to_thread(ai_cache.get, self.model_name, prompt)
+        if cached is not MISSING:
+            return parse(cached)
+
+        async with self._slot():
+            response = await self.model.generate_content_async(prompt)
+        text = response.text.strip()
+        result = parse(text)
+        tokens = _token_count(response, prompt, text)
+        metrics.log_ia_usage(tokens)
+        if text:
+            await asyncio.to_thread(ai_cache.set, self.model_name, prompt, text, tokens)
+        return result
+
+    async def chat_assistant_async(self, message: str, context: Dict = None) -> str:
+        prompt = f"Asistente Legal: {message}"
+        try:
+            return await self._generate_async(prompt)
+        except AIServiceSaturated:
+            raise
+        except Exception as e:
+            logger.error(f"Error en chat_assistant_async: {e}")
+            return "Lo siento, hubo un error."
+
+    async def stream_chat(self, message: str) -> AsyncIterator[str]:
+        """
+        Genera la respuesta del asistente por fragmentos a medida que llegan.
+        Una respuesta cacheada se entrega en un solo fragmento; la respuesta
+        completa sólo se cachea si el stream terminó sin errores.
+        """
+        prompt = f"Asistente Legal: {message}"
+        cached = await asyncio.to_thread(ai_cache.get, self.model_name, prompt)
+        if cached is not MISSING:
+            yield cached
+            return
+
+        parts = []
+        async with self._slot():
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        text = "".join(parts).strip()
+        tokens = _token_count(response, prompt, text)
+        metrics.log_ia_usage(tokens)
+        if text:
+            await asyncio.to_thread(ai_cache.set, self.model_name, prompt, text, tokens)
@@ -1,21 +1,75 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from .database import get_db
+from .database import engine, get_async_db
 from .hotel_models import HotelGuest, HotelRoom, HotelRoomKey, HotelEntryLog
 
 from .core.config import settings
+from .core.cache import TTLCache, MISSING
+from .core.batch_writer import BatchWriter
 
 # Secret comes from settings (loaded from .env)
 SECRET_KEY = settings.JWT_SECRET
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # 1 week
 
+# Resolved principals/rooms/keys, so the steady-state auth path needs no DB round trips.
+# Writes through issue/revoke invalidate explicitly; the TTL bounds staleness elsewhere.
+guest_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)  # sub -> guest
+room_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)  # slug -> room
+key_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)  # (guest_id, room_id) -> key | None
+
+def auth_cache_stats():
+    return {"guests": guest_cache.get_stats(), "rooms": room_cache.get_stats(), "keys": key_cache.get_stats()}
+
+def _detach(db: AsyncSession, obj):
+    # Cached objects outlive the session; detach them so a later rollback can't expire them
+    if obj is not None:
+        db.expunge(obj)
+    return obj
+
+async def get_guest_by_email(db: AsyncSession, email: str):
+    guest = guest_cache.get(email)
+    if guest is MISSING:
+        result = await db.execute(select(HotelGuest).where(HotelGuest.email == email))
+        guest = _detach(db, result.scalars().first())
+        if guest is not None:
+            guest_cache.set(email, guest)
+    return guest
+
+async def get_room_by_slug(db: AsyncSession, slug: str):
+    room = room_cache.get(slug)
+    if room is MISSING:
+        result = await db.execute(select(HotelRoom).where(HotelRoom.slug == slug))
+        room = _detach(db, result.scalars().first())
+        if room is not None:
+            room_cache.set(slug, room)
+    return room
+
+async def get_active_key(db: AsyncSession, guest_id: int, room_id: int):
+    """Longest-lived active key of the guest for the room, or None."""
+    now = datetime.utcnow()
+    key = key_cache.get((guest_id, room_id))
+    if key is MISSING or (key is not None and key.expires_at <= now):
+        result = await db.execute(select(HotelRoomKey).where(
+            HotelRoomKey.guest_id == guest_id,
+            HotelRoomKey.room_id == room_id,
+            HotelRoomKey.status == "active",
+            HotelRoomKey.expires_at > now
+        ).order_by(HotelRoomKey.expires_at.desc()))
+        key = _detach(db, result.scalars().first())
+        key_cache.set((guest_id, room_id), key)
+    return key
+
+def invalidate_key(guest_id: int, room_id: int):
+    key_cache.invalidate((guest_id, room_id))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/reception/checkin", auto_error=False)
 
-async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     # Try token first, then session cookie
     if not token:
         token = request.cookies.get("gahenax_session")
@@ -31,8 +85,7 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
     except JWTError:
         return None
         
-    user = db.query(HotelGuest).filter(HotelGuest.email == email).first()
-    return user
+    return await get_guest_by_email(db, email)
 
 async def require_auth(user: HotelGuest = Depends(get_current_user)):
     if user is None:
@@ -43,17 +96,12 @@ async def require_auth(user: HotelGuest = Depends(get_current_user)):
         )
     return user
 
-async def require_room_key(room_slug: str, user: HotelGuest = Depends(require_auth), db: Session = Depends(get_db)):
-    room = db.query(HotelRoom).filter(HotelRoom.slug == room_slug).first()
+async def require_room_key(room_slug: str, user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
+    room = await get_room_by_slug(db, room_slug)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
         
-    key = db.query(HotelRoomKey).filter(
-        HotelRoomKey.guest_id == user.id,
-        HotelRoomKey.room_id == room.id,
-        HotelRoomKey.status == "active",
-        HotelRoomKey.expires_at > datetime.utcnow()
-    ).first()
+    key = await get_active_key(db, user.id, room.id)
     
     if not key:
         raise HTTPException(
@@ -70,18 +118,25 @@ async def require_room_key(room_slug: str, user: HotelGuest = Depends(require_au
         
     return key
 
-def log_entry(db: Session, guest_id: int, room_id: int, action: str, allow: bool, reason: str, ip: str, ua: str):
-    log = HotelEntryLog(
-        guest_id=guest_id,
-        room_id=room_id,
-        action=action,
-        allow=allow,
-        reason=reason,
-        ip=ip,
-        user_agent=ua
-    )
-    db.add(log)
-    db.commit()
+# Door checks are logged through a background batch writer: the enter path only pays a queue put
+entry_log_writer = BatchWriter(
+    engine, HotelEntryLog.__table__,
+    max_batch=settings.ENTRY_LOG_BATCH_SIZE,
+    flush_interval=settings.ENTRY_LOG_FLUSH_SECONDS,
+    max_buffer=settings.ENTRY_LOG_BUFFER_SIZE
+)
+
+async def log_entry(guest_id: int, room_id: int, action: str, allow: bool, reason: str, ip: str, ua: str):
+    await entry_log_writer.enqueue({
+        "guest_id": guest_id,
+        "room_id": room_id,
+        "action": action,
+        "allow": allow,
+        "reason": reason,
+        "ip": ip,
+        "user_agent": ua,
+        "ts": datetime.utcnow()
+    })
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -12,7 +12,9 @@ class HotelGuest(Base):
     password_hash = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    keys = relationship("HotelRoomKey", back_populates="guest")
+    # raise_on_sql: jsonable_encoder prueba dict(obj), que consulta `keys`;
+    # sin esto cada respuesta dispararía un lazy load (inválido en AsyncSession)
+    keys = relationship("HotelRoomKey", back_populates="guest", lazy="raise_on_sql")
     logs = relationship("HotelEntryLog", back_populates="guest")
 
 class HotelRoom(Base):
@@ -33,7 +35,7 @@ class HotelRoom(Base):
     existing_url = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    keys = relationship("HotelRoomKey", back_populates="room")
+    keys = relationship("HotelRoomKey", back_populates="room", lazy="raise_on_sql")
     logs = relationship("HotelEntryLog", back_populates="room")
 
 class HotelRoomKey(Base):
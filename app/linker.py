@@ -0,0 +1,342 @@
+"""
+Vinculación automática documento → proceso por número de proceso (Aho-Corasick).
+
+Mantiene en memoria un autómata Aho-Corasick con el `numero_proceso` de todos
+los procesos vigentes, normalizado a mayúsculas y sin separadores, de modo que
+"11001-31-03-001-2020-00123-00", "11001 31 03 001 2020 00123 00" y
+"11001310300120200012300" coinciden con el mismo proceso. El texto se recorre
+una sola vez: el costo es O(longitud del texto + coincidencias) sin importar
+cuántos procesos existan.
+
+El índice se actualiza de forma incremental: `sync()` sólo consulta los
+procesos con `updated_at` posterior a la última sincronización.
+- Retirar un patrón no invalida los enlaces de fallo (sólo vacía su salida).
+- Los patrones nuevos esperan en un búfer que se busca de forma directa
+  (`str.find`) y se incorporan al autómata en bloque al superar
+  PENDING_MAX_PATTERNS: el recálculo de enlaces, O(total de patrones), se
+  paga una vez por bloque y no por cada proceso creado.
+- Con pocos procesos (NAIVE_MAX_PATTERNS) la búsqueda directa es más rápida
+  que recorrer el autómata en Python y no se usa el autómata.
+
+Uso: python -m app.linker [--all]
+"""
+import argparse
+import bisect
+import re
+import threading
+from collections import deque
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Separadores admitidos dentro de un número de proceso. Los "conectores" unen
+# partes de un mismo token: un número pegado por conector a otro alfanumérico
+# (p. ej. el final de "X-2024-TEST-001") no es una mención independiente.
+CONNECTORS = frozenset("-._/")
+SEPARATORS = CONNECTORS | frozenset(" \t\r\n")
+# Patrones más cortos generarían falsos positivos en texto corrido
+MIN_PATTERN_LENGTH = 6
+LINKED_BY = "linker"
+# Documentos cargados por consulta al vincular (acota la memoria con textos grandes)
+LINK_CHUNK_SIZE = 200
+# Hasta aquí la búsqueda directa por patrón supera al autómata (scripts/bench_linker.py)
+NAIVE_MAX_PATTERNS = 300
+# Patrones nuevos que se buscan de forma directa antes de incorporarlos al autómata
+PENDING_MAX_PATTERNS = 256
+
+# Separadores, tramos sin separadores y caracteres que cortan una coincidencia (otra puntuación)
+_SEPARATORS_RE = re.compile(f"[{re.escape(''.join(sorted(SEPARATORS)))}]+")
+_RUN_RE = re.compile(f"[^{re.escape(''.join(sorted(SEPARATORS)))}]+")
+_BREAK_RE = re.compile(f"[^\\w{re.escape(''.join(sorted(SEPARATORS)))}]")
+
+def normalize_numero(numero: str) -> str:
+    return "".join(ch for ch in numero.upper() if ch.isalnum())
+
+def _normalize_text(text: str) -> str:
+    """
+    Texto en mayúscula, del mismo largo que el original, con "\\0" en la
+    puntuación que no es separador (corta coincidencias) y en los caracteres
+    cuya mayúscula cambia de largo (p. ej. "ß" -> "SS").
+    """
+    upper = text.upper()
+    if len(upper) != len(text):
+        upper = "".join(ch.upper() if len(ch.upper()) == 1 else "\0" for ch in text)
+    return _BREAK_RE.sub("\0", upper)
+
+class _Origin:
+    """Traduce posiciones de la secuencia sin separadores al texto original (se arma al primer uso)."""
+
+    def __init__(self, normalized: str):
+        self._normalized = normalized
+        self._seq_starts: Optional[List[int]] = None
+        self._text_starts: List[int] = []
+
+    def __call__(self, i: int) -> int:
+        if self._seq_starts is None:
+            self._seq_starts, size = [], 0
+            for match in _RUN_RE.finditer(self._normalized):
+                self._seq_starts.append(size)
+                self._text_starts.append(match.start())
+                size += match.end() - match.start()
+        run = bisect.bisect_right(self._seq_starts, i) - 1
+        return self._text_starts[run] + i - self._seq_starts[run]
+
+def _is_boundary(text: str, i: int, step: int) -> bool:
+    """True si la posición `i` (vecina de una coincidencia) no la extiende a otro token."""
+    if i < 0 or i >= len(text):
+        return True
+    if text[i].isalnum():
+        return False
+    if text[i] in CONNECTORS:
+        j = i + step
+        return j < 0 or j >= len(text) or not text[j].isalnum()
+    return True
+
+class AhoCorasick:
+    """Autómata multipatrón con inserción y retiro incrementales."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]  # Patrones que terminan exactamente en el nodo
+        self._dict_link: List[int] = [0]  # Nodo con salida más cercano en la cadena de fallos
+        self._patterns: Set[str] = set()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def add(self, pattern: str):
+        if pattern in self._patterns:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+                self._dict_link.append(0)
+            node = nxt
+        self._out[node].add(pattern)
+        self._patterns.add(pattern)
+        self._dirty = True
+
+    def remove(self, pattern: str):
+        """
+        Retira la salida del patrón; los nodos quedan (se compactan al reconstruir).
+        Los enlaces siguen siendo válidos: un nodo sin salida en la cadena de
+        diccionario sólo no produce coincidencias, así que no hace falta recalcularlos.
+        """
+        if pattern not in self._patterns:
+            return
+        node = 0
+        for ch in pattern:
+            node = self._goto[node][ch]
+        self._out[node].discard(pattern)
+        self._patterns.discard(pattern)
+
+    def _build_links(self):
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            self._dict_link[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._dict_link[nxt] = self._fail[nxt] if self._out[self._fail[nxt]] else self._dict_link[self._fail[nxt]]
+                queue.append(nxt)
+        self._dirty = False
+
+    def iter_matches(self, symbols: Iterable[str]) -> Iterable[Tuple[int, str]]:
+        """Genera (posición final, patrón) para cada aparición en la secuencia."""
+        if self._dirty:
+            self._build_links()
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        node = 0
+        for pos, ch in enumerate(symbols):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else dict_link[node]
+            while hit:
+                for pattern in out[hit]:
+                    yield pos, pattern
+                hit = dict_link[hit]
+
+class ProcessLinker:
+    def __init__(self):
+        self._automaton = AhoCorasick()
+        self._pending: Set[str] = set()  # Patrones aún no incorporados al autómata
+        self._ids_by_pattern: Dict[str, Set[int]] = {}
+        self._pattern_by_id: Dict[int, str] = {}
+        self._watermark = None
+        self._lock = threading.Lock()
+
+    def _set_process(self, proceso_id: int, numero: Optional[str]):
+        old = self._pattern_by_id.pop(proceso_id, None)
+        if old is not None:
+            ids = self._ids_by_pattern[old]
+            ids.discard(proceso_id)
+            if not ids:
+                del self._ids_by_pattern[old]
+                self._pending.discard(old)
+                self._automaton.remove(old)
+        pattern = normalize_numero(numero) if numero else ""
+        if len(pattern) >= MIN_PATTERN_LENGTH:
+            self._pattern_by_id[proceso_id] = pattern
+            self._ids_by_pattern.setdefault(pattern, set()).add(proceso_id)
+            if pattern not in self._automaton._patterns:
+                self._pending.add(pattern)
+
+    def sync(self, db: Session) -> int:
+        """
+        Aplica los procesos creados, modificados o con soft delete desde la
+        última sincronización. Retorna cuántos procesos revisó.
+        """
+        with self._lock:
+            query = db.query(models.Proceso.id, models.Proceso.numero_proceso,
+                             models.Proceso.deleted_at, models.Proceso.updated_at)
+            if self._watermark is not None:
+                # SQLite guarda func.now() como 'AAAA-MM-DD HH:MM:SS' y el datetime se liga
+                # con microsegundos ('... HH:MM:SS.000000'): la comparación de texto excluiría
+                # el mismo segundo. Se retrocede 1 s; reaplicar un proceso es idempotente.
+                query = query.filter(models.Proceso.updated_at >= self._watermark - timedelta(seconds=1))
+            rows = query.all()
+            for row in rows:
+                self._set_process(row.id, None if row.deleted_at else row.numero_proceso)
+                if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                    self._watermark = row.updated_at
+            if self._automaton_is_sparse():
+                self._rebuild()
+            return len(rows)
+
+    def _automaton_is_sparse(self) -> bool:
+        # Tras muchos retiros el trie conserva nodos muertos: se compacta
+        return len(self._automaton._goto) > 64 and len(self._automaton._goto) > 4 * sum(
+            len(p) for p in self._ids_by_pattern
+        )
+
+    def _rebuild(self):
+        automaton = AhoCorasick()
+        for pattern in self._ids_by_pattern:
+            automaton.add(pattern)
+        self._automaton = automaton
+        self._pending.clear()
+
+    def _flush_pending(self):
+        """Incorpora el búfer al autómata; los enlaces se recalculan una vez en el próximo escaneo."""
+        for pattern in self._pending:
+            self._automaton.add(pattern)
+        self._pending.clear()
+
+    def _iter_matches(self, sequence: str) -> Iterable[Tuple[int, str]]:
+        """(posición final, patrón) de cada aparición en la secuencia normalizada."""
+        if len(self._ids_by_pattern) <= NAIVE_MAX_PATTERNS:
+            direct = self._ids_by_pattern.keys()
+        else:
+            if len(self._pending) > PENDING_MAX_PATTERNS:
+                self._flush_pending()
+            yield from self._automaton.iter_matches(sequence)
+            direct = self._pending
+        for pattern in direct:
+            start = sequence.find(pattern)
+            while start != -1:
+                yield start + len(pattern) - 1, pattern
+                start = sequence.find(pattern, start + 1)
+
+    def find_processes(self, text: str) -> Dict[int, float]:
+        """
+        Procesos mencionados en el texto: {proceso_id: confianza}. La confianza
+        es 1.0 salvo que varios procesos compartan el mismo número normalizado.
+        """
+        normalized = _normalize_text(text)
+        sequence = _SEPARATORS_RE.sub("", normalized)
+        origin = _Origin(normalized)
+        found: Dict[int, float] = {}
+        with self._lock:
+            for end, pattern in self._iter_matches(sequence):
+                start_at = origin(end - len(pattern) + 1)
+                end_at = origin(end)
+                if not (_is_boundary(text, start_at - 1, -1) and _is_boundary(text, end_at + 1, 1)):
+                    continue
+                ids = self._ids_by_pattern.get(pattern, ())
+                for pid in ids:
+                    found[pid] = 1.0 / len(ids)
+        return found
+
+    def link_documents(self, db: Session, document_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Vincula como MATCH_NUMBER los documentos con texto extraído (todos si
+        `document_ids` es None). Omite enlaces existentes. Retorna los enlaces creados.
+        """
+        self.sync(db)
+        if document_ids is None:
+            document_ids = [i for (i,) in db.query(models.Document.id).filter(
+                models.Document.extracted_text.isnot(None)
+            ).order_by(models.Document.id)]
+        else:
+            document_ids = list(document_ids)
+
+        created = 0
+        for offset in range(0, len(document_ids), LINK_CHUNK_SIZE):
+            chunk = document_ids[offset:offset + LINK_CHUNK_SIZE]
+            docs = db.query(models.Document.id, models.Document.extracted_text).filter(
+                models.Document.id.in_(chunk), models.Document.extracted_text.isnot(None)
+            ).all()
+            existing = set(db.query(models.ProcessDocument.document_id, models.ProcessDocument.process_id).filter(
+                models.ProcessDocument.document_id.in_(chunk)
+            ))
+            for doc in docs:
+                for pid, confidence in self.find_processes(doc.extracted_text).items():
+                    if (doc.id, pid) in existing:
+                        continue
+                    db.add(models.ProcessDocument(
+                        process_id=pid, document_id=doc.id, linked_by=LINKED_BY,
+                        link_reason=models.LinkReason.MATCH_NUMBER, confidence=confidence
+                    ))
+                    created += 1
+            db.commit()
+        return created
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"patterns": len(self._ids_by_pattern), "pending": len(self._pending),
+                    "processes": len(self._pattern_by_id), "trie_nodes": len(self._automaton._goto)}
+
+linker = ProcessLinker()
+
+def main():
+    from .database import SessionLocal, sync_schema
+
+    parser = argparse.ArgumentParser(description="Vincula documentos con procesos por número")
+    parser.add_argument("--all", action="store_true", help="Revisa todos los documentos, no sólo los sin vínculo")
+    args = parser.parse_args()
+
+    sync_schema()
+    db = SessionLocal()
+    try:
+        ids = None
+        if not args.all:
+            linked = db.query(models.ProcessDocument.document_id)
+            ids = [i for (i,) in db.query(models.Document.id).filter(
+                models.Document.extracted_text.isnot(None), ~models.Document.id.in_(linked)
+            )]
+        created = linker.link_documents(db, ids)
+        print(f"🔗 {created} vínculos creados ({linker.stats()['patterns']} números de proceso indexados)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,74 @@
 from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from datetime import datetime, timedelta
+import asyncio
 import os
 
 from .core.config import settings
-from .routers import procesos, storage, ai_engine, support, jules
+from .routers import procesos, storage, ai_engine, support, jules, export
 from .core.middleware import AuditMiddleware
 from .core.audit import register_audit_listeners
 from . import models, hotel_models, schemas
 from .core.metrics import metrics
-from .database import engine, get_db
-from sqlalchemy.orm import Session
-from .hotel_auth import require_auth, require_room_key, create_access_token, log_entry, HotelGuest, HotelRoom, HotelRoomKey
-from passlib.context import CryptContext
+from .database import engine, async_engine, get_async_db, sync_schema
+from .search_index import ensure_fts_index
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from .hotel_auth import (
+    require_auth, require_room_key, create_access_token, log_entry, HotelGuest, HotelRoom, HotelRoomKey,
+    get_room_by_slug, get_active_key, invalidate_key, auth_cache_stats, entry_log_writer
+)
+from .core.password_pool import password_pool, failed_logins, PasswordPoolSaturated
+from .core.ai_cache import ai_cache
+from .core.static_assets import StaticAssetStore, PrecompressedStaticFiles
+from .crm_service import crm_outbox, crm_deliverer
 import json
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
 # Inicializar Base de Datos y Auditoría
-models.Base.metadata.create_all(bind=engine)
-hotel_models.Base.metadata.create_all(bind=engine)
+sync_schema(engine)
+ensure_fts_index(engine)
 register_audit_listeners()
+metrics.register_source("password_pool", password_pool.get_stats)
+metrics.register_source("failed_logins", failed_logins.get_stats)
+metrics.register_source("auth_cache", auth_cache_stats)
+metrics.register_source("entry_log_writer", entry_log_writer.get_stats)
+metrics.register_source("blob_store", storage.blob_store_stats)
+metrics.register_source("ai_cache", ai_cache.get_stats)
+metrics.register_source("ai_engine", ai_engine.ai_stats)
+metrics.register_source("crm_outbox", crm_deliverer.get_stats)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    crm_deliverer.start()
+    yield
+    await crm_deliverer.stop()
+    crm_outbox.close()
+    entry_log_writer.stop()
+    password_pool.shutdown()
+    ai_cache.close()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="GAHENAX - ChechyLegis API",
     version=settings.VERSION,
-    description="Sistema experto de asistencia legal penal colombiana."
+    description="Sistema experto de asistencia legal penal colombiana.",
+    lifespan=lifespan
 )
 
-# Middlewares
-app.add_middleware(AuditMiddleware)
+# Middlewares (el último agregado es el más externo)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
-
-# Middleware de Seguridad
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-Gahenax-Version"] = settings.VERSION
-    return response
+# Auditoría, métricas y cabeceras de seguridad (ASGI puro)
+app.add_middleware(AuditMiddleware)
 
 # Inclusión de Rutas Modulares
 app.include_router(procesos.router)
@@ -55,27 +76,23 @@ app.include_router(storage.router)
 app.include_router(ai_engine.router)
 app.include_router(support.router)
 app.include_router(jules.router)
+app.include_router(export.router)
 
 # --- HOTEL API ROUTES ---
 
 @app.get("/api/hotel/rooms")
-async def list_rooms(db: Session = Depends(get_db)):
-    rooms = db.query(HotelRoom).filter(HotelRoom.status == "active").all()
-    return rooms
+async def list_rooms(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(HotelRoom).where(HotelRoom.status == "active"))
+    return result.scalars().all()
 
 @app.get("/api/hotel/rooms/{room_slug}")
-async def room_details(room_slug: str, user: HotelGuest = Depends(require_auth), db: Session = Depends(get_db)):
-    room = db.query(HotelRoom).filter(HotelRoom.slug == room_slug).first()
+async def room_details(room_slug: str, user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
+    room = await get_room_by_slug(db, room_slug)
     if not room:
         return JSONResponse(status_code=404, content={"detail": "Room not found"})
     
     # Check if user has key
-    key = db.query(HotelRoomKey).filter(
-        HotelRoomKey.guest_id == user.id,
-        HotelRoomKey.room_id == room.id,
-        HotelRoomKey.status == "active",
-        HotelRoomKey.expires_at > datetime.utcnow()
-    ).first()
+    key = await get_active_key(db, user.id, room.id)
     
     return {
         "room": room,
@@ -87,16 +104,40 @@ async def room_details(room_slug: str, user: HotelGuest = Depends(require_auth),
 async def get_metrics(user: dict = Depends(require_auth)):
     # Simulación de verificación de rol Admin
     # En un sistema real usaríamos require_auth con scope admin
-    return metrics.get_report()
+    # Las fuentes registradas consultan SQLite y leen instantáneas: fuera del event loop
+    return await asyncio.to_thread(metrics.get_report)
+
+@app.get("/api/admin/metrics/prometheus", response_class=PlainTextResponse)
+async def get_metrics_prometheus(user: dict = Depends(require_auth)):
+    return PlainTextResponse(await asyncio.to_thread(metrics.prometheus), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/reception/checkin")
-async def checkin(data: schemas.CheckinRequest, db: Session = Depends(get_db)):
+async def checkin(data: schemas.CheckinRequest, db: AsyncSession = Depends(get_async_db)):
     email = data.email
     password = data.password
+
+    retry_after = failed_logins.retry_after(email)
+    if retry_after:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many failed attempts. Try again later."},
+            headers={"Retry-After": str(retry_after)}
+        )
     
-    user = db.query(HotelGuest).filter(HotelGuest.email == email).first()
-    if not user or not pwd_context.verify(password, user.password_hash):
+    result = await db.execute(select(HotelGuest).where(HotelGuest.email == email))
+    user = result.scalars().first()
+    try:
+        valid = bool(user) and await password_pool.verify(password, user.password_hash)
+    except PasswordPoolSaturated:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Reception is busy. Try again shortly."},
+            headers={"Retry-After": "1"}
+        )
+    if not valid:
+        failed_logins.record_failure(email)
         return JSONResponse(status_code=401, content={"detail": "Invalid credentials"})
+    failed_logins.record_success(email)
     
     access_token = create_access_token(data={"sub": user.email})
     response = JSONResponse(content={
@@ -112,34 +153,34 @@ async def get_me(user: HotelGuest = Depends(require_auth)):
     return user
 
 @app.get("/api/reception/keys/mine")
-async def my_keys(user: HotelGuest = Depends(require_auth), db: Session = Depends(get_db)):
-    keys = db.query(HotelRoomKey).filter(HotelRoomKey.guest_id == user.id, HotelRoomKey.status == "active").all()
-    return keys
+async def my_keys(user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(HotelRoomKey).where(HotelRoomKey.guest_id == user.id, HotelRoomKey.status == "active"))
+    return result.scalars().all()
 
 @app.post("/api/hotel/rooms/{room_slug}/enter")
-async def enter_room(room_slug: str, request: Request, user: HotelGuest = Depends(require_auth), db: Session = Depends(get_db)):
-    room = db.query(HotelRoom).filter(HotelRoom.slug == room_slug).first()
+async def enter_room(room_slug: str, request: Request, user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
+    room = await get_room_by_slug(db, room_slug)
     if not room:
         return JSONResponse(status_code=404, content={"detail": "Room not found"})
         
     try:
         await require_room_key(room_slug, user, db)
-        log_entry(db, user.id, room.id, "enter_attempt", True, "success", request.client.host, request.headers.get("user-agent"))
+        await log_entry(user.id, room.id, "enter_attempt", True, "success", request.client.host, request.headers.get("user-agent"))
         return {"allowed": True, "url": room.existing_url}
     except HTTPException as e:
-        log_entry(db, user.id, room.id, "enter_attempt", False, str(e.detail), request.client.host, request.headers.get("user-agent"))
+        await log_entry(user.id, room.id, "enter_attempt", False, str(e.detail), request.client.host, request.headers.get("user-agent"))
         return {"allowed": False, "reason": e.detail}
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": f"Internal error during entry: {str(e)}"})
 
 # Admin FrontDesk
 @app.post("/api/frontdesk/keys/issue")
-async def issue_key(data: dict, user: HotelGuest = Depends(require_auth), db: Session = Depends(get_db)):
+async def issue_key(data: dict, user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
         
-    guest = db.query(HotelGuest).filter(HotelGuest.email == data["guest_email"]).first()
-    room = db.query(HotelRoom).filter(HotelRoom.slug == data["room_slug"]).first()
+    guest = (await db.execute(select(HotelGuest).where(HotelGuest.email == data["guest_email"]))).scalars().first()
+    room = (await db.execute(select(HotelRoom).where(HotelRoom.slug == data["room_slug"]))).scalars().first()
     
     if not guest or not room:
         raise HTTPException(status_code=404, detail="Guest or Room not found")
@@ -151,39 +192,73 @@ async def issue_key(data: dict, user: HotelGuest = Depends(require_auth), db: Se
         expires_at=datetime.utcnow() + timedelta(days=data.get("expires_days", 30))
     )
     db.add(new_key)
-    db.commit()
+    await db.commit()
+    invalidate_key(guest.id, room.id)
     return {"message": "Key issued"}
 
+@app.post("/api/frontdesk/keys/revoke")
+async def revoke_key(data: dict, user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    guest = (await db.execute(select(HotelGuest).where(HotelGuest.email == data["guest_email"]))).scalars().first()
+    room = (await db.execute(select(HotelRoom).where(HotelRoom.slug == data["room_slug"]))).scalars().first()
+
+    if not guest or not room:
+        raise HTTPException(status_code=404, detail="Guest or Room not found")
+
+    keys = (await db.execute(select(HotelRoomKey).where(
+        HotelRoomKey.guest_id == guest.id,
+        HotelRoomKey.room_id == room.id,
+        HotelRoomKey.status == "active"
+    ))).scalars().all()
+    now = datetime.utcnow()
+    for key in keys:
+        key.status = "revoked"
+        key.revoked_at = now
+    await db.commit()
+    invalidate_key(guest.id, room.id)
+    return {"message": "Key revoked", "revoked": len(keys)}
+
 # Montar Archivos Estáticos
 # Asegurarse de que la ruta absoluta sea correcta
 base_path = os.path.dirname(os.path.dirname(__file__))
 static_path = os.path.join(base_path, "static")
+static_store = StaticAssetStore(static_path)
+metrics.register_source("static_assets", static_store.get_stats)
 if os.path.exists(static_path):
     # Carpeta Downloads - Ahora apuntando a static/downloads para el Hub
     downloads_path = os.path.join(static_path, "downloads")
     if os.path.exists(downloads_path):
         app.mount("/downloads", StaticFiles(directory=downloads_path), name="downloads")
     
-    app.mount("/static", StaticFiles(directory=static_path), name="static")
+    # JS/CSS/HTML precomprimidos en memoria; el resto sale del disco
+    if settings.STATIC_PRECOMPRESS:
+        static_store.load()
+    app.mount("/static", PrecompressedStaticFiles(directory=static_path, store=static_store), name="static")
 
 # hotel_lobby_path = os.path.join(base_path, "hotel_lobby")
 # if os.path.exists(hotel_lobby_path):
 #    app.mount("/hotel_lobby", StaticFiles(directory=hotel_lobby_path), name="hotel_lobby")
 
 # Hub now served at /lobby and /
+# El archivo del lobby se resuelve y comprime una sola vez al arrancar
+lobby_file = os.path.join(os.getcwd(), "gahenax_hub.html")
+lobby_asset = static_store.load_file(lobby_file) if settings.STATIC_PRECOMPRESS and os.path.exists(lobby_file) else None
 
 @app.get("/")
 @app.get("/lobby")
 @app.get("/hotel_lobby/hotel.html")
 @app.get("/gahenax_hub.html")
-async def serve_lobby():
-    lobby_file = os.path.join(os.getcwd(), "gahenax_hub.html")
+async def serve_lobby(request: Request):
+    if lobby_asset:
+        return static_store.response(lobby_asset, request.scope)
     if os.path.exists(lobby_file):
         return FileResponse(lobby_file)
     return {"message": "Gahenax Hotel Lobby Online. hub file not found."}
 
 @app.get("/chechylegis")
-async def serve_chechylegis(request: Request, user: HotelGuest = Depends(require_auth), db: Session = Depends(get_db)):
+async def serve_chechylegis(request: Request, user: HotelGuest = Depends(require_auth), db: AsyncSession = Depends(get_async_db)):
     # Check for room key before serving the index
     try:
         await require_room_key("chechylegis", user, db)
@@ -191,6 +266,9 @@ async def serve_chechylegis(request: Request, user: HotelGuest = Depends(require
         # If no key, redirect to Hub/Lobby with info
         return JSONResponse(status_code=403, content={"detail": "No valid key for ChechyLegis. Please visit the Lobby.", "redirect": "/gahenax_hub.html"})
         
+    index_asset = static_store.get("index.html")
+    if index_asset:
+        return static_store.response(index_asset, request.scope)
     index_file = os.path.join(static_path, "index.html")
     if os.path.exists(index_file):
         return FileResponse(index_file)
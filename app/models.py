@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Enum, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Date, DateTime, Enum, Text, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 import enum
 from .database import Base
@@ -42,6 +42,13 @@ class Proceso(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
 
+    __table_args__ = (
+        # Soporta la paginación por cursor (keyset) sobre (fecha_radicacion, id)
+        Index("ix_procesos_fecha_radicacion_id", "fecha_radicacion", "id"),
+        # Sincronización incremental del vinculador (app.linker) por marca de agua
+        Index("ix_procesos_updated_at", "updated_at"),
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_log"
 
@@ -93,8 +100,18 @@ class FileRecord(Base):
     mime_type = Column(String)
     size_bytes = Column(Integer)
     sha256 = Column(String(64), index=True)
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=True, index=True)  # Contenido físico (None = archivo legado en el sandbox)
     status = Column(String, default="active") # active, trashed, deleted
     labels = Column(Text, default="[]") # Almacenado como JSON string
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
+
+class Blob(Base):
+    """Contenido físico direccionado por hash (blobs/ab/cd/<sha256>), compartido entre FileRecords"""
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+import json
+import logging
+import math
 from ..schemas import AnalysisResponse
 from ..core.config import settings
+from ..core.rate_limit import TokenBucketLimiter
 from ..core.security import get_current_user
 
-from ..gemini_service import GeminiService
+from ..gemini_service import GeminiService, AIServiceSaturated
+
+logger = logging.getLogger("chechy.gemini")
 
 router = APIRouter(
     prefix="/api/analysis",
@@ -13,8 +20,51 @@ router = APIRouter(
 # Inyectar servicio
 ai_service = GeminiService(api_key=settings.GEMINI_API_KEY) if settings.GEMINI_API_KEY else None
 
+# Límite por usuario de consultas a la IA
+ai_limiter = TokenBucketLimiter(settings.AI_RATE_LIMIT_PER_MINUTE, settings.AI_RATE_LIMIT_BURST)
+# Tope de Retry-After: con AI_RATE_LIMIT_PER_MINUTE=0 la espera es infinita
+MAX_RETRY_AFTER_SECONDS = 3600
+
+HYPOTHESIS = [
+    "Evaluación de tipicidad según C.P. Colombiano",
+    "Análisis preventivo de riesgos procesales"
+]
+DISCLAIMER = "ESTE ANÁLISIS ES GENERADO POR IA Y NO SUSTITUYE EL JUICIO HUMANO."
+
+NOT_CONFIGURED = {
+    "analysis": "ERROR DE CONFIGURACIÓN: GEMINI_API_KEY no configurada.",
+    "hypothesis": ["Por favor, configure su API Key en el archivo .env"],
+    "confidence": "red",
+    "disclaimer": "SISTEMA LIMITADO."
+}
+
+def ai_stats() -> dict:
+    stats = {"rate_limit": ai_limiter.get_stats()}
+    if ai_service:
+        stats["client"] = ai_service.get_stats()
+    return stats
+
+def _check_rate_limit(user: dict):
+    retry_after = ai_limiter.acquire(user["id"])
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiadas consultas al asistente. Intente más tarde.",
+            headers={"Retry-After": str(math.ceil(min(retry_after, MAX_RETRY_AFTER_SECONDS)))}
+        )
+
+def _saturated() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="El motor de IA está ocupado. Intente de nuevo en unos segundos.",
+        headers={"Retry-After": "1"}
+    )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @router.post("/criminal", response_model=AnalysisResponse)
-def analyze_criminal_case(
+async def analyze_criminal_case(
     query: str = Query(...),
     user: dict = Depends(get_current_user)
 ):
@@ -22,23 +72,52 @@ def analyze_criminal_case(
     Análisis preliminar de casos penales colombianos con IA (Gemini).
     """
     if not ai_service:
-        return {
-            "analysis": "ERROR DE CONFIGURACIÓN: GEMINI_API_KEY no configurada.",
-            "hypothesis": ["Por favor, configure su API Key en el archivo .env"],
-            "confidence": "red",
-            "disclaimer": "SISTEMA LIMITADO."
-        }
-    
+        return NOT_CONFIGURED
+    _check_rate_limit(user)
+
     # Usar el asistente conversacional para análisis general de la consulta
-    response_text = ai_service.chat_assistant(query)
-    
+    try:
+        response_text = await ai_service.chat_assistant_async(query)
+    except AIServiceSaturated:
+        raise _saturated()
+
     # Mapear a la respuesta esperada por el frontend
     return {
         "analysis": response_text,
-        "hypothesis": [
-            "Evaluación de tipicidad según C.P. Colombiano",
-            "Análisis preventivo de riesgos procesales"
-        ],
+        "hypothesis": HYPOTHESIS,
         "confidence": "green",
-        "disclaimer": "ESTE ANÁLISIS ES GENERADO POR IA Y NO SUSTITUYE EL JUICIO HUMANO."
+        "disclaimer": DISCLAIMER
     }
+
+@router.post("/criminal/stream")
+async def analyze_criminal_case_stream(
+    query: str = Query(...),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Igual que /criminal pero en Server-Sent Events: eventos `token` con cada
+    fragmento del análisis y un evento final `done` (hypothesis, confidence,
+    disclaimer) o `error`.
+    """
+    if not ai_service:
+        return StreamingResponse(iter([_sse("done", NOT_CONFIGURED)]), media_type="text/event-stream")
+    _check_rate_limit(user)
+
+    async def events():
+        try:
+            async for text in ai_service.stream_chat(query):
+                yield _sse("token", {"text": text})
+        except AIServiceSaturated:
+            yield _sse("error", {"detail": "El motor de IA está ocupado. Intente de nuevo en unos segundos."})
+            return
+        except Exception as e:
+            logger.error(f"Error en analyze_criminal_case_stream: {e}")
+            yield _sse("error", {"detail": "Lo siento, hubo un error."})
+            return
+        yield _sse("done", {"hypothesis": HYPOTHESIS, "confidence": "green", "disclaimer": DISCLAIMER})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
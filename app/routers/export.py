@@ -0,0 +1,178 @@
+"""
+Exportación en streaming de procesos y de la bitácora de auditoría.
+
+Las filas se leen con `yield_per` (cursor del servidor, sin materializar el
+resultado ni crear objetos ORM) y se escriben directamente en un
+StreamingResponse por bloques, así que la memoria es constante aunque la
+exportación tenga millones de filas.
+
+Formatos: ndjson, csv y parquet (este último requiere `pyarrow`, opcional).
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Select, select
+
+from .. import crud, models
+from ..core.config import settings
+from ..core.security import get_current_user, role_required
+from ..database import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional
+    pa = pq = None
+
+router = APIRouter(
+    prefix="/api/export",
+    tags=["Exportación"]
+)
+
+# Filas por bloque leído de la base y por bloque escrito en la respuesta
+EXPORT_BATCH_SIZE = 2000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _iter_batches(stmt: Select) -> Iterator[List[tuple]]:
+    # La sesión se abre aquí: las dependencias de FastAPI ya se cerraron cuando el
+    # StreamingResponse empieza a consumir el generador
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+def _ndjson(stmt: Select, columns: List[str]) -> Iterator[bytes]:
+    for batch in _iter_batches(stmt):
+        yield "".join(
+            json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+def _csv(stmt: Select, columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _iter_batches(stmt):
+        writer.writerows([_plain(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura no buscable: acumula bytes que el generador va entregando."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_schema(stmt: Select):
+    """Esquema Arrow fijo a partir de los tipos SQL (un bloque todo nulo no define el tipo)."""
+    fields = []
+    for column in stmt.selected_columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(column.type, Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append((column.name, arrow_type))
+    return pa.schema(fields)
+
+def _parquet(stmt: Select, columns: List[str]) -> Iterator[bytes]:
+    # Un row group por bloque; el pie del archivo se escribe al cerrar
+    schema = _arrow_schema(stmt)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in _iter_batches(stmt):
+        rows = [{c: (v.value if isinstance(v, enum.Enum) else v) for c, v in zip(columns, row)} for row in batch]
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+WRITERS = {"ndjson": _ndjson, "csv": _csv, "parquet": _parquet}
+
+def _stream(stmt: Select, fmt: str, filename: str) -> StreamingResponse:
+    if fmt not in WRITERS:
+        raise HTTPException(status_code=400, detail="Formato no soportado. Use ndjson, csv o parquet.")
+    if fmt == "parquet" and pa is None:
+        raise HTTPException(status_code=501, detail="Exportación Parquet no disponible: instale pyarrow.")
+    columns = [c.name for c in stmt.selected_columns]
+    return StreamingResponse(
+        WRITERS[fmt](stmt, columns),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+@router.get("/procesos")
+def export_procesos(
+    format: str = Query("ndjson", description="ndjson | csv | parquet"),
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    estado: Optional[models.EstadoProceso] = None,
+    user: dict = Depends(get_current_user)
+):
+    # Mismos filtros (y restricción FREE) que el listado; orden estable por id
+    stmt = select(*models.Proceso.__table__.columns).where(
+        *crud.procesos_filters(fecha_desde, fecha_hasta, estado, license_mode=settings.LICENSE_MODE)
+    ).order_by(models.Proceso.id)
+    return _stream(stmt, format, "procesos")
+
+@router.get("/audit_log")
+def export_audit_log(
+    format: str = Query("ndjson", description="ndjson | csv | parquet"),
+    entidad_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    user: dict = Depends(role_required(["admin"]))
+):
+    stmt = select(*models.AuditLog.__table__.columns).order_by(models.AuditLog.id)
+    if entidad_id is not None:
+        stmt = stmt.where(models.AuditLog.entidad_id == entidad_id)
+    if desde is not None:
+        stmt = stmt.where(models.AuditLog.timestamp >= desde)
+    return _stream(stmt, format, "audit_log")
@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+import asyncio
 import os
+import re
 import json
+import glob
+import time
 import uuid
 from typing import Dict
 from ..core.config import settings
@@ -17,6 +22,13 @@ REPORTS_DIR = "antigravity_reports/jules"
 os.makedirs(TASK_QUEUE, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+TASK_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def _validate_task_id(task_id: str):
+    # El id se usa para armar rutas de archivos
+    if not TASK_ID_PATTERN.match(task_id):
+        raise HTTPException(status_code=400, detail="task_id inválido")
+
 @router.post("/dispatch")
 def dispatch_task(
     task_data: Dict,
@@ -37,27 +49,173 @@ def dispatch_task(
         "action": task_data.get("action", "APPEND"),
         "content": task_data.get("content", f"Task from UI by {user['name']}"),
         "verification_cmd": task_data.get("verification_cmd"),
-        "priority": task_data.get("priority", 1)
+        "priority": task_data.get("priority", 1),
+        "timestamp": time.time(),
+        "timeout": task_data.get("timeout")
     }
     
-    with open(task_file, "w", encoding="utf-8") as f:
+    # Escritura atómica: el worker reacciona al evento del directorio y nunca ve el JSON a medias
+    tmp_file = f"{task_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=4)
+    os.replace(tmp_file, task_file)
         
     return {"status": "dispatched", "task_id": task_id}
 
-@router.get("/status/{task_id}")
-def get_task_status(task_id: str):
-    """
-    Consulta el estado de una tarea procesada por Jules.
-    """
+# Estados finales escritos por el worker en report_<id>.json
+TERMINAL_STATES = {"DONE", "FAILED", "ERROR", "DENIED", "CANCELLED", "TIMEOUT"}
+MAX_BATCH_IDS = 100
+EVENTS_POLL_SECONDS = 0.25
+EVENTS_KEEPALIVE_SECONDS = 15
+EVENTS_MAX_SECONDS = 3600
+LOG_CHUNK_BYTES = 64 * 1024
+
+def _read_report(task_id: str):
     report_file = os.path.join(REPORTS_DIR, f"report_{task_id}.json")
-    if os.path.exists(report_file):
+    try:
         with open(report_file, "r", encoding="utf-8") as f:
             return json.load(f)
-    
+    except FileNotFoundError:
+        return None
+
+def _task_state(task_id: str) -> dict:
+    """
+    Estado actual de una tarea: el reporte si ya terminó; si no PENDING (en cola),
+    CLAIMED (tomada por un worker) o RUNNING (su comando ya escribe en el log).
+    """
+    report = _read_report(task_id)
+    if report is not None:
+        return report
+
     # Si el archivo de tarea aún existe en la cola, está pendiente
     task_file = os.path.join(TASK_QUEUE, f"{task_id}.json")
     if os.path.exists(task_file):
         return {"status": "PENDING", "task_id": task_id}
-        
-    return {"status": "NOT_FOUND", "task_id": task_id}
+    if glob.glob(os.path.join(TASK_QUEUE, f"{task_id}.json.*.claimed")):
+        log_file = os.path.join(REPORTS_DIR, f"report_{task_id}.log")
+        return {"status": "RUNNING" if os.path.exists(log_file) else "CLAIMED", "task_id": task_id}
+
+    # El worker escribe el reporte antes de soltar el claim: si la tarea terminó
+    # entre las comprobaciones anteriores, el reporte ya está
+    return _read_report(task_id) or {"status": "NOT_FOUND", "task_id": task_id}
+
+@router.get("/status")
+def get_tasks_status(ids: str = Query(..., description="ids separados por coma")):
+    """
+    Estado de varias tareas en una sola consulta (tableros).
+    """
+    task_ids = [i for i in (part.strip() for part in ids.split(",")) if i]
+    if len(task_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BATCH_IDS} ids por consulta")
+    for task_id in task_ids:
+        _validate_task_id(task_id)
+    return {task_id: _task_state(task_id) for task_id in dict.fromkeys(task_ids)}
+
+@router.get("/status/{task_id}")
+def get_task_status(task_id: str):
+    """
+    Consulta el estado de una tarea procesada por Jules.
+    """
+    _validate_task_id(task_id)
+    return _task_state(task_id)
+
+def _poll_task(task_id: str, log_file: str, offset: int):
+    """Estado actual y el siguiente bloque del log desde `offset` (E/S de un ciclo del stream)."""
+    state = _task_state(task_id)
+    try:
+        with open(log_file, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(LOG_CHUNK_BYTES)
+    except FileNotFoundError:
+        chunk = b""
+    return state, chunk
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.get("/status/{task_id}/events")
+async def task_status_events(task_id: str, request: Request):
+    """
+    Server-Sent Events con la evolución de la tarea: un evento `status` en cada
+    cambio de estado y eventos `log` con las líneas nuevas de report_<id>.log.
+    El stream termina con el estado final (o NOT_FOUND).
+    """
+    _validate_task_id(task_id)
+    log_file = os.path.join(REPORTS_DIR, f"report_{task_id}.log")
+
+    async def events():
+        last_status = None
+        offset = 0
+        pending_line = b""
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < EVENTS_MAX_SECONDS:
+            if await request.is_disconnected():
+                return
+            # La E/S de archivos va al threadpool: varios suscriptores no frenan el event loop
+            state, chunk = await asyncio.to_thread(_poll_task, task_id, log_file, offset)
+            offset += len(chunk)
+            final = state["status"] in TERMINAL_STATES or state["status"] == "NOT_FOUND"
+            # El estado final se envía después de vaciar el log
+            if not final and state["status"] != last_status:
+                last_status = state["status"]
+                yield _sse("status", state)
+                last_sent = time.monotonic()
+
+            # Líneas nuevas del log (sólo completas, salvo al final)
+            data = pending_line + chunk
+            lines = data.split(b"\n")
+            pending_line = lines.pop()
+            if final and pending_line and len(chunk) < LOG_CHUNK_BYTES:
+                lines.append(pending_line)
+                pending_line = b""
+            if lines:
+                yield _sse("log", {"lines": [line.decode("utf-8", "replace") for line in lines]})
+                last_sent = time.monotonic()
+                if len(chunk) == LOG_CHUNK_BYTES:
+                    continue  # Aún hay log pendiente: leerlo antes de esperar
+
+            if final:
+                yield _sse("status", state)
+                return
+            if time.monotonic() - last_sent >= EVENTS_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/cancel/{task_id}")
+def cancel_task(
+    task_id: str,
+    user: dict = Depends(role_required(["admin"]))
+):
+    """
+    Cancela una tarea. Si sigue en cola se retira de inmediato; si ya está en
+    ejecución se deja la marca <id>.cancel y el worker detiene su comando.
+    """
+    _validate_task_id(task_id)
+    task_file = os.path.join(TASK_QUEUE, f"{task_id}.json")
+    try:
+        os.rename(task_file, f"{task_file}.cancelled")
+    except FileNotFoundError:
+        pass
+    else:
+        report = {"task_id": task_id, "status": "CANCELLED", "message": "Tarea cancelada antes de iniciar.",
+                  "timestamp": time.time(), "target": None}
+        report_file = os.path.join(REPORTS_DIR, f"report_{task_id}.json")
+        with open(f"{report_file}.tmp", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        os.replace(f"{report_file}.tmp", report_file)
+        return {"status": "CANCELLED", "task_id": task_id}
+
+    if os.path.exists(os.path.join(REPORTS_DIR, f"report_{task_id}.json")):
+        raise HTTPException(status_code=409, detail="La tarea ya finalizó")
+    if not glob.glob(os.path.join(TASK_QUEUE, f"{task_id}.json.*.claimed")):
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    with open(os.path.join(TASK_QUEUE, f"{task_id}.cancel"), "w", encoding="utf-8") as f:
+        f.write(user["name"])
+    return {"status": "CANCEL_REQUESTED", "task_id": task_id}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import date
+import anyio
+import codecs
 
-from .. import crud, models, schemas
+from .. import bulk_import, crud, models, schemas
+from ..core.context import get_current_user_name
 from ..database import get_db
 from ..core.config import settings
 from ..core.security import get_current_user, role_required
@@ -35,10 +38,49 @@ def create_proceso(
     new_proceso = crud.create_proceso(db=db, proceso=proceso)
     return new_proceso
 
+def _iter_body_lines(request: Request) -> Iterator[str]:
+    """
+    Líneas del cuerpo de la petición leídas en streaming desde un handler
+    síncrono (threadpool): cada bloque se pide al event loop con from_thread.
+    """
+    stream = request.stream()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        try:
+            chunk = anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            break
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+@router.post("/bulk")
+def bulk_import_procesos(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson | csv (por defecto según Content-Type)"),
+    chunk_size: int = Query(bulk_import.DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    user: dict = Depends(role_required(["admin", "operator"]))
+):
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in bulk_import.FORMATS:
+        raise HTTPException(status_code=400, detail="Formato no soportado. Use ndjson o csv.")
+    return bulk_import.import_procesos(
+        db, _iter_body_lines(request), fmt, get_current_user_name(),
+        license_mode=settings.LICENSE_MODE, chunk_size=chunk_size
+    )
+
 @router.get("", response_model=List[schemas.ProcesoSchema])
 def list_procesos(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Token de continuación. Vacío para iniciar la paginación por cursor."),
     fecha_desde: Optional[date] = None,
     fecha_hasta: Optional[date] = None,
     estado: Optional[models.EstadoProceso] = None,
@@ -46,7 +88,36 @@ def list_procesos(
     db: Session = Depends(get_db),
     user: dict = Depends(get_current_user)
 ):
-    return crud.get_procesos(db, skip, limit, fecha_desde, fecha_hasta, estado, numero_proceso, license_mode=settings.LICENSE_MODE)
+    if cursor is None:
+        # Modo clásico (skip/limit) para clientes anteriores
+        return crud.get_procesos(db, skip, limit, fecha_desde, fecha_hasta, estado, numero_proceso, license_mode=settings.LICENSE_MODE)
+
+    try:
+        items, next_cursor = crud.get_procesos_page(
+            db, cursor, limit, fecha_desde, fecha_hasta, estado, numero_proceso,
+            license_mode=settings.LICENSE_MODE
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+@router.get("/search", response_model=List[schemas.ProcesoSearchResult])
+def search_procesos(
+    q: str = Query(..., min_length=2, description="Texto libre: número, partes, observaciones o contenido de documentos"),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    user: dict = Depends(get_current_user)
+):
+    results = []
+    for proceso, rank, snippet in crud.search_procesos(db, q, limit, license_mode=settings.LICENSE_MODE):
+        data = schemas.ProcesoSchema.model_validate(proceso).model_dump()
+        data["rank"] = rank
+        data["snippet"] = snippet
+        results.append(data)
+    return results
 
 @router.get("/{proceso_id}", response_model=schemas.ProcesoDetailSchema)
 def get_proceso_detail(
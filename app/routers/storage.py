@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File as FastAPIFile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File as FastAPIFile
 from fastapi.responses import FileResponse, JSONResponse
+from email.utils import formatdate, parsedate_to_datetime
 from sqlalchemy.orm import Session
 from pathlib import Path
 
 from ..storage_service import StorageService
 from .. import storage_utils, schemas
-from ..database import get_db
+from ..database import get_db, SessionLocal
+from ..core.cache import TTLCache, MISSING
 from ..core.config import settings
 from ..core.security import get_current_user, role_required
 
@@ -17,6 +19,22 @@ router = APIRouter(
 def get_storage(db: Session = Depends(get_db)):
     return StorageService(db, settings.FILES_ROOT)
 
+# blob_stats recorre las tablas completas: se recalcula como mucho cada BLOB_STATS_TTL_SECONDS
+BLOB_STATS_TTL_SECONDS = 30
+_blob_stats_cache = TTLCache(BLOB_STATS_TTL_SECONDS, max_entries=1)
+
+def blob_store_stats():
+    """Fuente para /api/admin/metrics: ratio de deduplicación y bytes ahorrados."""
+    stats = _blob_stats_cache.get("blob_stats")
+    if stats is MISSING:
+        db = SessionLocal()
+        try:
+            stats = StorageService(db, settings.FILES_ROOT).blob_stats()
+        finally:
+            db.close()
+        _blob_stats_cache.set("blob_stats", stats)
+    return stats
+
 @router.post("/folders")
 def create_folder(
     folder: schemas.FolderCreate,
@@ -39,28 +57,74 @@ def list_files(
     return records
 
 @router.post("/upload")
-async def upload_file(
+def upload_file(
     path: str = Query(...), 
     file: UploadFile = FastAPIFile(...),
     user: dict = Depends(role_required(["admin", "operator"])),
     storage: StorageService = Depends(get_storage)
 ):
-    content = await file.read()
-    record = storage.upload_file(user["id"], path, file.filename, content, file.content_type)
+    # Handler síncrono (threadpool): el archivo se lee por bloques desde el
+    # temporal de Starlette sin cargarlo completo en memoria
+    record = storage.upload_stream(user["id"], path, file.filename, file.file, file.content_type)
     if not record:
         return JSONResponse(status_code=400, content={"error": {"code": "UPLOAD_FAILED", "message": "Error al guardar el archivo"}})
     return record
 
+# Un blob nunca cambia de contenido (su ruta es su hash): se puede cachear indefinidamente.
+# "private" porque la descarga requiere autenticación.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+def _is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    Evalúa los GET condicionales (RFC 9110): If-None-Match tiene prioridad y,
+    sólo si no viene, se usa If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if not etag:
+            return False
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
 @router.get("/download/{file_id}")
 def download_file(
     file_id: str,
+    request: Request,
     user: dict = Depends(get_current_user),
     storage: StorageService = Depends(get_storage)
 ):
-    path = storage.get_file_path(user["id"], file_id)
-    if not path or not path.exists():
+    found = storage.get_file(user["id"], file_id)
+    if not found or not found[1] or not found[1].exists():
         return JSONResponse(status_code=404, content={"error": {"code": "FILE_NOT_FOUND", "message": "Archivo no existe"}})
-    return FileResponse(path)
+    record, path = found
+    stat_result = path.stat()
+    headers = {
+        "cache-control": IMMUTABLE_CACHE_CONTROL if record.blob_sha256 else REVALIDATE_CACHE_CONTROL,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+    etag = f'"{record.sha256}"' if record.sha256 else None
+    if etag:
+        headers["etag"] = etag
+
+    if _is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse atiende Range/If-Range (206 y 416) usando el ETag y Last-Modified dados.
+    # Los blobs se nombran por hash: el nombre original va en Content-Disposition (inline,
+    # para que el navegador muestre la vista previa como antes)
+    return FileResponse(
+        path, filename=record.name, media_type=record.mime_type, headers=headers, stat_result=stat_result,
+        content_disposition_type="inline"
+    )
 
 @router.post("/trash")
 def trash_file(
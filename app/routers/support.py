@@ -1,24 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import logging
+import sqlite3
 from .. import schemas
-from ..core.config import settings
-from ..crm_service import CRMService
+from ..crm_service import crm_outbox, crm_deliverer
 from ..hotel_auth import require_auth, HotelGuest
 
+logger = logging.getLogger("chechy.crm")
+
 router = APIRouter(
     prefix="/api/support",
     tags=["Soporte & CRM"]
 )
 
-# Shared instance for the pilot
-crm = CRMService()
-
-@router.post("/ticket")
+@router.post("/ticket", status_code=202)
 async def create_support_ticket(
     ticket: schemas.SupportTicket,
     user: HotelGuest = Depends(require_auth)
 ):
     """
     Reporta un problema o incidencia a la Oficina Central (King CRM).
+    El ticket queda en la bandeja de salida y se envía en segundo plano.
     """
     ticket_data = {
         "subject": ticket.subject,
@@ -26,17 +28,32 @@ async def create_support_ticket(
         "priority": ticket.priority,
         "user_email": user.email
     }
-    
-    result = crm.report_incident(ticket_data)
-    
-    if not result:
+
+    try:
+        ticket_id = await asyncio.to_thread(crm_outbox.enqueue, ticket_data)
+    except sqlite3.Error as e:
+        logger.error(f"No se pudo registrar el ticket en la bandeja: {e}")
         raise HTTPException(
             status_code=503,
-            detail="La Oficina Central no está respondiendo. Intente más tarde."
+            detail="No se pudo registrar el reporte. Intente más tarde."
         )
-    
+    crm_deliverer.notify()
+
     return {
-        "status": "success", 
-        "message": "Reporte enviado con éxito a la Oficina Central.",
-        "remote_id": result.get("id")
+        "status": "queued",
+        "message": "Reporte registrado. Se enviará a la Oficina Central.",
+        "ticket_id": ticket_id
     }
+
+@router.get("/ticket/{ticket_id}")
+async def get_support_ticket(
+    ticket_id: str,
+    user: HotelGuest = Depends(require_auth)
+):
+    """
+    Estado de entrega de un ticket: pending, sent (con remote_id) o failed.
+    """
+    entry = await asyncio.to_thread(crm_outbox.get, ticket_id)
+    if not entry or (entry["user_email"] != user.email and user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Ticket no encontrado")
+    return entry
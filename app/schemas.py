@@ -89,6 +89,10 @@ class ProcesoSchema(ProcesoBase):
 class ProcesoDetailSchema(ProcesoSchema):
     audit_trail: List[AuditLogSchema] = []
 
+class ProcesoSearchResult(ProcesoSchema):
+    rank: float
+    snippet: Optional[str] = None  # Fragmento HTML escapado con coincidencias resaltadas (<mark>)
+
 # ============================================
 # SCHEMAS DE DOCUMENTOS
 # ============================================
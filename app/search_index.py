@@ -0,0 +1,130 @@
+"""
+Índice de texto completo (SQLite FTS5) sobre procesos y el texto de sus documentos.
+
+La tabla virtual `procesos_fts` usa rowid = procesos.id y se mantiene
+sincronizada con triggers, de modo que cualquier escritura (ORM, SQL directo o
+scripts) queda indexada en la misma transacción. Los procesos con soft delete
+se retiran del índice.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "procesos_fts"
+
+# Filas FTS de los procesos vigentes (incluye el texto de sus documentos vinculados)
+_FTS_ROWS = """
+INSERT INTO procesos_fts(rowid, numero_proceso, partes, observaciones, documentos)
+SELECT p.id, p.numero_proceso, p.partes, coalesce(p.observaciones, ''),
+       coalesce((SELECT group_concat(d.extracted_text, ' ')
+                 FROM process_documents pd JOIN documents d ON d.id = pd.document_id
+                 WHERE pd.process_id = p.id AND d.extracted_text IS NOT NULL), '')
+FROM procesos p WHERE p.deleted_at IS NULL{extra};
+"""
+
+def _refresh_rows(pids: str) -> str:
+    return f"DELETE FROM procesos_fts WHERE rowid IN ({pids});" + _FTS_ROWS.format(extra=f" AND p.id IN ({pids})")
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS procesos_fts USING fts5(
+        numero_proceso, partes, observaciones, documentos,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS procesos_fts_ai AFTER INSERT ON procesos BEGIN
+    {_refresh_rows("new.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS procesos_fts_au AFTER UPDATE ON procesos BEGIN
+    {_refresh_rows("new.id")}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS procesos_fts_ad AFTER DELETE ON procesos BEGIN
+    DELETE FROM procesos_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS procesos_fts_doc_au AFTER UPDATE OF extracted_text ON documents BEGIN
+    {_refresh_rows("SELECT pd.process_id FROM process_documents pd WHERE pd.document_id = new.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS procesos_fts_link_ai AFTER INSERT ON process_documents BEGIN
+    {_refresh_rows("new.process_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS procesos_fts_link_ad AFTER DELETE ON process_documents BEGIN
+    {_refresh_rows("old.process_id")}
+    END
+    """,
+]
+
+def ensure_fts_index(engine: Engine) -> bool:
+    """
+    Crea la tabla FTS5 y sus triggers si no existen y la puebla la primera vez.
+    Retorna False si el motor no es SQLite (la búsqueda usa el respaldo LIKE).
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    with engine.begin() as conn:
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+        for ddl in _DDL:
+            conn.exec_driver_sql(ddl)
+        if not existed:
+            rebuild_fts_index(conn)
+    return True
+
+def rebuild_fts_index(conn) -> None:
+    """Repuebla el índice completo desde las tablas base."""
+    conn.exec_driver_sql("DELETE FROM procesos_fts")
+    conn.exec_driver_sql(_FTS_ROWS.format(extra=""))
+
+def build_match_query(q: str) -> str:
+    """
+    Convierte texto libre en una expresión MATCH segura: cada término se
+    cita como frase (neutraliza la sintaxis FTS5) y admite búsqueda por prefijo.
+    """
+    terms = [t.replace('"', '""') for t in q.split() if t.strip('"')]
+    return " ".join(f'"{t}"*' for t in terms)
+
+# Marcadores de coincidencia sin significado en HTML: el snippet sale del texto
+# crudo (partes, texto de documentos) y se escapa antes de convertirlos en <mark>
+SNIPPET_OPEN = "\x02"
+SNIPPET_CLOSE = "\x03"
+
+def search(db: Session, q: str, limit: int = 20, min_fecha=None) -> List[Tuple[int, float, str]]:
+    """
+    Ejecuta la búsqueda rankeada (bm25) y retorna [(proceso_id, rank, snippet)].
+    El snippet es texto crudo con las coincidencias entre SNIPPET_OPEN/SNIPPET_CLOSE.
+    El número de proceso y las partes pesan más que observaciones y documentos.
+    """
+    match = build_match_query(q)
+    if not match:
+        return []
+
+    sql = """
+        SELECT procesos_fts.rowid AS id,
+               bm25(procesos_fts, 10.0, 5.0, 1.0, 1.0) AS rank,
+               snippet(procesos_fts, -1, :mark_open, :mark_close, '…', 12) AS snippet
+        FROM procesos_fts
+        JOIN procesos p ON p.id = procesos_fts.rowid
+        WHERE procesos_fts MATCH :match AND p.deleted_at IS NULL
+    """
+    params = {"match": match, "limit": limit, "mark_open": SNIPPET_OPEN, "mark_close": SNIPPET_CLOSE}
+    if min_fecha:
+        sql += " AND p.fecha_radicacion >= :min_fecha"
+        params["min_fecha"] = min_fecha.isoformat()
+    sql += " ORDER BY rank LIMIT :limit"
+
+    return [(row.id, row.rank, row.snippet) for row in db.execute(text(sql), params)]
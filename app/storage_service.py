@@ -1,17 +1,28 @@
+import io
 import os
 import shutil
 import hashlib
+import tempfile
 import uuid
 import json
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import BinaryIO, List, Optional, Dict, Any, Tuple
+from sqlalchemy import func, update, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from . import models, schemas, storage_utils
 
+# Tamaño de bloque para subidas en streaming
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 class StorageService:
     def __init__(self, db: Session, base_root: str):
         self.db = db
         self.base_root = base_root
+        self.blobs_root = Path(base_root).resolve() / "blobs"
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blobs_root / sha256[:2] / sha256[2:4] / sha256
 
     def _get_user_db_record(self, user_id: str, file_id: str) -> Optional[models.FileRecord]:
         return self.db.query(models.FileRecord).filter(
@@ -27,36 +38,111 @@ class StorageService:
         return True
 
     def upload_file(self, user_id: str, relative_path: str, file_name: str, content: bytes, mime_type: str) -> Optional[models.FileRecord]:
+        return self.upload_stream(user_id, relative_path, file_name, io.BytesIO(content), mime_type)
+
+    def upload_stream(self, user_id: str, relative_path: str, file_name: str, stream: BinaryIO, mime_type: str,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> Optional[models.FileRecord]:
+        """
+        Guarda el archivo leyendo `stream` por bloques y calculando el SHA256 de
+        forma incremental, sin depender del tamaño del archivo en memoria.
+        El contenido se almacena una sola vez como blob direccionado por hash:
+        si ya existe, se descarta el temporal y sólo se incrementa su refcount.
+        """
         target_dir = storage_utils.sanitize_path(self.base_root, user_id, relative_path)
         if not target_dir:
             return None
         
         target_dir.mkdir(parents=True, exist_ok=True)
-        file_path = target_dir / file_name
         
-        # Guardar archivo físicamente
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Temporal junto a los blobs: os.replace es atómico sólo dentro del mismo sistema de archivos
+        tmp_dir = self.blobs_root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            sha256 = hasher.hexdigest()
+            self._acquire_blob(sha256, size, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         
-        # Calcular SHA256
-        sha256 = hashlib.sha256(content).hexdigest()
         file_id = str(uuid.uuid4())
         
-        # Persistir en DB
+        # Persistir en DB (el refcount del blob se confirma en la misma transacción)
         db_record = models.FileRecord(
             file_id=file_id,
             user_id=user_id,
             name=file_name,
             path=str(Path(relative_path) / file_name),
             mime_type=mime_type,
-            size_bytes=len(content),
-            sha256=sha256
+            size_bytes=size,
+            sha256=sha256,
+            blob_sha256=sha256
         )
         self.db.add(db_record)
         self.db.commit()
         self.db.refresh(db_record)
         return db_record
 
+    def _acquire_blob(self, sha256: str, size: int, tmp_path: str):
+        """Suma una referencia al blob o lo crea moviendo el temporal a su ruta final."""
+        increment = update(models.Blob).where(models.Blob.sha256 == sha256).values(refcount=models.Blob.refcount + 1)
+        blob_path = self._blob_path(sha256)
+        known = self.db.execute(increment).rowcount > 0
+        if not known or not blob_path.exists():
+            # Blob nuevo (o fila cuyo archivo se perdió): se mueve el temporal a su ruta final
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, blob_path)
+        if known:
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.add(models.Blob(sha256=sha256, size_bytes=size, refcount=1))
+        except IntegrityError:
+            # Otra subida concurrente creó el blob primero
+            self.db.execute(increment)
+
+    def _release_blob(self, sha256: str):
+        """Resta una referencia y elimina el blob cuando nadie más lo usa."""
+        self.db.execute(
+            update(models.Blob).where(models.Blob.sha256 == sha256).values(refcount=models.Blob.refcount - 1)
+        )
+        deleted = self.db.execute(
+            delete(models.Blob).where(models.Blob.sha256 == sha256, models.Blob.refcount <= 0)
+        ).rowcount
+        if deleted:
+            # Se borra el archivo antes del commit: mientras la transacción retiene el
+            # bloqueo de escritura, ninguna subida concurrente puede recrear el blob
+            blob_path = self._blob_path(sha256)
+            if blob_path.exists():
+                os.remove(blob_path)
+
+    def blob_stats(self) -> Dict[str, Any]:
+        """Métricas de deduplicación: bytes lógicos (FileRecords) vs físicos (blobs)."""
+        logical_bytes, logical_files = self.db.query(
+            func.coalesce(func.sum(models.FileRecord.size_bytes), 0), func.count(models.FileRecord.id)
+        ).filter(models.FileRecord.blob_sha256.isnot(None)).one()
+        physical_bytes, blobs = self.db.query(
+            func.coalesce(func.sum(models.Blob.size_bytes), 0), func.count(models.Blob.sha256)
+        ).one()
+        return {
+            "files": logical_files,
+            "blobs": blobs,
+            "logical_bytes": logical_bytes,
+            "physical_bytes": physical_bytes,
+            "bytes_saved": logical_bytes - physical_bytes,
+            "dedup_ratio": round(logical_bytes / physical_bytes, 4) if physical_bytes else 1.0,
+        }
+
     def list_files(self, user_id: str, relative_path: str) -> List[models.FileRecord]:
         # Filtrar por usuario y prefijo de ruta (simplificado)
         search_path = str(Path(relative_path))
@@ -66,17 +152,33 @@ class StorageService:
             models.FileRecord.status == "active"
         ).all()
 
-    def get_file_path(self, user_id: str, file_id: str) -> Optional[Path]:
+    def _physical_path(self, user_id: str, record: models.FileRecord) -> Optional[Path]:
+        if record.blob_sha256:
+            return self._blob_path(record.blob_sha256)
+        return storage_utils.sanitize_path(self.base_root, user_id, record.path)
+
+    def get_file(self, user_id: str, file_id: str) -> Optional[Tuple[models.FileRecord, Path]]:
         record = self._get_user_db_record(user_id, file_id)
         if not record:
             return None
-        return storage_utils.sanitize_path(self.base_root, user_id, record.path)
+        return record, self._physical_path(user_id, record)
+
+    def get_file_path(self, user_id: str, file_id: str) -> Optional[Path]:
+        found = self.get_file(user_id, file_id)
+        return found[1] if found else None
 
     def move_to_trash(self, user_id: str, file_id: str) -> bool:
         record = self._get_user_db_record(user_id, file_id)
         if not record:
             return False
         
+        if record.blob_sha256:
+            # El contenido vive en el blob compartido: la papelera es sólo lógica
+            record.status = "trashed"
+            record.path = f"trash/{record.name}"
+            self.db.commit()
+            return True
+
         current_path = storage_utils.sanitize_path(self.base_root, user_id, record.path)
         trash_dir = storage_utils.sanitize_path(self.base_root, user_id, "trash")
         
@@ -94,9 +196,12 @@ class StorageService:
         if not record:
             return False
         
-        current_path = storage_utils.sanitize_path(self.base_root, user_id, record.path)
-        if current_path and current_path.exists():
-            os.remove(current_path)
+        if record.blob_sha256:
+            self._release_blob(record.blob_sha256)
+        else:
+            current_path = storage_utils.sanitize_path(self.base_root, user_id, record.path)
+            if current_path and current_path.exists():
+                os.remove(current_path)
         
         self.db.delete(record)
         self.db.commit()
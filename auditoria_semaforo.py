@@ -3,6 +3,7 @@
 Protocolo de auditoría con indicadores visuales de estado
 """
 
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -347,7 +348,7 @@ def main():
                  print_section("🤝 7. INTEGRACIÓN CRM")
                  from app.crm_service import CRMService
                  crm = CRMService(os.getenv("CRM_API_URL"), os.getenv("CRM_API_KEY"))
-                 if crm.check_health():
+                 if asyncio.run(crm.check_health()):
                      print_status("🟢", "VERDE", "Conexión CRM", "Establecida correctamente")
                  else:
                      print_status("🔴", "ROJO", "Conexión CRM", "Falló el health check")
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 
 def dispatch():
     TASK_QUEUE = "antigravity_out/tasks"
@@ -12,12 +13,15 @@ def dispatch():
         "target_file": "antigravity_reports/jules/deploy_log_v2.txt",
         "action": "EXEC",
         "content": "python scripts/deploy_production.py",
-        "priority": 1
+        "priority": 1,
+        "timestamp": time.time()
     }
     
     task_file = f"{TASK_QUEUE}/{task_id}.json"
-    with open(task_file, "w", encoding="utf-8") as f:
+    # Escritura atómica (tmp + rename) para que Jules no lea el archivo a medias
+    with open(f"{task_file}.tmp", "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=4)
+    os.replace(f"{task_file}.tmp", task_file)
     
     print(f"Task {task_id} dispatched to Jules.")
 
@@ -1,9 +1,13 @@
 from __future__ import annotations
 import json
 import os
+import socket
 import sys
 import time
+import signal
 import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, asdict
 from typing import List, Dict, Any, Optional
 from pathlib import Path
@@ -17,6 +21,31 @@ import logging
 logging.basicConfig(level=logging.INFO, format='[JULES-WORKER] %(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("jules")
 
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Sin watchdog se revisa la cola cada `poll_interval`
+    FileSystemEventHandler = object
+    Observer = None
+
+# Sufijos de los archivos de la cola: <id>.json pendiente,
+# <id>.json.<host>-<pid>_<nonce>.claimed tomada por un worker, <id>.json.invalid ilegible.
+# La fecha de modificación del claim es el vencimiento de su lease (ver claim_next).
+CLAIM_SUFFIX = ".claimed"
+INVALID_SUFFIX = ".invalid"
+CANCEL_SUFFIX = ".cancel"  # <id>.cancel: marca de cancelación creada por /api/jules/cancel
+# Un archivo que no se puede leer durante más de esto se descarta como inválido
+# (antes se asume que un despachador no atómico todavía lo está escribiendo)
+UNREADABLE_GRACE_SECONDS = 5.0
+# Líneas finales de la salida de un comando que se copian al mensaje del reporte
+REPORT_TAIL_LINES = 50
+# Cada cuánto se revisan el timeout y la marca de cancelación de un comando
+COMMAND_CHECK_SECONDS = 0.2
+
+# Claims en curso en este proceso (compartido por todas las instancias de JulesWorker)
+_held_claims: set = set()
+_held_lock = threading.Lock()
+
 @dataclass
 class JulesConfig:
     allowed_dirs: List[str] = field(default_factory=lambda: ["app", "static", "antigravity_reports", "scripts"])
@@ -24,6 +53,11 @@ class JulesConfig:
     task_queue_path: str = "antigravity_out/tasks"
     reports_path: str = "antigravity_reports/jules"
     auto_start: bool = True
+    poll_interval: float = 1.0  # Sólo sin watchdog
+    rescan_interval: float = 30.0  # Con watchdog: revisión de respaldo y de claims huérfanos
+    stale_claim_seconds: float = 3600.0  # Claims de otro host se re-encolan este tiempo después de vencer su lease
+    max_workers: int = 4  # Tareas simultáneas; las del mismo target_file siempre van en orden
+    task_timeout: float = 1800.0  # Segundos por tarea si la tarea no define `timeout`
 
 @dataclass
 class PatchTask:
@@ -32,13 +66,37 @@ class PatchTask:
     action: str # "REPLACE", "APPEND", "AUDIT"
     content: str
     verification_cmd: Optional[str] = None
-    priority: int = 1
+    priority: int = 1  # Mayor número = se atiende antes
     timestamp: float = field(default_factory=time.time)
+    timeout: Optional[float] = None
+
+class TaskInterrupted(Exception):
+    """El comando de la tarea se detuvo por timeout o cancelación."""
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+class _QueueEventHandler(FileSystemEventHandler):
+    """Despierta al worker ante cualquier cambio en el directorio de la cola."""
+
+    def __init__(self, wake: threading.Event):
+        self.wake = wake
+
+    def on_any_event(self, event):
+        self.wake.set()
 
 class JulesWorker:
     def __init__(self, config: JulesConfig):
         self.config = config
         self.running = False
+        # nonce: tras reiniciar con el mismo host y PID (PID 1 en Docker) el tag cambia
+        self.claim_tag = f"{_host_tag()}-{os.getpid()}_{os.urandom(4).hex()}"
+        self._wake = threading.Event()
+        self._meta_cache: Dict[str, tuple] = {}  # nombre -> (mtime, orden, target)
+        self._lock = threading.Lock()
+        self._busy_targets: set = set()
+        self._in_flight = 0
         self._ensure_dirs()
         
     def _ensure_dirs(self):
@@ -81,17 +139,86 @@ class JulesWorker:
             
         logger.info(f"Iniciando verificación determinista: {task.verification_cmd}")
         try:
-            result = subprocess.run(task.verification_cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
+            returncode, output = self.run_command(task, task.verification_cmd)
+            if returncode == 0:
                 logger.info("VERIFICACIÓN EXITOSA.")
                 return True
             else:
-                logger.warning(f"VERIFICACIÓN FALLIDA: {result.stderr}")
+                logger.warning(f"VERIFICACIÓN FALLIDA: {output}")
                 return False
+        except TaskInterrupted:
+            raise
         except Exception as e:
             logger.error(f"Error en verificación: {e}")
             return False
 
+    def log_path(self, task_id: str) -> str:
+        return os.path.join(self.config.reports_path, f"report_{task_id}.log")
+
+    def cancel_path(self, task_id: str) -> str:
+        return os.path.join(self.config.task_queue_path, f"{task_id}{CANCEL_SUFFIX}")
+
+    def cancel_requested(self, task_id: str) -> bool:
+        return os.path.exists(self.cancel_path(task_id))
+
+    def run_command(self, task: PatchTask, command: str) -> tuple:
+        """
+        Ejecuta `command` volcando stdout/stderr línea a línea en report_<id>.log
+        mientras corre. Retorna (código de salida, últimas líneas de la salida).
+        Lanza TaskInterrupted si vence el timeout o se pide cancelar la tarea;
+        en ese caso se termina todo el grupo de procesos del comando.
+        """
+        timeout = task.timeout or self.config.task_timeout
+        tail = deque(maxlen=REPORT_TAIL_LINES)
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        log_file = self.log_path(task.id)
+        with open(log_file, "a", encoding="utf-8") as log:
+            log.write(f"$ {command}\n")
+        # Los comandos permitidos son scripts de Python: sin PYTHONUNBUFFERED el hijo
+        # acumula su stdout en el pipe y el log no se vería hasta que termine
+        proc = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, errors="replace", bufsize=1, env={**os.environ, "PYTHONUNBUFFERED": "1"}, **group
+        )
+
+        def pump():
+            # Handle propio: si un nieto (p. ej. con setsid) mantiene abierto stdout,
+            # este hilo sigue registrando su salida después de que run_command retorna
+            with open(log_file, "a", encoding="utf-8") as log:
+                for line in proc.stdout:
+                    log.write(line)
+                    log.flush()
+                    tail.append(line)
+            proc.stdout.close()
+
+        reader = threading.Thread(target=pump, name=f"jules-log-{task.id}", daemon=True)
+        reader.start()
+        deadline = time.monotonic() + timeout
+        interrupted = None
+        while True:
+            try:
+                proc.wait(COMMAND_CHECK_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if self.cancel_requested(task.id):
+                interrupted = TaskInterrupted("CANCELLED", "Tarea cancelada por el usuario.")
+            elif time.monotonic() > deadline:
+                interrupted = TaskInterrupted("TIMEOUT", f"Tiempo límite de {timeout:.0f} s excedido.")
+            if interrupted:
+                _terminate(proc)
+                break
+        reader.join(5)
+        if reader.is_alive():
+            logger.warning(f"Tarea {task.id}: un proceso hijo mantiene abierta la salida; el log seguirá creciendo")
+        if interrupted:
+            raise interrupted
+        # copy(): el hilo lector puede seguir agregando líneas
+        return proc.returncode, "".join(tail.copy())
+
     ALLOWED_COMMANDS = [
         "python build_portable.py",
         "python auditoria_semaforo.py",
@@ -106,6 +233,10 @@ class JulesWorker:
     def process_task(self, task: PatchTask):
         logger.info(f"Consumiendo tarea {task.id} -> Acción: {task.action}")
         
+        if self.cancel_requested(task.id):
+            self.create_report(task, "CANCELLED", "Tarea cancelada antes de iniciar.")
+            return
+
         if not self.validate_subordination(task):
             self.create_report(task, "FAILED", "Error de subordinación: Alcance prohibido.")
             return
@@ -120,11 +251,11 @@ class JulesWorker:
                     return
 
                 logger.info(f"Ejecutando comando seguro: {task.content}")
-                result = subprocess.run(task.content, shell=True, capture_output=True, text=True)
-                if result.returncode == 0:
-                    self.create_report(task, "DONE", f"Comando ejecutado con éxito.\nSTDOUT: {result.stdout}")
+                returncode, output = self.run_command(task, task.content)
+                if returncode == 0:
+                    self.create_report(task, "DONE", f"Comando ejecutado con éxito.\nSALIDA: {output}")
                 else:
-                    self.create_report(task, "FAILED", f"Comando falló (code {result.returncode}).\nSTDERR: {result.stderr}")
+                    self.create_report(task, "FAILED", f"Comando falló (code {returncode}).\nSALIDA: {output}")
             
             elif task.action == "PATCH" or task.action == "REPLACE":
                 logger.info(f"Aplicando patch/replace en {task.target_file}")
@@ -139,8 +270,8 @@ class JulesWorker:
             elif task.action == "AUDIT":
                 logger.info("Iniciando escaneo de seguridad...")
                 # Simular escaneo o ejecutar pip audit/safety
-                result = subprocess.run(f"pip list --outdated", shell=True, capture_output=True, text=True)
-                summary = f"Escaneo completado. Paquetes desactualizados:\n{result.stdout}"
+                _, output = self.run_command(task, "pip list --outdated")
+                summary = f"Escaneo completado. Paquetes desactualizados:\n{output}"
                 self.create_report(task, "DONE", summary)
             
             else:
@@ -149,6 +280,9 @@ class JulesWorker:
                     f.write(task.content)
                 self.create_report(task, "DONE", f"Tarea '{task.action}' procesada por defecto.")
                 
+        except TaskInterrupted as e:
+            logger.warning(f"Tarea {task.id} interrumpida: {e.status}")
+            self.create_report(task, e.status, str(e))
         except Exception as e:
             logger.error(f"Error procesando tarea {task.id}: {e}")
             self.create_report(task, "ERROR", str(e))
@@ -161,30 +295,267 @@ class JulesWorker:
             "timestamp": time.time(),
             "target": task.target_file
         }
+        if os.path.exists(self.log_path(task.id)):
+            report["log_file"] = self.log_path(task.id)
         report_file = os.path.join(self.config.reports_path, f"report_{task.id}.json")
-        with open(report_file, "w", encoding="utf-8") as f:
+        # Escritura atómica: /api/jules/status nunca lee un reporte a medias
+        with open(f"{report_file}.tmp", "w", encoding="utf-8") as f:
             json.dump(report, f, indent=4)
+        os.replace(f"{report_file}.tmp", report_file)
         logger.info(f"Reporte generado: {status} - {report_file}")
 
+    # --- Cola ---
+
+    @staticmethod
+    def target_key(target_file: str) -> str:
+        return os.path.normcase(os.path.abspath(target_file or ""))
+
+    def _sort_key(self, name: str, path: str, mtime: float):
+        """((-prioridad, timestamp, nombre), target) o None si el archivo aún no es legible."""
+        cached = self._meta_cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1:]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Sin timestamp (despachadores antiguos) se usa la fecha del archivo
+            key = (-int(data.get("priority", 1)), float(data.get("timestamp") or mtime), name)
+            target = self.target_key(data.get("target_file"))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+        self._meta_cache[name] = (mtime, key, target)
+        return key, target
+
+    def pending_tasks(self) -> List[tuple]:
+        """(archivo, target) pendientes, ordenados por prioridad y luego por antigüedad."""
+        entries = []
+        names = set()
+        with os.scandir(self.config.task_queue_path) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                names.add(entry.name)
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                meta = self._sort_key(entry.name, entry.path, mtime)
+                if meta is None:
+                    if time.time() - mtime > UNREADABLE_GRACE_SECONDS:
+                        self._discard_invalid(entry.path)
+                    continue
+                entries.append(meta)
+        for name in list(self._meta_cache):
+            if name not in names:
+                del self._meta_cache[name]
+        return [(key[2], target) for key, target in sorted(entries)]
+
+    def _discard_invalid(self, path: str):
+        logger.error(f"Tarea ilegible, se aparta: {os.path.basename(path)}")
+        try:
+            os.replace(path, path + INVALID_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    def claim_next(self, busy_targets: frozenset = frozenset()) -> Optional[tuple]:
+        """
+        Toma la siguiente tarea renombrándola a .claimed. El rename es atómico:
+        si otro worker la tomó primero falla y se intenta con la siguiente.
+        Se saltan las tareas cuyo target_file está en `busy_targets` (y las
+        posteriores del mismo target, para conservar su orden).
+        La fecha de modificación del claim se fija al vencimiento del lease (ahora
+        más el timeout efectivo de la tarea): otro host no la re-encola mientras
+        la tarea pueda seguir corriendo.
+        Retorna (tarea, ruta del claim) o None si no hay nada disponible.
+        """
+        skipped = set(busy_targets)
+        for name, target in self.pending_tasks():
+            if target in skipped:
+                continue
+            path = os.path.join(self.config.task_queue_path, name)
+            claimed = f"{path}.{self.claim_tag}{CLAIM_SUFFIX}"
+            # Se registra antes del rename: recover_stale_claims nunca ve el claim sin registrar
+            with _held_lock:
+                _held_claims.add(claimed)
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                with _held_lock:
+                    _held_claims.discard(claimed)
+                skipped.add(target)
+                continue
+            try:
+                with open(claimed, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                task = PatchTask(**data)
+                now = time.time()
+                os.utime(claimed, (now, now + (task.timeout or self.config.task_timeout)))
+                return task, claimed
+            except Exception as e:
+                logger.error(f"Error leyendo tarea {name}: {e}")
+                os.replace(claimed, path + INVALID_SUFFIX)
+                with _held_lock:
+                    _held_claims.discard(claimed)
+        return None
+
+    def recover_stale_claims(self):
+        """
+        Devuelve a la cola las tareas tomadas por workers caídos:
+        - de este mismo proceso (host y PID) si no están en curso: quedaron de una
+          ejecución anterior que reutilizó el PID (al arrancar se re-encolan todas);
+        - del mismo host si su proceso ya no existe;
+        - de otros hosts si pasaron `stale_claim_seconds` desde que venció su lease.
+        """
+        host = _host_tag()
+        now = time.time()
+        for name in os.listdir(self.config.task_queue_path):
+            if not name.endswith(CLAIM_SUFFIX):
+                continue
+            base, _, tag = name[:-len(CLAIM_SUFFIX)].rpartition(".")
+            claim_host, _, owner = tag.rpartition("-")
+            pid = owner.partition("_")[0]  # Claims antiguos no llevan nonce
+            path = os.path.join(self.config.task_queue_path, name)
+            if claim_host == host and pid == str(os.getpid()):
+                with _held_lock:
+                    stale = path not in _held_claims
+            elif claim_host == host and pid.isdigit() and sys.platform != "win32":
+                stale = not _pid_alive(int(pid))
+            else:
+                try:
+                    stale = now - os.stat(path).st_mtime > self.config.stale_claim_seconds
+                except FileNotFoundError:
+                    continue
+            if stale:
+                requeued = os.path.join(self.config.task_queue_path, base)
+                try:
+                    os.rename(path, requeued)
+                    os.utime(requeued)  # Quita el vencimiento del lease
+                    logger.warning(f"Claim huérfano re-encolado: {base} (worker {tag})")
+                except FileNotFoundError:
+                    pass
+
+    def _finish(self, task: PatchTask, claim_path: str):
+        try:
+            os.remove(claim_path)  # Marcar como consumida
+        finally:
+            with _held_lock:
+                _held_claims.discard(claim_path)
+        try:
+            os.remove(self.cancel_path(task.id))
+        except FileNotFoundError:
+            pass
+
+    def run_next(self) -> bool:
+        """Procesa una tarea (en este hilo) si hay alguna pendiente. Retorna False si la cola está vacía."""
+        claimed = self.claim_next()
+        if claimed is None:
+            return False
+        task, claim_path = claimed
+        try:
+            self.process_task(task)
+        finally:
+            self._finish(task, claim_path)
+        return True
+
+    # --- Pool de ejecución ---
+
+    def _execute(self, task: PatchTask, claim_path: str, target: str):
+        try:
+            self.process_task(task)
+        except Exception as e:
+            logger.error(f"Error inesperado en tarea {task.id}: {e}")
+        finally:
+            self._finish(task, claim_path)
+            with self._lock:
+                self._busy_targets.discard(target)
+                self._in_flight -= 1
+            self._wake.set()  # Hay un hueco libre y quizás tareas en espera de este target
+
+    def _fill_pool(self, executor: ThreadPoolExecutor):
+        """Toma tareas mientras haya hueco en el pool y no toquen un target ocupado."""
+        while self.running:
+            with self._lock:
+                if self._in_flight >= self.config.max_workers:
+                    return
+                busy = frozenset(self._busy_targets)
+            claimed = self.claim_next(busy)
+            if claimed is None:
+                return
+            task, claim_path = claimed
+            target = self.target_key(task.target_file)
+            with self._lock:
+                self._busy_targets.add(target)
+                self._in_flight += 1
+            executor.submit(self._execute, task, claim_path, target)
+
     def start_polling(self):
+        """
+        Bucle del worker. Con watchdog espera eventos del directorio (latencia de
+        milisegundos) y revisa la cola cada `rescan_interval` como respaldo; sin
+        watchdog revisa cada `poll_interval`. Las tareas corren en un pool de
+        `max_workers` hilos; la serialización por target_file es por proceso.
+        """
         self.running = True
-        logger.info("Jules Worker iniciado. Esperando tareas de Antigravity...")
-        
-        while self.running:
-            files = [f for f in os.listdir(self.config.task_queue_path) if f.endswith(".json")]
-            for f in files:
-                file_path = os.path.join(self.config.task_queue_path, f)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as tf:
-                        data = json.load(tf)
-                        task = PatchTask(**data)
-                    
-                    self.process_task(task)
-                    os.remove(file_path) # Marcar como consumida
-                except Exception as e:
-                    logger.error(f"Error leyendo tarea {f}: {e}")
-            
-            time.sleep(2) # Polling cada 2 segundos
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_QueueEventHandler(self._wake), self.config.task_queue_path, recursive=False)
+            observer.start()
+        wait = self.config.rescan_interval if observer else self.config.poll_interval
+        logger.info(f"Jules Worker iniciado ({'watchdog' if observer else 'polling'}). Esperando tareas de Antigravity...")
+
+        last_recovery = 0.0
+        executor = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="jules")
+        try:
+            while self.running:
+                self._wake.clear()
+                # La primera vuelta re-encola los claims huérfanos antes de tomar tareas
+                if time.time() - last_recovery >= self.config.rescan_interval:
+                    self.recover_stale_claims()
+                    last_recovery = time.time()
+                self._fill_pool(executor)
+                self._wake.wait(wait)
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+            executor.shutdown(wait=True)
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+
+def _terminate(proc: subprocess.Popen, grace: float = 5.0):
+    """Termina el comando y sus hijos (shell=True lanza un proceso intermedio)."""
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(grace)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    proc.wait()
+
+def _host_tag() -> str:
+    # Sin puntos: el nombre del claim se separa por el último punto
+    return socket.gethostname().replace(".", "_")
+
+def _pid_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        # En Windows os.kill termina el proceso: se recurre sólo a la edad del claim
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
 
 if __name__ == "__main__":
     config = JulesConfig()
@@ -1,12 +1,27 @@
 """
 📂 ORGANIZADOR DE BIBLIOTECA - LegisChechy
 Crea la estructura de carpetas física basada en la base de datos.
+
+La sincronización es incremental:
+- sólo se leen los procesos con `updated_at` >= la marca de la última corrida,
+- la ficha INFO_EXPEDIENTE.txt sólo se reescribe si cambia su hash de contenido,
+- si cambia el estado (o el año) la carpeta se mueve en lugar de dejar copias.
+
+El estado de la sincronización se guarda en Biblioteca_Digital/.sync_state.json.
+Con --full se recorre toda la tabla y se revisa el disco (primera corrida,
+estado perdido o carpetas tocadas a mano).
+
+Uso: python organizar_biblioteca.py [--full] [--workers 8]
 """
+import argparse
+import hashlib
+import json
 import os
+import shutil
 import sys
 import sqlite3
 import re
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Force UTF-8 output for Windows terminals
@@ -17,6 +32,9 @@ if sys.platform == "win32":
 # Configuración
 DB_PATH = "judicial_archive.db"
 BASE_DIR = os.path.join(os.getcwd(), "Biblioteca_Digital")
+STATE_FILE = ".sync_state.json"
+INFO_FILE = "INFO_EXPEDIENTE.txt"
+DEFAULT_WORKERS = 8
 
 class Colors:
     GREEN = '\033[92m'
@@ -30,119 +48,202 @@ def sanitize_name(name):
     clean = re.sub(r'[<>:"/\\|?*]', '_', str(name))
     return clean.strip()
 
-def create_readme(path, proceso):
-    """Crea un archivo de información en la carpeta"""
-    info = f"""EXPEDIENTE DIGITAL
+def relative_path(p):
+    """Estructura: Estado / Año / Numero (primero por Estado para separar Activos de Terminados)"""
+    estado = sanitize_name(p['estado'])
+    fecha = p['fecha_radicacion']  # YYYY-MM-DD
+    year = fecha.split('-')[0] if '-' in str(fecha) else "Sin_Fecha"
+    numero = sanitize_name(p['numero_proceso'])
+    return os.path.join(estado, year, numero)
+
+def render_info(p):
+    """Contenido de la ficha. Es determinista (sin fecha de generación) para que
+    un expediente sin cambios produzca siempre el mismo archivo."""
+    return f"""EXPEDIENTE DIGITAL
 ==================================================
-Número de Proceso: {proceso['numero']}
-Estado: {proceso['estado']}
-Fecha Radicación: {proceso['fecha']}
+Número de Proceso: {p['numero_proceso']}
+Estado: {p['estado']}
+Fecha Radicación: {p['fecha_radicacion']}
 --------------------------------------------------
 Partes:
-{proceso['partes']}
+{p['partes']}
 
-Clase: {proceso['clase']}
-Cuantía: {proceso['cuantia']}
+Clase: {p['clase_proceso'] or "N/A"}
+Cuantía: {p['cuantia_tipo'] or "N/A"}
 
 Observaciones:
-{proceso['observaciones']}
+{p['observaciones'] or ""}
 ==================================================
-Generado automáticamente: {datetime.now()}
+Generado automáticamente por LegisChechy
 """
-    file_path = os.path.join(path, "INFO_EXPEDIENTE.txt")
-    # Solo escribir si ha cambiado o no existe para preservar timestamp de modificación si no es necesario
+
+def load_state(base_dir):
     try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            # Simplificación: si ya existe, lo sobrescribimos para asegurar que está sync
-    except:
-        pass
-        
-    with open(file_path, "w", encoding="utf-8") as f:
+        with open(os.path.join(base_dir, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"watermark": None, "procesos": {}}
+
+def save_state(base_dir, state):
+    # Escritura atómica: una corrida interrumpida no deja el estado a medias
+    path = os.path.join(base_dir, STATE_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def move_folder(src, dst):
+    """Mueve la carpeta del expediente; si el destino ya existe fusiona el contenido."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if not os.path.exists(dst):
+        shutil.move(src, dst)
+        return
+    for name in os.listdir(src):
+        target = os.path.join(dst, name)
+        if not os.path.exists(target):
+            shutil.move(os.path.join(src, name), target)
+    shutil.rmtree(src)
+
+def sync_one(base_dir, task):
+    """
+    Sincroniza un expediente. `task` = (rel_path, contenido, hash, rutas previas, verificar_disco).
+    Devuelve la acción realizada: 'created', 'moved', 'updated' o 'unchanged'.
+    """
+    rel_path, info, digest, old_paths, check_disk = task
+    target = os.path.join(base_dir, rel_path)
+    action = "unchanged"
+
+    for old in old_paths:
+        source = os.path.join(base_dir, old)
+        if old != rel_path and os.path.isdir(source):
+            move_folder(source, target)
+            action = "moved"
+
+    if not os.path.isdir(target):
+        os.makedirs(target)
+        action = "created"
+
+    file_path = os.path.join(target, INFO_FILE)
+    if action == "unchanged" and check_disk:
+        try:
+            with open(file_path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() == digest:
+                    return action
+        except OSError:
+            pass
+
+    with open(file_path, "w", encoding="utf-8", newline="\n") as f:
         f.write(info)
+    return "updated" if action == "unchanged" else action
+
+def existing_folders(base_dir):
+    """Carpetas de expediente en disco (Estado/Año/Numero) indexadas por número."""
+    found = {}
+    for leaf in Path(base_dir).glob("*/*/*"):
+        if leaf.is_dir():
+            found.setdefault(leaf.name, []).append(str(leaf.relative_to(base_dir)))
+    return found
+
+def prune_empty_dirs(base_dir, rel_paths):
+    """Elimina los directorios Estado/Año que quedaron vacíos tras mover carpetas."""
+    for rel in sorted(rel_paths, key=lambda r: r.count(os.sep), reverse=True):
+        path = os.path.join(base_dir, rel)
+        while os.path.abspath(path) != os.path.abspath(base_dir):
+            try:
+                os.rmdir(path)
+            except OSError:
+                break
+            path = os.path.dirname(path)
+
+def sync_biblioteca(db_path=DB_PATH, base_dir=BASE_DIR, full=False, workers=DEFAULT_WORKERS):
+    os.makedirs(base_dir, exist_ok=True)
+    state = load_state(base_dir)
+    known = state["procesos"]
+    full = full or state["watermark"] is None
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        query = ("SELECT id, numero_proceso, estado, fecha_radicacion, partes, clase_proceso, "
+                 "cuantia_tipo, observaciones, updated_at FROM procesos")
+        if full:
+            rows = conn.execute(query).fetchall()
+        else:
+            # `>=`: filas modificadas en el mismo segundo que la marca se releen
+            # y el hash descarta las que no cambiaron
+            rows = conn.execute(query + " WHERE updated_at >= ?", (state["watermark"],)).fetchall()
+    finally:
+        conn.close()
+
+    on_disk = existing_folders(base_dir) if full else {}
+    tasks, entries = [], []
+    skipped = 0
+    watermark = state["watermark"]
+    for p in rows:
+        if p["updated_at"] and (watermark is None or p["updated_at"] > watermark):
+            watermark = p["updated_at"]
+        rel_path = relative_path(p)
+        info = render_info(p)
+        digest = hashlib.sha256(info.encode("utf-8")).hexdigest()
+        prev = known.get(str(p["id"]))
+        old_paths = set(on_disk.get(os.path.basename(rel_path), []))
+        if prev:
+            old_paths.add(prev["path"])
+        if not full and prev == {"path": rel_path, "hash": digest}:
+            skipped += 1
+            continue
+        old_paths.discard(rel_path)
+        tasks.append((rel_path, info, digest, sorted(old_paths), full))
+        entries.append((str(p["id"]), rel_path, digest, old_paths))
+
+    stats = {"scanned": len(rows), "created": 0, "moved": 0, "updated": 0, "unchanged": skipped}
+    if tasks:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            actions = list(pool.map(lambda t: sync_one(base_dir, t), tasks))
+        moved_from = set()
+        for (pid, rel_path, digest, old_paths), action in zip(entries, actions):
+            stats[action] += 1
+            known[pid] = {"path": rel_path, "hash": digest}
+            if action == "moved":
+                moved_from.update(os.path.dirname(old) for old in old_paths)
+        prune_empty_dirs(base_dir, moved_from)
+
+    # "" tras una corrida completa sin fechas: las próximas corridas ya son incrementales
+    watermark = watermark or ""
+    if tasks or watermark != state["watermark"]:
+        state["watermark"] = watermark
+        save_state(base_dir, state)
+    return stats
 
 def main():
+    parser = argparse.ArgumentParser(description="Sincroniza Biblioteca_Digital con la base de datos")
+    parser.add_argument("--full", action="store_true", help="Recorre todos los procesos y revisa el disco")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
     print(f"{Colors.BLUE}📚 Iniciando Organización de Biblioteca Digital...{Colors.END}")
-    
+
     if not os.path.exists(DB_PATH):
         print(f"{Colors.YELLOW}❌ No se encontró la base de datos.{Colors.END}")
         return
 
-    # Crear directorio base
-    if not os.path.exists(BASE_DIR):
-        os.makedirs(BASE_DIR)
-        print(f"{Colors.GREEN}✅ Directorio base creado: {BASE_DIR}{Colors.END}")
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
     try:
-        # Verificar tabla documentos si existe para futuras integraciones
-        # cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='documents'")
-        
-        cursor.execute("SELECT * FROM procesos")
-        procesos = cursor.fetchall()
-        
-        if not procesos:
-            print(f"{Colors.YELLOW}⚠️ No hay procesos en la base de datos para organizar.{Colors.END}")
-            return
-
-        print(f"🔄 Procesando {len(procesos)} expedientes...")
-        
-        created_count = 0
-        updated_count = 0
-        
-        for p in procesos:
-            # 1. Definir criterios de jerarquía
-            estado = sanitize_name(p['estado'])
-            fecha = p['fecha_radicacion'] # YYYY-MM-DD
-            year = fecha.split('-')[0] if '-' in str(fecha) else "Sin_Fecha"
-            # clase = sanitize_name(p['clase_proceso']) if p['clase_proceso'] else "Sin_Clase"
-            numero = sanitize_name(p['numero_proceso'])
-            
-            # Estructura: Biblioteca / Estado / Año / Numero
-            # Organizado primero por Estado para separar Activos de Terminados
-            target_path = os.path.join(BASE_DIR, estado, year, numero)
-            
-            # 2. Crear carpetas
-            is_new = False
-            if not os.path.exists(target_path):
-                os.makedirs(target_path)
-                is_new = True
-                
-            # 3. Generar ficha (INFO_EXPEDIENTE.txt)
-            proceso_dict = {
-                'numero': p['numero_proceso'],
-                'estado': p['estado'],
-                'fecha': p['fecha_radicacion'],
-                'partes': p['partes'],
-                'clase': p['clase_proceso'] or "N/A",
-                'cuantia': p['cuantia_tipo'] or "N/A",
-                'observaciones': p['observaciones'] or ""
-            }
-            create_readme(target_path, proceso_dict)
-            
-            if is_new:
-                created_count += 1
-                print(f"   {Colors.GREEN}+ Creado:{Colors.END} {estado}/{year}/{numero}")
-            else:
-                updated_count += 1
-                
-        print("\n" + "="*50)
-        print(f"{Colors.GREEN}✅ Organización Completada{Colors.END}")
-        print(f"📂 Carpetas Nuevas/Creadas: {created_count}")
-        print(f"🔄 Carpetas Verificadas: {updated_count}")
-        print(f"📍 Ubicación: {BASE_DIR}")
-        print("="*50)
-
+        stats = sync_biblioteca(DB_PATH, BASE_DIR, full=args.full, workers=args.workers)
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        conn.close()
+        return
+
+    print("\n" + "="*50)
+    print(f"{Colors.GREEN}✅ Organización Completada{Colors.END}")
+    print(f"🔎 Expedientes revisados: {stats['scanned']}")
+    print(f"📂 Carpetas Nuevas/Creadas: {stats['created']}")
+    print(f"🚚 Carpetas Movidas (cambio de estado): {stats['moved']}")
+    print(f"📝 Fichas Actualizadas: {stats['updated']}")
+    print(f"🔄 Sin cambios: {stats['unchanged']}")
+    print(f"📍 Ubicación: {BASE_DIR}")
+    print("="*50)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de auditoría: actualización masiva de procesos con auditoría activa vs inactiva.
+
+Modifica N campos en M procesos dentro de una sola transacción (como una
+edición masiva) y compara tiempo total y número de sentencias SQL emitidas.
+Con el escritor por conjuntos la auditoría añade un único executemany por
+flush en lugar de un INSERT por campo modificado.
+
+Uso: python scripts/bench_auditoria.py [--rows 5000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.core.audit import register_audit_listeners, unregister_audit_listeners
+from app.database import build_engine, sync_schema
+
+def seed(engine, rows: int):
+    with engine.begin() as conn:
+        conn.execute(insert(models.Proceso), [{
+            "numero_proceso": f"AUD-{i:06d}",
+            "fecha_radicacion": date(2020, 1, 1) + timedelta(days=i % 1000),
+            "estado": models.EstadoProceso.ACTIVO,
+            "partes": f"Parte {i}",
+        } for i in range(rows)])
+
+def bulk_update(Session) -> int:
+    """Edita 8 campos de cada proceso y hace commit; retorna filas de auditoría nuevas."""
+    db = Session()
+    before = db.scalar(select(func.count()).select_from(models.AuditLog))
+    for p in db.scalars(select(models.Proceso)):
+        p.numero_proceso = p.numero_proceso + "-X"
+        p.fecha_radicacion = p.fecha_radicacion + timedelta(days=1)
+        p.estado = models.EstadoProceso.TERMINADO
+        p.fecha_ultima_actuacion = date(2024, 6, 1)
+        p.clase_proceso = "PENAL"
+        p.cuantia_tipo = models.CuantiaTipo.MAYOR
+        p.partes = p.partes + " vs Estado"
+        p.observaciones = "Edición masiva"
+    db.commit()
+    written = db.scalar(select(func.count()).select_from(models.AuditLog)) - before
+    db.close()
+    return written
+
+def run(audit: bool, rows: int) -> dict:
+    tmp_dir = tempfile.mkdtemp(prefix="bench_auditoria_")
+    engine = build_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    sync_schema(engine)
+    seed(engine, rows)
+
+    statements = [0]
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*args):
+        statements[0] += 1
+
+    (register_audit_listeners if audit else unregister_audit_listeners)()
+    t0 = time.perf_counter()
+    written = bulk_update(sessionmaker(bind=engine))
+    elapsed = time.perf_counter() - t0
+    unregister_audit_listeners()
+
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {"tiempo ms": elapsed * 1000, "sentencias SQL": statements[0], "filas auditoría": written}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    off = run(False, args.rows)
+    on = run(True, args.rows)
+
+    print("=" * 56)
+    print(f"{args.rows} procesos x 8 campos en una transacción")
+    print(f"{'métrica':<18}{'sin auditoría':>18}{'con auditoría':>18}")
+    for key in off:
+        print(f"{key:<18}{off[key]:>18.0f}{on[key]:>18.0f}")
+    print("=" * 56)
+
+if __name__ == "__main__":
+    main()
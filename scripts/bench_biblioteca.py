@@ -0,0 +1,83 @@
+"""
+Benchmark de organizar_biblioteca: corrida inicial, corrida sin cambios y
+corrida tras modificar algunos procesos (incluidos cambios de estado).
+
+Antes cada corrida reescribía la ficha de todos los expedientes (con la
+fecha de generación dentro), así que su costo era siempre el de la
+corrida completa; ahora una corrida sin cambios sólo lee la marca de
+`updated_at` y el estado guardado.
+
+Uso: python scripts/bench_biblioteca.py [--rows 100000] [--changed 200]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import insert
+
+from app import models
+from app.database import build_engine, sync_schema
+from organizar_biblioteca import sync_biblioteca
+
+def seed(db_path: str, rows: int):
+    engine = build_engine(f"sqlite:///{db_path}")
+    sync_schema(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, 20000):
+            conn.execute(insert(models.Proceso), [{
+                "numero_proceso": f"BIB-{i:07d}",
+                "fecha_radicacion": date(2015, 1, 1) + timedelta(days=i % 3000),
+                "estado": models.EstadoProceso.ACTIVO,
+                "partes": f"Demandante {i} vs Demandado {i}",
+            } for i in range(start, min(rows, start + 20000))])
+    engine.dispose()
+
+def timed(label: str, fn):
+    t0 = time.perf_counter()
+    stats = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<22} {elapsed:8.2f} s   {stats}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--changed", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_biblioteca_")
+    db_path = os.path.join(tmp_dir, "bench.db")
+    base_dir = os.path.join(tmp_dir, "Biblioteca_Digital")
+    try:
+        seed(db_path, args.rows)
+        print("=" * 72)
+        print(f"{args.rows} expedientes")
+        timed("corrida inicial", lambda: sync_biblioteca(db_path, base_dir))
+        timed("sin cambios", lambda: sync_biblioteca(db_path, base_dir))
+
+        # Mitad con cambio de estado (mueve la carpeta), mitad con cambio de ficha;
+        # un segundo después para que updated_at supere la marca
+        time.sleep(1.1)
+        conn = sqlite3.connect(db_path)
+        half = args.changed // 2
+        conn.execute("UPDATE procesos SET estado='TERMINADO', updated_at=CURRENT_TIMESTAMP WHERE id <= ?", (half,))
+        conn.execute("UPDATE procesos SET observaciones='Auto admisorio', updated_at=CURRENT_TIMESTAMP "
+                     "WHERE id > ? AND id <= ?", (half, args.changed))
+        conn.commit()
+        conn.close()
+        timed(f"{args.changed} modificados", lambda: sync_biblioteca(db_path, base_dir))
+        timed("sin cambios", lambda: sync_biblioteca(db_path, base_dir))
+        timed("--full (verificación)", lambda: sync_biblioteca(db_path, base_dir, full=True))
+        print("=" * 72)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
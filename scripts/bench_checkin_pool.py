@@ -0,0 +1,71 @@
+"""
+Benchmark del check-in: pbkdf2 en el event loop (antes) vs pool de contraseñas (después).
+
+Simula una ráfaga de logins concurrentes mientras un "latido" mide cada 5 ms
+el retraso del event loop, que es lo que sufren todas las demás peticiones del
+worker (lobby, salud, etc.) durante la ráfaga.
+
+Uso: python scripts/bench_checkin_pool.py [--logins 200] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from app.core.password_pool import PasswordPool, pwd_context
+
+TICK = 0.005
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - t0 - TICK)
+
+async def burst(verify, logins: int, password_hash: str) -> dict:
+    lags = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(TICK * 2)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(verify("secreto", password_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await beat
+    lags.sort()
+    return {
+        "logins/s": logins / elapsed,
+        "lag p99 ms": lags[int(len(lags) * 0.99)] * 1000,
+        "lag max ms": lags[-1] * 1000,
+    }
+
+async def inline_verify(password, password_hash):
+    # Réplica del handler previo: verificación síncrona dentro de async def
+    return pwd_context.verify(password, password_hash)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    password_hash = pwd_context.hash("secreto")
+    pool = PasswordPool(args.workers, max_queue=args.logins)
+    before = asyncio.run(burst(inline_verify, args.logins, password_hash))
+    after = asyncio.run(burst(pool.verify, args.logins, password_hash))
+    pool.shutdown()
+
+    print("=" * 56)
+    print(f"{args.logins} logins concurrentes, pool de {args.workers} hilos ({os.cpu_count()} CPU)")
+    print(f"{'métrica':<14}{'antes (inline)':>20}{'después (pool)':>20}")
+    for key in before:
+        print(f"{key:<14}{before[key]:>20.1f}{after[key]:>20.1f}")
+    print("=" * 56)
+    print("Pool:", pool.get_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de la bitácora de entradas: commit por entrada (antes) vs BatchWriter (después).
+
+Mide el costo que la bitácora añade a cada `enter` (latencia de la llamada vista
+por el handler) y el tiempo total hasta que todas las filas quedan escritas.
+
+Uso: python scripts/bench_entry_log.py [--entries 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.batch_writer import BatchWriter
+from app.database import build_async_engine, build_engine, sync_schema
+from app.hotel_models import HotelEntryLog
+
+def row(i: int) -> dict:
+    return {"guest_id": 1, "room_id": 1, "action": "enter_attempt", "allow": True,
+            "reason": "success", "ip": "127.0.0.1", "user_agent": f"bench-{i}"}
+
+async def run(log_call, entries: int, concurrency: int) -> list:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            await log_call(i)
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(one(i) for i in range(entries)))
+    return latencies
+
+def summary(latencies: list, total: float, entries: int) -> dict:
+    latencies.sort()
+    return {
+        "p50 µs": latencies[len(latencies) // 2] * 1e6,
+        "p99 µs": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "filas/s": entries / total,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_entry_log_")
+    url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    engine = build_engine(url)
+    sync_schema(engine)
+    async_engine = build_async_engine(url)
+    Session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    # Antes: réplica del log_entry previo (add + commit por entrada)
+    async def commit_per_entry(i):
+        async with Session() as db:
+            db.add(HotelEntryLog(**row(i), ts=datetime.utcnow()))
+            await db.commit()
+
+    async def before_run():
+        t0 = time.perf_counter()
+        lat = await run(commit_per_entry, args.entries, args.concurrency)
+        return summary(lat, time.perf_counter() - t0, args.entries)
+
+    writer = BatchWriter(engine, HotelEntryLog.__table__)
+
+    async def batched(i):
+        await writer.enqueue({**row(i), "ts": datetime.utcnow()})
+
+    async def after_run():
+        t0 = time.perf_counter()
+        lat = await run(batched, args.entries, args.concurrency)
+        writer.stop()  # incluye el tiempo de vaciar el buffer a disco
+        return summary(lat, time.perf_counter() - t0, args.entries)
+
+    async def both():
+        before = await before_run()
+        after = await after_run()
+        async with Session() as db:
+            total = (await db.execute(select(func.count()).select_from(HotelEntryLog))).scalar()
+        await async_engine.dispose()
+        return before, after, total
+
+    before, after, total = asyncio.run(both())
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 56)
+    print(f"{args.entries} entradas, concurrencia {args.concurrency}; filas escritas: {total}")
+    print(f"{'métrica':<12}{'antes (commit)':>20}{'después (lote)':>20}")
+    for key in before:
+        print(f"{key:<12}{before[key]:>20.1f}{after[key]:>20.1f}")
+    print("=" * 56)
+    print("Writer:", writer.get_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de exportación: materializar `.all()` (antes) vs streaming con yield_per (después).
+
+Siembra N procesos en una base temporal y mide tiempo y pico de memoria
+Python (tracemalloc) de generar la exportación NDJSON completa.
+
+- antes:   query(...).all() + serialización de la lista (como GET /api/procesos)
+- después: generador de app.routers.export (bloques de EXPORT_BATCH_SIZE filas)
+
+Uso: python scripts/bench_exportacion.py [--rows 500000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TMP_DIR = tempfile.mkdtemp(prefix="bench_exportacion_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import insert, select
+
+from app import models, schemas
+from app.database import SessionLocal, engine, sync_schema
+from app.routers.export import _ndjson
+
+def seed(rows: int):
+    with engine.begin() as conn:
+        for start in range(0, rows, 20000):
+            conn.execute(insert(models.Proceso), [{
+                "numero_proceso": f"EXP-{i:08d}",
+                "fecha_radicacion": date(2010, 1, 1) + timedelta(days=i % 5000),
+                "estado": models.EstadoProceso.ACTIVO,
+                "partes": f"Demandante {i} vs Demandado {i}",
+                "observaciones": "Observación de prueba " * 3,
+            } for i in range(start, min(rows, start + 20000))])
+
+def measure(fn) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"s": elapsed, "pico MB": peak / 2**20, "MB generados": size / 2**20}
+
+def before() -> int:
+    db = SessionLocal()
+    items = db.query(models.Proceso).all()
+    body = "".join(schemas.ProcesoSchema.model_validate(p).model_dump_json() + "\n" for p in items)
+    db.close()
+    return len(body)
+
+def after() -> int:
+    stmt = select(*models.Proceso.__table__.columns).order_by(models.Proceso.id)
+    columns = [c.name for c in stmt.selected_columns]
+    return sum(len(chunk) for chunk in _ndjson(stmt, columns))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    try:
+        sync_schema(engine)
+        seed(args.rows)
+        results = {"antes (.all())": measure(before), "después (stream)": measure(after)}
+    finally:
+        engine.dispose()
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    print("=" * 64)
+    print(f"Exportación NDJSON de {args.rows} procesos")
+    for name, r in results.items():
+        print(f"{name:<18} {r['s']:7.2f} s   pico {r['pico MB']:8.1f} MB   salida {r['MB generados']:7.1f} MB")
+    print("=" * 64)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark del pipeline de extracción: páginas por segundo y por núcleo.
+
+Genera PDFs sintéticos (texto plano, N páginas) en una base temporal, los
+registra como Document PENDING y ejecuta `app.extraction.run_pending` con
+distinto número de workers.
+
+Uso: python scripts/bench_extraccion.py [--docs 40] [--pages 25] [--workers 1,2,4]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import sync_schema
+from app.extraction import PDF_MIME, run_pending
+
+LINE = "Auto interlocutorio del proceso {doc}-{page}: se decreta el embargo y secuestro de bienes."
+
+def make_pdf(path: str, doc: int, pages: int):
+    """PDF mínimo válido con `pages` páginas de texto (fuente Helvetica)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = " ".join(f"({LINE.format(doc=doc, page=page)}) Tj T*" for _ in range(40))
+        stream = f"BT /F1 9 Tf 12 TL 40 800 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=25)
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_extraccion_")
+    docs_root = os.path.join(tmp_dir, "documents")
+    os.makedirs(docs_root)
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    sync_schema(engine)
+    Session = sessionmaker(bind=engine)
+
+    rows = []
+    for d in range(args.docs):
+        name = f"doc_{d:04d}.pdf"
+        make_pdf(os.path.join(docs_root, name), d, args.pages)
+        rows.append({"original_filename": name, "stored_filename": name, "mime_type": PDF_MIME,
+                     "size_bytes": os.path.getsize(os.path.join(docs_root, name)),
+                     "sha256": hashlib.sha256(name.encode()).hexdigest(), "uploaded_by": "bench",
+                     "extraction_status": models.ExtractionStatus.PENDING})
+    with engine.begin() as conn:
+        conn.execute(insert(models.Document), rows)
+
+    print("=" * 60)
+    print(f"{args.docs} PDFs x {args.pages} páginas ({os.cpu_count()} CPU disponibles)")
+    print(f"{'workers':>8}{'segundos':>12}{'pág/s':>12}{'pág/s/núcleo':>16}  estados")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with engine.begin() as conn:
+            conn.execute(update(models.Document).values(
+                extraction_status=models.ExtractionStatus.PENDING, extracted_text=None))
+        stats = run_pending(Session, workers=workers, batch_size=10, documents_root=docs_root)
+        rate = stats["pages"] / stats["seconds"]
+        cores = min(workers, os.cpu_count() or 1)
+        print(f"{workers:>8}{stats['seconds']:>12.2f}{rate:>12.1f}{rate / cores:>16.1f}  {stats['by_status']}")
+    print("=" * 60)
+
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark de importación masiva: alta fila por fila (antes) vs BulkImporter (después).
+
+- antes:   conteo FREE + get_proceso_by_numero + crud.create_proceso por fila
+           (una transacción con commit y refresh por proceso, como POST /api/procesos)
+- después: app.bulk_import por bloques (IN por bloque, INSERT multi-fila, auditoría en lote)
+
+Ambos con auditoría activa. La ruta fila por fila se mide sobre una muestra
+y se extrapola al total.
+
+Uso: python scripts/bench_importacion.py [--rows 80000] [--sample 2000]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.bulk_import import import_procesos
+from app.core.audit import register_audit_listeners
+from app.database import build_engine, sync_schema
+
+def record(prefix: str, i: int) -> dict:
+    return {"numero_proceso": f"{prefix}-{i:06d}", "fecha_radicacion": "2023-05-10",
+            "estado": "ACTIVO", "partes": f"Demandante {i} vs Demandado {i}"}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=80_000)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_importacion_")
+    engine = build_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    sync_schema(engine)
+    register_audit_listeners()
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    t0 = time.perf_counter()
+    for i in range(args.sample):
+        proceso = schemas.ProcesoCreate(**record("ROW", i))
+        db.query(models.Proceso).filter(models.Proceso.deleted_at == None).count()
+        if not crud.get_proceso_by_numero(db, proceso.numero_proceso):
+            crud.create_proceso(db, proceso)
+    per_row = (time.perf_counter() - t0) / args.sample
+    db.close()
+
+    lines = (json.dumps(record("BULK", i)) + "\n" for i in range(args.rows))
+    db = Session()
+    t0 = time.perf_counter()
+    report = import_procesos(db, lines, "ndjson", "bench", license_mode="PRO")
+    bulk = time.perf_counter() - t0
+    db.close()
+
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print(f"{args.rows} procesos (fila por fila medido sobre {args.sample})")
+    print(f"fila por fila  {per_row * args.rows:10.1f} s  ({1 / per_row:8.0f} filas/s, extrapolado)")
+    print(f"bulk           {bulk:10.1f} s  ({args.rows / bulk:8.0f} filas/s)")
+    print(f"insertados {report['inserted']}, errores {report['failed']}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
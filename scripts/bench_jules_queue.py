@@ -0,0 +1,106 @@
+"""
+Benchmark de la cola de Jules: latencia despacho -> inicio de la tarea.
+
+- antes:   revisión del directorio cada 2 s (equivalente al start_polling anterior)
+- después: eventos del directorio con watchdog
+
+Las tareas se despachan como lo hace /api/jules/dispatch (JSON atómico) y el
+worker sólo registra el instante en que empieza cada una. Al final se verifica
+el orden por prioridad con una cola cargada antes de arrancar el worker.
+
+Uso: python scripts/bench_jules_queue.py [--tasks 20]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jules_worker
+from jules_worker import JulesConfig, JulesWorker
+
+class TimingWorker(JulesWorker):
+    def __init__(self, config):
+        super().__init__(config)
+        self.started = {}
+
+    def process_task(self, task):
+        self.started[task.id] = time.time()
+
+def dispatch(queue: str, task_id: str, priority: int = 1) -> float:
+    now = time.time()
+    payload = {"id": task_id, "target_file": "antigravity_reports/jules/log.txt", "action": "AUDIT",
+               "content": "bench", "priority": priority, "timestamp": now}
+    path = os.path.join(queue, f"{task_id}.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(f"{path}.tmp", path)
+    return now
+
+def measure(label: str, tasks: int, watchdog: bool, poll_interval: float):
+    tmp = tempfile.mkdtemp(prefix="bench_jules_")
+    observer = jules_worker.Observer
+    if not watchdog:
+        jules_worker.Observer = None
+    try:
+        config = JulesConfig(task_queue_path=os.path.join(tmp, "tasks"),
+                             reports_path=os.path.join(tmp, "reports"), poll_interval=poll_interval)
+        worker = TimingWorker(config)
+        thread = threading.Thread(target=worker.start_polling, daemon=True)
+        thread.start()
+        time.sleep(0.3)
+
+        sent = {}
+        for i in range(tasks):
+            sent[f"t{i}"] = dispatch(config.task_queue_path, f"t{i}")
+            time.sleep(0.05 if watchdog else 0.3)
+        deadline = time.time() + poll_interval + 5
+        while len(worker.started) < tasks and time.time() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+        thread.join(5)
+    finally:
+        jules_worker.Observer = observer
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    latencies = sorted((worker.started[t] - sent[t]) * 1000 for t in sent if t in worker.started)
+    print(f"{label:<22} p50 {statistics.median(latencies):8.1f} ms   "
+          f"max {latencies[-1]:8.1f} ms   ({len(latencies)}/{tasks} tareas)")
+
+def check_priority():
+    tmp = tempfile.mkdtemp(prefix="bench_jules_")
+    try:
+        config = JulesConfig(task_queue_path=os.path.join(tmp, "tasks"), reports_path=os.path.join(tmp, "reports"))
+        worker = TimingWorker(config)
+        for i, priority in enumerate([1, 3, 1, 2, 3]):
+            dispatch(config.task_queue_path, f"p{i}_prio{priority}", priority)
+            time.sleep(0.01)
+        while worker.run_next():
+            pass
+        order = sorted(worker.started, key=worker.started.get)
+        print(f"orden de ejecución: {order}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 64)
+    measure("antes (polling 2 s)", args.tasks, watchdog=False, poll_interval=2.0)
+    if jules_worker.Observer is not None:
+        measure("después (watchdog)", args.tasks, watchdog=True, poll_interval=2.0)
+    else:
+        print("watchdog no instalado: sólo se mide el modo polling")
+    check_priority()
+    print("=" * 64)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark del vinculador: el escaneo cuesta O(texto) sin importar cuántos procesos existan.
+
+Construye el autómata con distintas cantidades de números de proceso
+(formato de radicado de 23 dígitos) y mide el tiempo de escanear el mismo
+texto, comparado con buscar cada número por separado (`in`). Con pocos
+procesos el vinculador usa esa misma búsqueda directa (NAIVE_MAX_PATTERNS).
+
+La columna "alta ms" es el costo medio de crear un proceso y vincular un
+documento corto justo después (lo que hace `sync()` + `link_documents`): los
+patrones nuevos se buscan directo hasta incorporarse en bloque al autómata.
+
+Uso: python scripts/bench_linker.py [--kb 500] [--processes 1000,10000,100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from app.linker import ProcessLinker, normalize_numero
+
+def radicado(i: int) -> str:
+    return f"11001-31-03-{i % 1000:03d}-{2000 + i % 25}-{i:05d}-00"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kb", type=int, default=500)
+    parser.add_argument("--processes", default="1000,10000,100000")
+    args = parser.parse_args()
+
+    random.seed(7)
+    words = ["auto", "que", "decreta", "embargo", "del", "proceso", "radicado", "juzgado", "civil", "2021"]
+    chunks, size = [], 0
+    while size < args.kb * 1024:
+        w = random.choice(words) if random.random() > 0.002 else radicado(random.randint(0, 999)).replace("-", " ")
+        chunks.append(w)
+        size += len(w) + 1
+    text = " ".join(chunks)
+
+    print("=" * 74)
+    print(f"Texto de {args.kb} KB")
+    print(f"{'procesos':>10}{'construcción s':>16}{'escaneo ms':>14}{'ingenuo ms':>14}{'alta ms':>10}{'hallados':>10}")
+    for n in [int(x) for x in args.processes.split(",")]:
+        linker = ProcessLinker()
+        t0 = time.perf_counter()
+        for i in range(n):
+            linker._set_process(i, radicado(i))
+        linker._flush_pending()
+        linker.find_processes("x")  # fuerza el cálculo de enlaces de fallo
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        found = linker.find_processes(text)
+        scan = (time.perf_counter() - t0) * 1000
+
+        # Ingenuo: normalizar el texto y buscar cada número por separado (muestra de 1000, extrapolada)
+        sample = [normalize_numero(radicado(i)) for i in range(min(n, 1000))]
+        t0 = time.perf_counter()
+        normalized = normalize_numero(text)
+        normalize = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for pattern in sample:
+            _ = pattern in normalized
+        naive = (normalize + (time.perf_counter() - t0) * n / len(sample)) * 1000
+
+        # Altas incrementales: un proceso nuevo y un documento corto por vez
+        short = text[:1024]
+        updates = 500
+        t0 = time.perf_counter()
+        for i in range(n, n + updates):
+            linker._set_process(i, radicado(i))
+            linker.find_processes(short)
+        update = (time.perf_counter() - t0) * 1000 / updates
+
+        print(f"{n:>10}{build:>16.2f}{scan:>14.1f}{naive:>14.1f}{update:>10.2f}{len(found):>10}")
+    print("=" * 74)
+
+if __name__ == "__main__":
+    main()
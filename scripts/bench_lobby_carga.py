@@ -0,0 +1,166 @@
+"""
+Prueba de carga del lobby: sesión síncrona (antes) vs AsyncSession (después).
+
+Levanta la API con uvicorn (proceso aparte) sobre una base temporal y simula N huéspedes
+concurrentes consultando /api/hotel/rooms mientras unos pocos clientes
+ejecutan una consulta lenta. Con la sesión síncrona dentro de `async def`
+cada consulta bloquea el event loop y la latencia del lobby se dispara.
+
+- antes:   réplica de los handlers previos (Session síncrona en async def)
+- después: handlers reales con get_async_db
+
+El pool del servidor se dimensiona a (huéspedes + clientes lentos): con el pool
+por defecto la variante síncrona se bloquea esperando conexión dentro del propio
+event loop y la prueba nunca termina.
+
+Uso: python scripts/bench_lobby_carga.py [--users 200] [--requests 20] [--slow-clients 4]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+if "DATABASE_URL" not in os.environ or "--serve" not in sys.argv:
+    TMP_DIR = tempfile.mkdtemp(prefix="bench_lobby_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+import httpx
+import uvicorn
+from fastapi import Depends
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.database import SessionLocal, engine, get_async_db, get_db
+from app.hotel_models import HotelEntryLog, HotelRoom
+
+PORT = int(os.environ.get("BENCH_PORT", "0")) or None
+# Agregado sobre la bitácora de entradas: una consulta "pesada" típica de un panel
+SLOW_SQL = text("SELECT room_id, count(*), max(ts) FROM hotel_entry_logs GROUP BY room_id")
+
+async def legacy_list_rooms(db: Session = Depends(get_db)):
+    return db.query(HotelRoom).filter(HotelRoom.status == "active").all()
+
+async def legacy_slow(db: Session = Depends(get_db)):
+    return {"rows": len(db.execute(SLOW_SQL).all())}
+
+async def async_slow(db: AsyncSession = Depends(get_async_db)):
+    return {"rows": len((await db.execute(SLOW_SQL)).all())}
+
+app.add_api_route("/bench/legacy/rooms", legacy_list_rooms)
+app.add_api_route("/bench/legacy/slow", legacy_slow)
+app.add_api_route("/bench/async/slow", async_slow)
+
+def seed(log_rows: int):
+    db = SessionLocal()
+    for i in range(5):
+        db.add(HotelRoom(slug=f"room-{i}", name=f"Room {i}", floor=1, type="app",
+                         access_policy={"allowed_plans": ["pro"]}, status="active"))
+    db.commit()
+    db.execute(insert(HotelEntryLog), [
+        {"room_id": i % 5 + 1, "action": "enter_attempt", "allow": True, "reason": "success"}
+        for i in range(log_rows)
+    ])
+    db.commit()
+    db.close()
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+async def run_scenario(lobby_path: str, slow_path: str, args) -> dict:
+    latencies = []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.users + args.slow_clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+
+        async def guest():
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                r = await client.get(lobby_path)
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        async def slow_client():
+            while not stop.is_set():
+                await client.get(slow_path)
+
+        # Calentamiento: abre las conexiones del pool antes de medir
+        await asyncio.gather(*(client.get(lobby_path) for _ in range(args.users)))
+        slow_tasks = [asyncio.create_task(slow_client()) for _ in range(args.slow_clients)]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(guest() for _ in range(args.users)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await asyncio.gather(*slow_tasks)
+
+    return {
+        "p50 ms": percentile(latencies, 0.50) * 1000,
+        "p99 ms": percentile(latencies, 0.99) * 1000,
+        "req/s": len(latencies) / elapsed,
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/health", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor de benchmark no arrancó")
+
+def main():
+    global PORT
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--slow-clients", type=int, default=4)
+    parser.add_argument("--log-rows", type=int, default=300_000)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        # Proceso servidor: un solo worker, como cada worker de producción
+        uvicorn.run(app, port=PORT, log_level="warning")
+        return
+
+    PORT = free_port()
+    seed(args.log_rows)
+    engine.dispose()
+    env = os.environ.copy()
+    env["BENCH_PORT"] = str(PORT)
+    env["DB_POOL_SIZE"] = str(args.users + args.slow_clients)
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve"], env=env)
+    try:
+        wait_until_up()
+        before = asyncio.run(run_scenario("/bench/legacy/rooms", "/bench/legacy/slow", args))
+        after = asyncio.run(run_scenario("/api/hotel/rooms", "/bench/async/slow", args))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    print("=" * 56)
+    print(f"{args.users} huéspedes x {args.requests} peticiones, {args.slow_clients} clientes lentos")
+    print(f"{'métrica':<12}{'antes (sync)':>20}{'después (async)':>20}")
+    for key in before:
+        print(f"{key:<12}{before[key]:>20.1f}{after[key]:>20.1f}")
+    print("=" * 56)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Microbenchmark de middlewares sobre /health: BaseHTTPMiddleware (antes) vs ASGI puro (después).
+
+- antes:   AuditMiddleware(BaseHTTPMiddleware) + CORS + @app.middleware("http")
+           para las cabeceras de seguridad (copia de la versión anterior)
+- después: app.core.middleware.AuditMiddleware (ASGI puro) + CORS
+
+Las peticiones se hacen en proceso con httpx.ASGITransport, sin red, para
+aislar el costo de la pila de middlewares.
+
+Uso: python scripts/bench_middleware.py [--requests 5000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+from app.core.context import set_current_user
+from app.core.metrics import metrics
+from app.core.middleware import AuditMiddleware
+
+logger = logging.getLogger("gahenax.audit")
+
+class LegacyAuditMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        user_name = request.headers.get("X-User-Name", "Sistema")
+        set_current_user(user_name)
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        route = request.scope.get("route")
+        metrics.log_request(response.status_code, process_time, request.method, getattr(route, "path", None))
+        if request.url.path.startswith("/api"):
+            logger.info(f"AUDIT: {user_name} | {request.method} {request.url.path} | Status: {response.status_code} | Time: {process_time:.4f}s")
+        return response
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "online", "timestamp": datetime.now().isoformat(),
+                "mode": settings.LICENSE_MODE, "engine": "Gahenax-1.1"}
+
+    cors = dict(allow_origins=settings.ALLOWED_ORIGINS, allow_credentials=True,
+                allow_methods=["*"], allow_headers=["*"], expose_headers=["X-Next-Cursor"])
+    if legacy:
+        app.add_middleware(LegacyAuditMiddleware)
+        app.add_middleware(CORSMiddleware, **cors)
+
+        @app.middleware("http")
+        async def add_security_headers(request: Request, call_next):
+            response = await call_next(request)
+            response.headers["X-Content-Type-Options"] = "nosniff"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["X-Gahenax-Version"] = settings.VERSION
+            return response
+    else:
+        app.add_middleware(CORSMiddleware, **cors)
+        app.add_middleware(AuditMiddleware)
+    return app
+
+async def run(app: FastAPI, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(n: int):
+            for _ in range(n):
+                r = await client.get("/health", headers={"X-User-Name": "bench"})
+                assert r.status_code == 200 and r.headers["X-Frame-Options"] == "DENY"
+
+        await worker(200)  # calentamiento
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return (requests // concurrency * concurrency) / (time.perf_counter() - t0)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {"antes (BaseHTTPMiddleware)": [], "después (ASGI puro)": []}
+    for _ in range(args.rounds):
+        # Rondas alternadas para no favorecer a ninguna variante
+        for name, legacy in (("antes (BaseHTTPMiddleware)", True), ("después (ASGI puro)", False)):
+            results[name].append(asyncio.run(run(build_app(legacy), args.requests, args.concurrency)))
+
+    print("=" * 60)
+    print(f"GET /health, {args.requests} peticiones, concurrencia {args.concurrency} (mejor de {args.rounds})")
+    for name, rps in results.items():
+        print(f"{name:<28} {max(rps):8.0f} req/s")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark de paginación: OFFSET vs cursor (keyset) sobre `procesos`.
+
+Crea una base SQLite temporal con N procesos y mide el tiempo de la primera
+página y de una página profunda con ambos modos de `crud`.
+
+Uso: python scripts/bench_paginacion.py [--rows 400000] [--limit 100] [--page 4000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import sync_schema
+
+def seed(engine, rows: int):
+    start = date(2015, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            batch.append({
+                "numero_proceso": f"BENCH-{i:07d}",
+                "fecha_radicacion": start + timedelta(days=i % 3650),
+                "estado": models.EstadoProceso.ACTIVO,
+                "partes": f"Demandante {i} vs Demandado {i}",
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(models.Proceso), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Proceso), batch)
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=400_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page", type=int, default=4000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_paginacion_")
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    sync_schema(engine)
+
+    print(f"Sembrando {args.rows} procesos en {tmp_dir}...")
+    seed(engine, args.rows)
+
+    db = sessionmaker(bind=engine)()
+    deep_skip = (args.page - 1) * args.limit
+
+    # Cursor de la página profunda, obtenido fuera de la medición
+    boundary = db.query(models.Proceso).order_by(
+        models.Proceso.fecha_radicacion, models.Proceso.id
+    ).offset(deep_skip - 1).first()
+    deep_cursor = crud.encode_cursor(boundary.fecha_radicacion, boundary.id)
+
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM procesos WHERE deleted_at IS NULL "
+        "AND (fecha_radicacion, id) > (:f, :i) ORDER BY fecha_radicacion, id LIMIT 101"
+    ), {"f": boundary.fecha_radicacion.isoformat(), "i": boundary.id}).fetchall()
+    print("Plan keyset:", " | ".join(row[-1] for row in plan))
+
+    kwargs = {"license_mode": "PRO"}
+    results = {
+        "offset página 1": timed(lambda: crud.get_procesos(db, 0, args.limit, **kwargs)),
+        f"offset página {args.page}": timed(lambda: crud.get_procesos(db, deep_skip, args.limit, **kwargs)),
+        "cursor página 1": timed(lambda: crud.get_procesos_page(db, None, args.limit, **kwargs)),
+        f"cursor página {args.page}": timed(lambda: crud.get_procesos_page(db, deep_cursor, args.limit, **kwargs)),
+    }
+
+    print("=" * 50)
+    for name, ms in results.items():
+        print(f"{name:<22} {ms:8.2f} ms")
+    print("=" * 50)
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark de concurrencia SQLite: perfil `legacy` vs `production` (WAL + pragmas).
+
+Lanza hilos lectores (listado paginado de procesos) y escritores (inserciones
+de auditoría y bitácora de entradas, un commit por operación, como en la API)
+contra la misma base temporal durante unos segundos y compara el rendimiento.
+
+Uso: python scripts/bench_sqlite_concurrencia.py [--readers 8] [--writers 4] [--seconds 5]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, hotel_models
+from app.database import build_engine, sync_schema
+
+def seed(engine, rows: int):
+    start = date(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Proceso), [{
+            "numero_proceso": f"CONC-{i:06d}",
+            "fecha_radicacion": start + timedelta(days=i % 1500),
+            "estado": models.EstadoProceso.ACTIVO,
+            "partes": f"Parte {i} vs Parte {i + 1}",
+        } for i in range(rows)])
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+def run_profile(profile: str, args) -> dict:
+    tmp_dir = tempfile.mkdtemp(prefix=f"bench_conc_{profile}_")
+    engine = build_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}", profile=profile)
+    sync_schema(engine)
+    seed(engine, args.rows)
+    Session = sessionmaker(bind=engine)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"reads": 0, "writes": 0, "errors": 0, "read_latencies": [], "write_latencies": []}
+
+    def reader():
+        db = Session()
+        cursor = None
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                _, cursor = crud.get_procesos_page(db, cursor, 50, license_mode="PRO")
+                db.rollback()
+                with lock:
+                    stats["reads"] += 1
+                    stats["read_latencies"].append(time.perf_counter() - t0)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    stats["errors"] += 1
+        db.close()
+
+    def writer(n: int):
+        db = Session()
+        i = 0
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                db.execute(insert(models.AuditLog), [{
+                    "usuario": f"bench-{n}", "accion": "UPDATE", "entidad": "PROCESO",
+                    "entidad_id": i, "campo_modificado": "estado", "valor_nuevo": "ACTIVO",
+                }])
+                db.execute(insert(hotel_models.HotelEntryLog), [{
+                    "room_id": 1, "action": "enter_attempt", "allow": True, "reason": "success",
+                }])
+                db.commit()
+                with lock:
+                    stats["writes"] += 1
+                    stats["write_latencies"].append(time.perf_counter() - t0)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    stats["errors"] += 1
+            i += 1
+        db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {
+        "reads/s": stats["reads"] / args.seconds,
+        "writes/s": stats["writes"] / args.seconds,
+        "errores (locked)": stats["errors"],
+        "p99 lectura ms": percentile(stats["read_latencies"], 0.99) * 1000,
+        "p99 escritura ms": percentile(stats["write_latencies"], 0.99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = {profile: run_profile(profile, args) for profile in ("legacy", "production")}
+
+    print("=" * 60)
+    print(f"{'métrica':<20}{'legacy':>18}{'production':>18}")
+    for key in results["legacy"]:
+        print(f"{key:<20}{results['legacy'][key]:>18.1f}{results['production'][key]:>18.1f}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
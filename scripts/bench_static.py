@@ -0,0 +1,115 @@
+"""
+Benchmark de assets estáticos: StaticFiles/FileResponse (antes) vs tienda
+precomprimida en memoria (después).
+
+- primera visita: bytes transferidos del lobby (/) y del SPA (index.html más
+  sus scripts y hojas de estilo locales), con Accept-Encoding de navegador.
+- visita repetida: peticiones que el navegador aún tiene que hacer (los assets
+  `immutable` salen de su caché sin revalidar).
+- throughput: peticiones/s sobre /static/app.js.
+
+Las peticiones se hacen en proceso con httpx.ASGITransport, sin red.
+
+Uso: python scripts/bench_static.py [--requests 3000]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+
+from app.core import static_assets
+from app.core.static_assets import StaticAssetStore, PrecompressedStaticFiles
+
+STATIC = os.path.join(ROOT, "static")
+LOBBY = os.path.join(ROOT, "gahenax_hub.html")
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+def build_app(precompressed: bool) -> FastAPI:
+    app = FastAPI()
+    if precompressed:
+        store = StaticAssetStore(STATIC).load()
+        lobby = store.load_file(LOBBY)
+        app.mount("/static", PrecompressedStaticFiles(directory=STATIC, store=store), name="static")
+
+        @app.get("/")
+        async def serve_lobby(request: Request):
+            return store.response(lobby, request.scope)
+    else:
+        app.mount("/static", StaticFiles(directory=STATIC), name="static")
+
+        @app.get("/")
+        async def serve_lobby():
+            return FileResponse(os.path.join(os.getcwd(), LOBBY))
+    return app
+
+def local_refs(html: str) -> list:
+    return re.findall(r"""(?:src|href)=["'](/static/[^"']+)["']""", html)
+
+async def visit(client: httpx.AsyncClient, cache: dict):
+    """Simula la carga del lobby y del SPA con la caché HTTP de un navegador."""
+    transferred, requests = 0, 0
+
+    async def fetch(url: str) -> str:
+        nonlocal transferred, requests
+        cached = cache.get(url)
+        if cached and "immutable" in cached["cache_control"]:
+            return cached["text"]
+        headers = dict(BROWSER_HEADERS)
+        if cached:
+            headers["If-None-Match"] = cached["etag"]
+        response = await client.get(url, headers=headers)
+        requests += 1
+        transferred += response.num_bytes_downloaded
+        if response.status_code == 304:
+            return cached["text"]
+        cache[url] = {"etag": response.headers.get("etag", ""), "text": response.text,
+                      "cache_control": response.headers.get("cache-control", "")}
+        return response.text
+
+    await fetch("/")
+    index = await fetch("/static/index.html")
+    for url in local_refs(index):
+        await fetch(url)
+    return transferred, requests
+
+async def throughput(client: httpx.AsyncClient, total: int) -> float:
+    started = time.perf_counter()
+    for _ in range(total):
+        response = await client.get("/static/app.js", headers=BROWSER_HEADERS)
+        assert response.status_code == 200
+    return total / (time.perf_counter() - started)
+
+async def measure(label: str, precompressed: bool, total: int):
+    transport = httpx.ASGITransport(app=build_app(precompressed))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cache = {}
+        first_bytes, first_requests = await visit(client, cache)
+        repeat_bytes, repeat_requests = await visit(client, cache)
+        rps = await throughput(client, total)
+    print(f"{label:<26} 1ª visita {first_bytes:>7} B / {first_requests:>2} req   "
+          f"repetida {repeat_bytes:>5} B / {repeat_requests:>2} req   {rps:8.0f} req/s")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    print("=" * 100)
+    await measure("antes (StaticFiles)", False, args.requests)
+    await measure("después (precomprimido)", True, args.requests)
+    if static_assets.brotli is None:
+        print("brotli no instalado: se midió sólo gzip")
+    print("=" * 100)
+
+if __name__ == "__main__":
+    asyncio.run(main())
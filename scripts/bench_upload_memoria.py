@@ -0,0 +1,74 @@
+"""
+Benchmark de memoria en subidas: archivo completo en RAM (antes) vs streaming (después).
+
+Genera un archivo temporal de N MB y lo guarda con StorageService de las dos
+formas, midiendo el pico de memoria Python (tracemalloc) de cada una.
+
+- antes:   `content = file.read()` + upload_file(bytes), como el handler previo
+- después: upload_stream(file) leyendo por bloques
+
+Uso: python scripts/bench_upload_memoria.py [--mb 200]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import sync_schema
+from app.storage_service import StorageService
+
+def measure(fn) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"pico MB": peak / 2**20, "tiempo s": elapsed}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_upload_")
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    sync_schema(engine)
+    storage = StorageService(sessionmaker(bind=engine)(), os.path.join(tmp_dir, "files"))
+
+    source = os.path.join(tmp_dir, "expediente.pdf")
+    with open(source, "wb") as f:
+        for _ in range(args.mb):
+            f.write(os.urandom(2**20))
+
+    def before():
+        with open(source, "rb") as f:
+            content = f.read()
+        storage.upload_file("bench", "docs", "antes.pdf", content, "application/pdf")
+
+    def after():
+        with open(source, "rb") as f:
+            storage.upload_stream("bench", "docs", "despues.pdf", f, "application/pdf")
+
+    results = {"antes (bytes)": measure(before), "después (stream)": measure(after)}
+    storage.db.close()
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 50)
+    print(f"Archivo de {args.mb} MB")
+    for name, r in results.items():
+        print(f"{name:<18} pico {r['pico MB']:8.1f} MB   {r['tiempo s']:6.2f} s")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import shutil
+import sqlite3
 import os
 import datetime
 import sys
@@ -11,6 +11,19 @@ if sys.platform == 'win32':
 DB_PATH = "judicial_archive.db"
 BACKUP_DIR = "backups"
 
+def _sqlite_copy(src_path, dst_path):
+    """
+    Copia consistente con la API de backup de SQLite: en modo WAL los cambios
+    confirmados pueden vivir aún en el archivo -wal y una copia simple los perdería.
+    """
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
 def backup():
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
@@ -18,7 +31,7 @@ def backup():
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_path = os.path.join(BACKUP_DIR, f"{DB_PATH}_{timestamp}.bak")
     
-    shutil.copy2(DB_PATH, backup_path)
+    _sqlite_copy(DB_PATH, backup_path)
     print(f"✅ Backup creado: {backup_path}")
 
 def rollback():
@@ -32,7 +45,7 @@ def rollback():
         return
 
     latest_backup = os.path.join(BACKUP_DIR, backups[0])
-    shutil.copy2(latest_backup, DB_PATH)
+    _sqlite_copy(latest_backup, DB_PATH)
     print(f"✅ Rollback completado desde: {latest_backup}")
 
 if __name__ == "__main__":
@@ -65,6 +65,50 @@ const APIClient = {
         return this.request(`/analysis/criminal?query=${encodeURIComponent(query)}`, 'POST');
     },
 
+    // Misma consulta en streaming (SSE sobre fetch): onToken recibe cada fragmento
+    // y la promesa resuelve con la misma forma que analyzeCriminalCase
+    async streamCriminalCase(query, onToken) {
+        const state = window.GahenaxStore.state;
+        const response = await fetch(`${this.BASE_URL}/analysis/criminal/stream?query=${encodeURIComponent(query)}`, {
+            method: 'POST',
+            headers: {
+                'Accept': 'text/event-stream',
+                'X-User-Name': `Gahenax_Lex_${state.currentRole}`,
+                'Authorization': `Bearer ${state.currentRole === 'admin' ? 'admin-token' : 'operator-token'}`
+            }
+        });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({ detail: 'Fallo de Protocolo' }));
+            throw new Error(error.detail || 'Error en Gahenax Core');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let analysis = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let sep;
+            while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, sep);
+                buffer = buffer.slice(sep + 2);
+                const event = (raw.match(/^event: (.*)$/m) || [])[1];
+                const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || '{}');
+                if (event === 'token') {
+                    analysis += data.text;
+                    if (onToken) onToken(data.text, analysis);
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                } else if (event === 'done') {
+                    return { analysis: data.analysis || analysis, ...data };
+                }
+            }
+        }
+        throw new Error('Respuesta incompleta del motor jurídico');
+    },
+
     async submitSupportTicket(data) {
         return this.request('/support/ticket', 'POST', data);
     },
@@ -75,6 +119,15 @@ const APIClient = {
 
     async fetchJulesReport(taskId) {
         return this.request(`/jules/status/${taskId}`);
+    },
+
+    // Sigue una tarea por SSE: onStatus(report) en cada cambio de estado y
+    // onLog(lines) con las líneas nuevas del log. El stream se cierra solo al terminar.
+    watchJulesTask(taskId, { onStatus, onLog }) {
+        const source = new EventSource(`${this.BASE_URL}/jules/status/${taskId}/events`);
+        source.addEventListener('status', (e) => onStatus && onStatus(JSON.parse(e.data)));
+        source.addEventListener('log', (e) => onLog && onLog(JSON.parse(e.data).lines));
+        return source;
     }
 };
 
@@ -105,25 +105,32 @@ const App = {
         try {
             const data = { action, content: content || label };
             const { task_id } = await window.GahenaxAPI.dispatchJulesTask(data);
-            panel.innerHTML = `<div style="color:var(--lex-primary);">TAREA EN COLA: ${task_id}</div>`;
-
-            // Poll for status
-            const poll = setInterval(async () => {
-                try {
-                    const report = await window.GahenaxAPI.fetchJulesReport(task_id);
-                    if (report.status === 'DONE' || report.status === 'FAILED' || report.status === 'ERROR') {
-                        clearInterval(poll);
-                        const color = report.status === 'DONE' ? 'var(--success)' : 'var(--error)';
-                        panel.innerHTML = `
-                            <div style="color:${color}; font-weight:700;">FINALIZADO: ${report.status}</div>
-                            <div style="margin-top:0.5rem; opacity:0.8; white-space:pre-wrap;">${report.message}</div>
-                        `;
+            panel.innerHTML = `
+                <div id="jules-status-line" style="color:var(--lex-primary);">TAREA EN COLA: ${task_id}</div>
+                <pre id="jules-log" style="margin-top:0.5rem; opacity:0.8; max-height:12rem; overflow:auto; white-space:pre-wrap;"></pre>
+            `;
+            const statusLine = document.getElementById('jules-status-line');
+            const logBox = document.getElementById('jules-log');
+
+            // Estado y log en vivo por SSE
+            const source = window.GahenaxAPI.watchJulesTask(task_id, {
+                onLog: (lines) => {
+                    logBox.textContent += lines.join('\n') + '\n';
+                    logBox.scrollTop = logBox.scrollHeight;
+                },
+                onStatus: (report) => {
+                    if (['DONE', 'FAILED', 'ERROR', 'DENIED', 'CANCELLED', 'TIMEOUT', 'NOT_FOUND'].includes(report.status)) {
+                        source.close();
+                        statusLine.style.color = report.status === 'DONE' ? 'var(--success)' : 'var(--error)';
+                        statusLine.style.fontWeight = '700';
+                        statusLine.textContent = `FINALIZADO: ${report.status}`;
+                        if (report.message) logBox.textContent += report.message;
                     } else {
-                        panel.innerHTML = `<div style="color:var(--lex-accent);">JULES PROCESANDO: ${task_id}... (${report.status})</div>`;
+                        statusLine.style.color = 'var(--lex-accent)';
+                        statusLine.textContent = `JULES PROCESANDO: ${task_id}... (${report.status})`;
                     }
-                } catch (e) { /* Pending or error */ }
-            }, 3000);
-
+                }
+            });
         } catch (err) {
             panel.innerHTML = `<div style="color:var(--lex-error);">FALLO DE DESPACHO: ${err.message}</div>`;
         }
@@ -151,7 +158,11 @@ async function sendChatMessage() {
 
     try {
         container.innerHTML += `<div class="chat-message assistant" id="lex-typing">Iniciando consulta al motor jurídico...</div>`;
-        const result = await window.GahenaxAPI.analyzeCriminalCase(text);
+        const result = await window.GahenaxAPI.streamCriminalCase(text, (_, partial) => {
+            const typing = document.getElementById('lex-typing');
+            if (typing) typing.textContent = partial;
+            container.scrollTop = container.scrollHeight;
+        });
         document.getElementById('lex-typing').remove();
 
         container.innerHTML += `
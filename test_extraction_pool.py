@@ -0,0 +1,65 @@
+"""
+Prueba del pipeline de extracción ante la caída de un worker.
+
+Un documento "veneno" mata a su proceso hijo con SIGKILL (como haría el OOM
+killer). Sólo ese documento debe quedar FAILED; el resto del bloque, que
+compartía pool con él, debe terminar en OK.
+
+Ejecutar: python -m pytest test_extraction_pool.py  (o python test_extraction_pool.py)
+"""
+import os
+import signal
+import sys
+import tempfile
+
+os.environ.setdefault("JWT_SECRET", "test-extraction-pool")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import extraction, models
+from app.database import sync_schema
+
+TEXT_MIME = "text/x-test"
+CRASH_MIME = "application/x-crash"
+
+def iter_test_pages(path):
+    yield f"Texto de {os.path.basename(path)}"
+
+def iter_crash_pages(path):
+    os.kill(os.getpid(), signal.SIGKILL)
+    yield ""
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requiere fork y SIGKILL")
+def test_worker_crash_only_fails_its_document(monkeypatch):
+    # Los workers se crean con fork y heredan los extractores de prueba
+    monkeypatch.setitem(extraction.EXTRACTORS, TEXT_MIME, iter_test_pages)
+    monkeypatch.setitem(extraction.EXTRACTORS, CRASH_MIME, iter_crash_pages)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'test.db')}")
+        sync_schema(engine)
+        Session = sessionmaker(bind=engine)
+
+        db = Session()
+        for i in range(40):
+            mime = CRASH_MIME if i == 7 else TEXT_MIME
+            db.add(models.Document(original_filename=f"doc{i}", stored_filename=f"doc{i}", mime_type=mime,
+                                   size_bytes=1, sha256=f"{i:064d}", uploaded_by="test"))
+        db.commit()
+        db.close()
+
+        stats = extraction.run_pending(Session, workers=4, batch_size=5, documents_root=tmp, memory_mb=0)
+
+        db = Session()
+        statuses = {d.stored_filename: d.extraction_status for d in db.query(models.Document)}
+        db.close()
+        engine.dispose()
+
+    assert stats["documents"] == 40
+    assert statuses.pop("doc7") == models.ExtractionStatus.FAILED
+    assert set(statuses.values()) == {models.ExtractionStatus.OK}
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,56 @@
+"""
+Prueba de la sincronización incremental del vinculador.
+
+SQLite guarda `updated_at` (func.now()) con resolución de segundos: un proceso
+creado en el mismo segundo que la última sincronización debe indexarse en la
+siguiente.
+
+Ejecutar: python -m pytest test_linker.py  (o python test_linker.py)
+"""
+import datetime
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("JWT_SECRET", "test-linker")
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import sync_schema
+from app.linker import ProcessLinker
+
+SAME_SECOND = "2026-01-15 10:30:00"
+
+def add_proceso(db, numero):
+    proceso = models.Proceso(numero_proceso=numero, fecha_radicacion=datetime.date(2026, 1, 15),
+                             estado=list(models.EstadoProceso)[0], partes="Demandante vs. Demandado")
+    db.add(proceso)
+    db.commit()
+    # Mismo formato que func.now() en SQLite
+    db.execute(text("UPDATE procesos SET updated_at = :ts WHERE id = :id"), {"ts": SAME_SECOND, "id": proceso.id})
+    db.commit()
+    return proceso.id
+
+def test_sync_indexes_process_from_watermark_second():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'test.db')}")
+        sync_schema(engine)
+        db = sessionmaker(bind=engine)()
+
+        linker = ProcessLinker()
+        first = add_proceso(db, "11001-31-03-001-2026-00001-00")
+        assert linker.sync(db) == 1
+
+        second = add_proceso(db, "11001-31-03-001-2026-00002-00")
+        assert linker.sync(db) >= 1
+        assert linker.find_processes("Radicado 11001-31-03-001-2026-00002-00.") == {second: 1.0}
+        assert linker.find_processes("Radicado 11001-31-03-001-2026-00001-00.") == {first: 1.0}
+
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,124 @@
+"""
+Verificación de la bandeja de salida del CRM contra el mock de office/main.py.
+
+1. Con la Oficina Central caída se envían tickets: el endpoint debe responder
+   202 en milisegundos y los tickets quedan 'pending'.
+2. Se levanta el mock: el entregador en segundo plano debe enviarlos todos
+   (con reintentos y backoff) y el mock debe haberlos recibido.
+
+Uso: python verify_crm_outbox.py [--tickets 20]
+"""
+import argparse
+import logging
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+PORT = free_port()
+TMP = tempfile.mkdtemp(prefix="verify_crm_")
+os.environ.setdefault("JWT_SECRET", "verify-crm-outbox")
+os.environ["CRM_API_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["CRM_OUTBOX_PATH"] = os.path.join(TMP, "crm_outbox.db")
+os.environ["CRM_RETRY_BASE_SECONDS"] = "0.5"
+os.environ["CRM_RETRY_MAX_SECONDS"] = "2"
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.hotel_auth import require_auth
+from office.main import app as office_app, metrics as office_metrics
+
+# El mock configura logging en INFO: dejar sólo el resultado de las pruebas
+for name in ("httpx", "gahenax.audit", "gahenax.crm", "chechy.crm"):
+    logging.getLogger(name).setLevel(logging.WARNING)
+
+class VerifyGuest:
+    id = 0
+    email = "verify@gahenax.com"
+    role = "customer"
+
+def print_test(name, passed, details=""):
+    icon = "[OK]" if passed else "[FAIL]"
+    print(f"{icon} {name}")
+    if details:
+        print(f"   {details}")
+    print()
+    return passed
+
+def start_office() -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(office_app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=20)
+    args = parser.parse_args()
+
+    app.dependency_overrides[require_auth] = lambda: VerifyGuest()
+    results = []
+    with TestClient(app) as client:
+        print("=" * 60)
+        print("TEST 1: Oficina Central caída")
+        print("=" * 60)
+        ids, latencies = [], []
+        for i in range(args.tickets):
+            started = time.perf_counter()
+            r = client.post("/api/support/ticket", json={
+                "subject": f"Prueba de bandeja #{i}",
+                "description": "Ticket generado por verify_crm_outbox.py",
+                "priority": "low"
+            })
+            latencies.append((time.perf_counter() - started) * 1000)
+            if r.status_code == 202:
+                ids.append(r.json()["ticket_id"])
+        results.append(print_test(
+            "Tickets aceptados con 202", len(ids) == args.tickets,
+            f"{len(ids)}/{args.tickets} - p50 {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms"
+        ))
+        time.sleep(1)
+        states = [client.get(f"/api/support/ticket/{t}").json()["status"] for t in ids]
+        results.append(print_test(
+            "Tickets retenidos en la bandeja", all(s == "pending" for s in states),
+            f"estados: {sorted(set(states))}"
+        ))
+
+        print("=" * 60)
+        print("TEST 2: Oficina Central disponible")
+        print("=" * 60)
+        received_before = office_metrics["tickets_received"]
+        server = start_office()
+        started = time.time()
+        pending = set(ids)
+        while pending and time.time() - started < 15:
+            pending = {t for t in pending if client.get(f"/api/support/ticket/{t}").json()["status"] != "sent"}
+            time.sleep(0.2)
+        received = office_metrics["tickets_received"] - received_before
+        results.append(print_test(
+            "Tickets entregados en segundo plano", not pending,
+            f"{len(ids) - len(pending)}/{len(ids)} enviados en {time.time() - started:.1f} s; "
+            f"recibidos por el mock: {received}"
+        ))
+        sample = client.get(f"/api/support/ticket/{ids[0]}").json()
+        results.append(print_test(
+            "Ticket con id remoto", bool(sample.get("remote_id")),
+            f"{sample['ticket_id']} -> {sample.get('remote_id')} ({sample['attempts']} intentos)"
+        ))
+        server.should_exit = True
+
+    print(f"RESULTADO: {sum(results)}/{len(results)} verificaciones correctas")
+
+if __name__ == "__main__":
+    main()